@@ -551,6 +551,63 @@ function countAnalysisStatus(audioAnalysisData) {
     };
 }
 
+/**
+ * Moyenne à 2 décimales d'un score des agrégats de campagne
+ */
+function averageFromAggregates(aggregates, field) {
+    const count = aggregates[`${field}_count`] || 0;
+    return count > 0 ? Math.round((aggregates[`${field}_sum`] || 0) / count * 100) / 100 : 0;
+}
+
+/**
+ * Indicateurs de campagne à partir des agrégats incrémentaux (item SCORES#campaignId écrit
+ * par store_response), sans relire les audios ; mêmes formes que calculateNPS, calculateCSAT
+ * et les moyennes calculées sur les audios
+ * @param {Object} aggregates - Compteurs agrégés (scoreRecord.counters additionnés)
+ * @returns {Object} - nps, csat, averageChurnProbability, averageEaseOfResponse, adequacyScore
+ */
+function summarizeScoreAggregates(aggregates) {
+    const count = name => aggregates[name] || 0;
+    const percentage = (value, total) => total > 0 ? Math.round(value / total * 100) : 0;
+
+    const npsResponses = count('nps_count');
+    const promoters = count('nps_promoter');
+    const passives = count('nps_passive');
+    const detractors = count('nps_detractor');
+    const csatResponses = count('satisfaction_count');
+    const satisfied = count('csat_satisfied');
+    const neutral = count('csat_neutral');
+    const dissatisfied = count('csat_dissatisfied');
+
+    return {
+        nps: {
+            npsScore: npsResponses > 0 ? Math.round((promoters - detractors) / npsResponses * 100) : 0,
+            promoters,
+            passives,
+            detractors,
+            promotersPercentage: percentage(promoters, npsResponses),
+            passivesPercentage: percentage(passives, npsResponses),
+            detractorsPercentage: percentage(detractors, npsResponses),
+            totalResponses: count('responses'),
+            validResponses: npsResponses
+        },
+        csat: {
+            csatScore: percentage(satisfied, csatResponses),
+            satisfied,
+            neutral,
+            dissatisfied,
+            satisfiedPercentage: percentage(satisfied, csatResponses),
+            neutralPercentage: percentage(neutral, csatResponses),
+            dissatisfiedPercentage: percentage(dissatisfied, csatResponses),
+            totalResponses: count('responses'),
+            validResponses: csatResponses
+        },
+        averageChurnProbability: averageFromAggregates(aggregates, 'churn_probability'),
+        averageEaseOfResponse: averageFromAggregates(aggregates, 'ease_of_resolution'),
+        adequacyScore: averageFromAggregates(aggregates, 'assistance_adequacy')
+    };
+}
+
 /**
  * Appelle Bedrock avec Claude Haiku 3.5 pour analyser les données filtrées
  *
@@ -716,5 +773,6 @@ module.exports = {
     calculateAverageEaseOfResponse,
     calculateAverageAssistanceAdequacy,
     countAnalysisStatus,
+    summarizeScoreAggregates,
     invokeBedrockWithClaude
 };
\ No newline at end of file
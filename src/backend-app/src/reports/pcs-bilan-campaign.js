@@ -10,6 +10,7 @@ const {
     calculateAverageEaseOfResponse,
     calculateAverageAssistanceAdequacy,
     countAnalysisStatus,
+    summarizeScoreAggregates,
     invokeBedrockWithClaude
 } = require('./lib');
 
@@ -58,7 +59,19 @@ exports.handler = async (event) => {
         const campaign = campaignResult.Item;
         console.log(`Campagne trouvée - Type: ${campaign.campaign_type}, Nom: ${campaign.name}`);
         
-        // Requête DynamoDB pour récupérer tous les audios de la campagne
+        // Agrégats tenus à jour par store_response (relevés de scores typés), lus en premier
+        const aggregatesResult = await dynamoDB.get({
+            TableName: process.env.TABLE_NAME,
+            Key: {
+                Id: campaignId,
+                METADATA: `SCORES#${campaignId}`,
+            }
+        }).promise();
+        const aggregates = aggregatesResult.Item;
+        console.log(`Agrégats de scores ${aggregates ? `trouvés (${aggregates.responses} réponses)` : 'absents'}`);
+
+        // Requête DynamoDB pour récupérer tous les audios de la campagne (synthèse Bedrock),
+        // limitée aux attributs lus par extractAudioAnalysisData
         const audioParams = {
             TableName: process.env.TABLE_NAME,
             KeyConditionExpression: 'METADATA = :metadata',
@@ -67,6 +80,7 @@ exports.handler = async (event) => {
                 ':metadata': `AUDIO#${campaignId}`,
                 ':status': 'COMPLETE'
             },
+            ProjectionExpression: 'Id, createdAt, analysisStatus, bedrockResult, scoreRecord',
             IndexName: 'MetadataIndex'
         };
         const result = await dynamoDB.query(audioParams).promise();
@@ -132,11 +146,22 @@ exports.handler = async (event) => {
             }
             Ne génère rien d'autre que cet objet JSON. Pas d'introduction, pas de conclusion, pas d'explications.`
 
-        const npsData = calculateNPS(audioAnalysisData);
-        const csatData = calculateCSAT(audioAnalysisData);
-        const averageChurnProbability = calculateAverageChurnProbability(audioAnalysisData);
-        const averageEaseOfResponse = calculateAverageEaseOfResponse(audioAnalysisData);
-        const adequacyScore = calculateAverageAssistanceAdequacy(audioAnalysisData);
+        // Indicateurs lus dans les agrégats ; recalcul sur les audios seulement pour les
+        // campagnes évaluées avant les relevés (ou dont les agrégats sont incomplets)
+        const hasAggregates = aggregates && aggregates.responses >= audioAnalysisData.length;
+        const scores = hasAggregates ? summarizeScoreAggregates(aggregates) : {
+            nps: calculateNPS(audioAnalysisData),
+            csat: calculateCSAT(audioAnalysisData),
+            averageChurnProbability: calculateAverageChurnProbability(audioAnalysisData),
+            averageEaseOfResponse: calculateAverageEaseOfResponse(audioAnalysisData),
+            adequacyScore: calculateAverageAssistanceAdequacy(audioAnalysisData)
+        };
+        console.log(`Indicateurs ${hasAggregates ? 'lus dans les agrégats' : 'recalculés sur les audios'}`);
+        const npsData = scores.nps;
+        const csatData = scores.csat;
+        const averageChurnProbability = scores.averageChurnProbability;
+        const averageEaseOfResponse = scores.averageEaseOfResponse;
+        const adequacyScore = scores.adequacyScore;
         const analysisStatusCount = countAnalysisStatus(audioAnalysisData);
         const bedrockResult = await invokeBedrockWithClaude(audioAnalysisData, prompt, 'post-call-survey');
 
@@ -186,19 +211,23 @@ function extractAudioAnalysisData(items, campaignType) {
             const riskAssessment = conversationAnalysis.risk_assessment || {};
             const conversationMetrics = conversationAnalysis.conversation_metrics || {};
             const verbatims = conversationAnalysis.verbatims || {};
+            // Relevé typé (entiers validés) quand l'évaluation l'a produit
+            const scoreRecord = item.scoreRecord || {};
+            const typed = (field, fallback) => scoreRecord[field] !== undefined && scoreRecord[field] !== null
+                ? scoreRecord[field] : (fallback || '');
                     
             const row = {
                 id: item.Id || '',
                 createdAt: item.createdAt || '',
                 analysisStatus: item.analysisStatus || '',
-                satisfactionGlobale: bedrockResult.satisfaction_globale || '',
-                netPromoter: bedrockResult.net_promoter || '',
-                assistanceAdequacy: bedrockResult.assistance_adequacy || '',
-                easyOfResponse: bedrockResult.easy_of_response || '',
-                timeAdequacy: bedrockResult.time_adequacy || '',
+                satisfactionGlobale: typed('satisfaction', bedrockResult.satisfaction_globale),
+                netPromoter: typed('nps', bedrockResult.net_promoter),
+                assistanceAdequacy: typed('assistance_adequacy', bedrockResult.assistance_adequacy),
+                easyOfResponse: typed('ease_of_resolution', bedrockResult.easy_of_response),
+                timeAdequacy: typed('time_adequacy', bedrockResult.time_adequacy),
                 resolutionPromptStatus: bedrockResult.resolution_prompt_status || '',
                 churnRiskLevel: riskAssessment.churnrisklevel || '',
-                churnProbability: riskAssessment.churn_probability || '',
+                churnProbability: typed('churn_probability', riskAssessment.churn_probability),
                 dominantSentiment: conversationMetrics.dominant_sentiment || '',
                 agentTalkRatio: conversationMetrics.agenttalkratio || '',
                 interruptionCount: conversationMetrics.interruption_count || '',
@@ -0,0 +1,6 @@
+"""
+Modules partagés par les lambdas Python d'évaluation Bedrock.
+
+Ce répertoire est ajouté à la racine de chaque archive Python par
+publish_lamba.sh, il est donc importable directement depuis lambda_function.py.
+"""
@@ -0,0 +1,85 @@
+import os
+import json
+import math
+import logging
+
+logger = logging.getLogger()
+
+DEFAULT_BATCH_ITEM_CONCURRENCY = 2
+
+
+def get_batch_item_concurrency():
+    """
+    Transcriptions évaluées simultanément par le handler batch (BATCH_ITEM_CONCURRENCY)
+
+    Les appels Bedrock restent bornés par le contrôleur d'admission partagé : ce réglage
+    sert seulement à garder le pool de workers occupé entre deux transcriptions.
+
+    Returns:
+        int: Nombre de transcriptions en cours (au moins 1)
+    """
+    try:
+        value = int(os.environ.get('BATCH_ITEM_CONCURRENCY', DEFAULT_BATCH_ITEM_CONCURRENCY))
+    except ValueError:
+        logger.warning("BATCH_ITEM_CONCURRENCY invalide, utilisation de la valeur par défaut")
+        value = DEFAULT_BATCH_ITEM_CONCURRENCY
+    return max(1, value)
+
+
+def parse_batch_event(event):
+    """
+    Extrait les transcriptions d'un événement batch
+
+    Formats acceptés :
+    - {'items': [{originalText, fileNameKey, analysis}, ...], 'suites': ...}
+    - événement SQS {'Records': [{'messageId', 'body': '<json de l'item>'}, ...]}
+
+    Les 'suites' et 'monitoring' de l'événement s'appliquent aux items qui n'en ont pas.
+
+    Args:
+        event (dict): Événement reçu par le handler batch
+
+    Returns:
+        tuple: (items, failures) où items est une liste de (itemIdentifier, événement unitaire)
+               et failures une liste de (itemIdentifier, message) pour les items illisibles
+    """
+    defaults = {key: event[key] for key in ('suites', 'monitoring') if key in event}
+    items = []
+    failures = []
+
+    if 'Records' in event:
+        for index, record in enumerate(event['Records']):
+            identifier = record.get('messageId') or str(index)
+            try:
+                body = json.loads(record.get('body') or '')
+            except json.JSONDecodeError as e:
+                failures.append((identifier, f"Corps de message illisible: {str(e)}"))
+                continue
+            if not isinstance(body, dict):
+                failures.append((identifier, "Corps de message inattendu: objet JSON attendu"))
+                continue
+            items.append((identifier, {**defaults, **body}))
+    else:
+        for index, item in enumerate(event.get('items') or []):
+            if not isinstance(item, dict):
+                failures.append((str(index), "Item inattendu: objet attendu"))
+                continue
+            identifier = item.get('itemIdentifier') or item.get('fileNameKey') or str(index)
+            items.append((identifier, {**defaults, **item}))
+
+    return items, failures
+
+
+def estimate_item_ms(prompt_count, max_workers, prompt_estimate_ms):
+    """
+    Durée estimée d'une transcription : vagues successives de max_workers prompts
+
+    Args:
+        prompt_count (int): Prompts à évaluer
+        max_workers (int): Appels Bedrock simultanés
+        prompt_estimate_ms (float): Latence estimée du prompt le plus lent
+
+    Returns:
+        float: Durée estimée en millisecondes
+    """
+    return math.ceil(prompt_count / max(1, max_workers)) * prompt_estimate_ms
@@ -0,0 +1,371 @@
+"""
+Évaluation différée par Bedrock batch inference (réévaluation nocturne, historique)
+
+Pipeline en trois étapes, sur les définitions de prompts et de suites des lambdas :
+
+1. prepare : un enregistrement JSONL par transcription × prompt, un fichier par modèle
+   (un job batch n'utilise qu'un modèle)
+2. submit : soumission des fichiers via un submitter (BedrockBatchSubmitter en production,
+   LocalBatchSubmitter pour exécuter le pipeline sur des fichiers locaux)
+3. assemble : lecture des JSONL de résultats, clean_response et validateurs appliqués,
+   reconstruction des bedrockResult de chaque suite
+
+Un submitter est tout objet exposant submit(input_path, job_name) -> job (dict) et
+collect(job) -> chemin local du JSONL de sortie, ou None tant que le job n'est pas terminé.
+
+Usage:
+    python -m bedrock_common.batch_inference prepare --transcripts calls.jsonl --output-dir batch/ [--suites all]
+    python -m bedrock_common.batch_inference assemble --results batch/*.out --output results.json
+"""
+import os
+import sys
+import json
+import glob
+import time
+import logging
+import argparse
+from urllib.parse import quote, unquote
+
+from bedrock_common.cleaning import clean_response
+from bedrock_common.combined import extract_json_object
+from bedrock_common.engine import MODEL_ID, load_prompts_config
+from bedrock_common.prompt_registry import PromptConfigStore
+from bedrock_common.request_builder import build_request_body, extract_usage
+from bedrock_common.suites import SUITES, select_suites
+from bedrock_common.transcript import prepare_transcript
+
+logger = logging.getLogger()
+
+RECORD_ID_SEPARATOR = '~'
+
+# Statuts de get_model_invocation_job : sortie disponible (erreurs éventuelles par enregistrement) ou job perdu
+COMPLETED_JOB_STATUSES = ('Completed', 'PartiallyCompleted')
+FAILED_JOB_STATUSES = ('Failed', 'Stopped', 'Expired')
+
+
+def make_record_id(file_name_key, suite_name, result_key):
+    """
+    Identifiant d'enregistrement : fileNameKey (encodé), suite et clé de résultat
+
+    Returns:
+        str: 'suite~cle_resultat~fileNameKey encodé'
+    """
+    return RECORD_ID_SEPARATOR.join((suite_name, result_key, quote(file_name_key, safe='')))
+
+
+def parse_record_id(record_id):
+    """
+    Returns:
+        tuple: (file_name_key, suite_name, result_key)
+    """
+    suite_name, result_key, encoded_key = record_id.split(RECORD_ID_SEPARATOR, 2)
+    return unquote(encoded_key), suite_name, result_key
+
+
+def build_batch_records(transcripts, suites, registry, default_model_id=MODEL_ID):
+    """
+    Construit les enregistrements batch, groupés par modèle
+
+    Les prompts portent sur la transcription compactée comme dans les lambdas ; un job batch
+    n'a pas d'étape de résumé préalable, les transcriptions longues y sont envoyées entières.
+
+    Args:
+        transcripts (iterable): Dictionnaires {originalText, fileNameKey, analysis, audioSegments (optionnel)}
+        suites (list): Suites à évaluer
+        registry (PromptRegistry): Prompts compilés et profils de génération
+        default_model_id (str): Modèle des prompts sans model_id dans leur profil
+
+    Returns:
+        dict: model_id -> liste de {'recordId', 'modelInput'}
+    """
+    records = {}
+    for transcript in transcripts:
+        input_text = transcript.get('originalText')
+        file_name_key = transcript.get('fileNameKey')
+        if not input_text or not file_name_key:
+            logger.warning(f"Transcription ignorée (originalText ou fileNameKey manquant): {file_name_key!r}")
+            continue
+        input_text = prepare_transcript(input_text, transcript.get('audioSegments')).text
+        for suite in suites:
+            for result_key, prompt in suite.prompt_jobs(registry).items():
+                profile = registry.profile(suite.prompts[result_key])
+                params = profile.request_params(default_max_tokens=suite.default_max_tokens)
+                # Pas de cache de prompt : les enregistrements d'un job sont traités sans ordre garanti
+                body = build_request_body(input_text, prompt, cache=False, **params)
+                records.setdefault(profile.model_id or default_model_id, []).append({
+                    'recordId': make_record_id(file_name_key, suite.name, result_key),
+                    'modelInput': json.loads(body),
+                })
+    return records
+
+
+def write_batch_inputs(records, output_dir):
+    """
+    Écrit un fichier JSONL par modèle
+
+    Returns:
+        dict: model_id -> chemin du fichier écrit
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for model_id, model_records in records.items():
+        path = os.path.join(output_dir, f"{model_id.replace(':', '_')}.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in model_records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        paths[model_id] = path
+    return paths
+
+
+def _record_text(record):
+    """Texte généré d'un enregistrement de sortie, None en cas d'erreur"""
+    if record.get('error'):
+        return None
+    output = record.get('modelOutput') or {}
+    content = output.get('content') or []
+    if not content or 'text' not in content[0]:
+        return None
+    return content[0]['text']
+
+
+def assemble_results(result_records, registry, transcripts=None):
+    """
+    Reconstruit les sorties des suites à partir des enregistrements de résultat
+
+    Les réponses sont nettoyées comme en ligne ; une réponse refusée par le validateur
+    de son profil, une erreur d'enregistrement ou un JSON illisible rend la clé en échec
+    (à réévaluer en ligne ou dans le batch suivant).
+
+    Args:
+        result_records (iterable): Enregistrements {'recordId', 'modelOutput' | 'error'}
+        registry (PromptRegistry): Prompts compilés (validateurs)
+        transcripts (iterable, optional): Transcriptions d'origine, pour reporter 'analysis'
+
+    Returns:
+        dict: fileNameKey -> {nom de suite: sortie au format de lambda_handler (sans monitoring)}
+    """
+    analysis_by_key = {item.get('fileNameKey'): item.get('analysis', '') for item in transcripts or ()}
+    answers = {}
+    usage = {}
+    for record in result_records:
+        file_name_key, suite_name, result_key = parse_record_id(record['recordId'])
+        suite = SUITES[suite_name]
+        text = _record_text(record)
+        key_usage = extract_usage(record.get('modelOutput') or {})
+        totals = usage.setdefault((file_name_key, suite_name), dict.fromkeys(key_usage, 0))
+        for field, value in key_usage.items():
+            totals[field] += value
+
+        answer = None
+        if text is not None and result_key in suite.json_keys:
+            # Objet JSON décodé sur la réponse brute, comme en ligne
+            answer = extract_json_object(text)
+        elif text is not None:
+            answer = clean_response(text)
+            profile = registry.profile(suite.prompts[result_key])
+            if profile.validator is not None:
+                answer = profile.validator.validate(answer)
+        if answer is None:
+            logger.warning(f"Réponse batch inutilisable pour {file_name_key} / {result_key}")
+        answers.setdefault(file_name_key, {}).setdefault(suite_name, {})[result_key] = answer
+
+    outputs = {}
+    for file_name_key, by_suite in answers.items():
+        for suite_name, values in by_suite.items():
+            suite = SUITES[suite_name]
+            results = {key: values[key] for key in suite.result_keys if values.get(key) is not None}
+            failed_keys = [key for key in suite.result_keys if key not in results]
+            output = outputs.setdefault(file_name_key, {})[suite_name] = {
+                'statusCode': 206 if failed_keys else 200,
+                'bedrockResult': results,
+                'fileNameKey': file_name_key,
+                'analysis': analysis_by_key.get(file_name_key, ''),
+                'incomplete': bool(failed_keys),
+                'failedKeys': failed_keys,
+                'deferredKeys': [],
+                'usage': usage[(file_name_key, suite_name)],
+            }
+            if suite.record_builder is not None:
+                output['scoreRecord'] = suite.record_builder(results)
+    return outputs
+
+
+def read_jsonl(paths):
+    """Enregistrements JSON de un ou plusieurs fichiers JSONL (lignes vides ignorées)"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class LocalBatchSubmitter:
+    """
+    Exécute un fichier d'entrée batch avec invoke_model, enregistrement par enregistrement,
+    et écrit la sortie au format Bedrock batch ({recordId, modelInput, modelOutput | error})
+
+    Sert aux essais de bout en bout sur des fichiers locaux (client réel ou stub).
+    """
+
+    def __init__(self, client, model_id=MODEL_ID, output_dir=None):
+        self.client = client
+        self.model_id = model_id
+        self.output_dir = output_dir
+
+    def submit(self, input_path, job_name):
+        output_dir = self.output_dir or os.path.dirname(input_path)
+        output_path = os.path.join(output_dir, os.path.basename(input_path) + '.out')
+        with open(output_path, 'w', encoding='utf-8') as out:
+            for record in read_jsonl([input_path]):
+                result = {'recordId': record['recordId'], 'modelInput': record['modelInput']}
+                try:
+                    response = self.client.invoke_model(
+                        modelId=self.model_id,
+                        contentType="application/json",
+                        accept="application/json",
+                        body=json.dumps(record['modelInput']).encode('utf-8'),
+                    )
+                    result['modelOutput'] = json.loads(response['body'].read())
+                except Exception as e:
+                    result['error'] = {'errorMessage': str(e)}
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+        return {'jobName': job_name, 'outputPath': output_path}
+
+    def collect(self, job):
+        return job['outputPath']
+
+
+class BedrockBatchSubmitter:
+    """
+    Soumission via create_model_invocation_job (entrée et sortie sur S3)
+
+    Bedrock impose un nombre minimal d'enregistrements par job (100 à ce jour) et un rôle
+    de service autorisé à lire l'entrée et écrire la sortie.
+    """
+
+    def __init__(self, bedrock_client, s3_client, role_arn, s3_prefix, model_id=MODEL_ID, work_dir='.'):
+        """
+        Args:
+            bedrock_client: Client boto3 'bedrock' (plan de contrôle)
+            s3_client: Client boto3 's3'
+            role_arn (str): Rôle de service du job batch
+            s3_prefix (str): s3://bucket/prefix des entrées et sorties
+            model_id (str): Modèle du job
+            work_dir (str): Répertoire local où la sortie est téléchargée
+        """
+        self.bedrock_client = bedrock_client
+        self.s3_client = s3_client
+        self.role_arn = role_arn
+        self.bucket, _, prefix = s3_prefix[len('s3://'):].partition('/')
+        self.prefix = prefix.rstrip('/')
+        self.model_id = model_id
+        self.work_dir = work_dir
+
+    def submit(self, input_path, job_name):
+        input_key = f"{self.prefix}/input/{job_name}/{os.path.basename(input_path)}"
+        self.s3_client.upload_file(input_path, self.bucket, input_key)
+        response = self.bedrock_client.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=self.role_arn,
+            modelId=self.model_id,
+            inputDataConfig={'s3InputDataConfig': {'s3Uri': f"s3://{self.bucket}/{input_key}"}},
+            outputDataConfig={'s3OutputDataConfig': {'s3Uri': f"s3://{self.bucket}/{self.prefix}/output/{job_name}/"}},
+        )
+        return {'jobName': job_name, 'jobArn': response['jobArn'], 'inputFile': os.path.basename(input_path)}
+
+    def collect(self, job):
+        status = self.bedrock_client.get_model_invocation_job(jobIdentifier=job['jobArn'])['status']
+        if status in FAILED_JOB_STATUSES:
+            raise RuntimeError(f"Job batch {job['jobName']} terminé en statut {status}")
+        if status not in COMPLETED_JOB_STATUSES:
+            return None
+
+        # Sortie écrite par Bedrock sous output/<job>/<identifiant du job>/<fichier>.out
+        job_id = job['jobArn'].rsplit('/', 1)[-1]
+        output_key = f"{self.prefix}/output/{job['jobName']}/{job_id}/{job['inputFile']}.out"
+        output_path = os.path.join(self.work_dir, f"{job['jobName']}.jsonl.out")
+        self.s3_client.download_file(self.bucket, output_key, output_path)
+        return output_path
+
+
+def run_pipeline(transcripts, suites, submitter_for_model, work_dir, registry=None,
+                 job_prefix='bedrock-evaluate', poll_seconds=60, sleep=time.sleep):
+    """
+    Exécute les trois étapes et attend la fin des jobs
+
+    Args:
+        transcripts (list): Dictionnaires {originalText, fileNameKey, analysis}
+        suites (list): Suites à évaluer
+        submitter_for_model (callable): model_id -> submitter
+        work_dir (str): Répertoire des fichiers d'entrée et de sortie
+        registry (PromptRegistry, optional): Par défaut la configuration partagée
+        job_prefix (str): Préfixe des noms de job
+        poll_seconds (float): Intervalle de suivi des jobs
+        sleep (callable): Attente entre deux suivis
+
+    Returns:
+        dict: fileNameKey -> {suite: sortie}
+    """
+    registry = registry or PromptConfigStore(load_prompts_config).get_registry()
+    input_paths = write_batch_inputs(build_batch_records(transcripts, suites, registry), work_dir)
+
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    pending = []
+    for index, (model_id, path) in enumerate(input_paths.items()):
+        submitter = submitter_for_model(model_id)
+        pending.append((submitter, submitter.submit(path, f"{job_prefix}-{stamp}-{index}")))
+
+    output_paths = []
+    while pending:
+        still_pending = []
+        for submitter, job in pending:
+            output_path = submitter.collect(job)
+            if output_path is None:
+                still_pending.append((submitter, job))
+            else:
+                output_paths.append(output_path)
+        pending = still_pending
+        if pending:
+            sleep(poll_seconds)
+
+    return assemble_results(read_jsonl(output_paths), registry, transcripts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    prepare = commands.add_parser('prepare', help='Écrit les JSONL d\'entrée (un par modèle)')
+    prepare.add_argument('--transcripts', required=True, help='JSONL {originalText, fileNameKey, analysis}')
+    prepare.add_argument('--output-dir', required=True)
+    prepare.add_argument('--suites', nargs='+', default=['all'])
+
+    assemble = commands.add_parser('assemble', help='Reconstruit les bedrockResult depuis les JSONL de sortie')
+    assemble.add_argument('--results', nargs='+', required=True, help='Fichiers .out (motifs glob acceptés)')
+    assemble.add_argument('--transcripts', help="JSONL d'origine, pour reporter 'analysis'")
+    assemble.add_argument('--output', help='Fichier JSON écrit (stdout par défaut)')
+
+    args = parser.parse_args(argv)
+    registry = PromptConfigStore(load_prompts_config).get_registry()
+
+    if args.command == 'prepare':
+        suites = select_suites({'suites': args.suites}, ())
+        records = build_batch_records(read_jsonl([args.transcripts]), suites, registry)
+        for model_id, path in write_batch_inputs(records, args.output_dir).items():
+            print(f"{model_id}: {len(records[model_id])} enregistrements -> {path}")
+        return 0
+
+    paths = [path for pattern in args.results for path in sorted(glob.glob(pattern))]
+    transcripts = list(read_jsonl([args.transcripts])) if args.transcripts else None
+    outputs = assemble_results(read_jsonl(paths), registry, transcripts)
+    report = json.dumps(outputs, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
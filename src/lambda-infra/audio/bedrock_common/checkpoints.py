@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import hashlib
+import logging
+
+from bedrock_common.result_cache import DynamoDBStore, SQLiteStore
+
+logger = logging.getLogger()
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class IncompleteEvaluationError(Exception):
+    """
+    Levée quand des prompts ont échoué et qu'une nouvelle tentative reste possible :
+    Step Functions relance la lambda (Retry sur ce nom d'erreur), qui ne réexécute
+    que les prompts absents du checkpoint
+    """
+
+    def __init__(self, failed_keys, attempts):
+        super().__init__(f"{len(failed_keys)} prompt(s) en échec après {attempts} essai(s): {', '.join(failed_keys)}")
+        self.failed_keys = list(failed_keys)
+        self.attempts = attempts
+
+
+def _fingerprint(input_text):
+    return hashlib.sha256((input_text or '').encode('utf-8')).hexdigest()
+
+
+class CheckpointStore:
+    """
+    Résultats déjà obtenus pour une transcription, conservés entre les tentatives
+
+    Le backend est tout objet exposant get(key) et set(key, value) sur des chaînes
+    (SQLiteStore en local, DynamoDBStore en production, LRUStore en mémoire). Un
+    checkpoint est identifié par la suite évaluée, le fileNameKey et la version de
+    configuration ; l'empreinte de la transcription protège contre un fichier remplacé.
+    Les erreurs du backend et les checkpoints illisibles sont journalisés et traités comme
+    une absence de checkpoint.
+
+    Une réanalyse manuelle (champ forceReanalysis de l'événement) ignore les checkpoints
+    écrits sans la même valeur : les nouvelles tentatives Step Functions de la réanalyse,
+    qui portent le même événement, reprennent les résultats qu'elle a déjà obtenus.
+    """
+
+    def __init__(self, backend, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.backend = backend
+        self.max_attempts = max_attempts
+
+    @staticmethod
+    def make_key(suite, file_name_key, config_version):
+        return f"checkpoint#{suite}#{config_version}#{file_name_key}"
+
+    def load(self, suite, file_name_key, config_version, input_text, reanalysis=None):
+        """
+        Args:
+            suite (str): Suite évaluée (nom de la lambda)
+            file_name_key (str): Clé S3 du fichier traité
+            config_version (str): metadata.version de prompts-config.json
+            input_text (str): Transcription évaluée
+            reanalysis (optional): Valeur de forceReanalysis de l'événement, None hors réanalyse
+
+        Returns:
+            dict: Checkpoint {'results', 'failed', 'attempts'} ou None
+        """
+        if not file_name_key:
+            return None
+        try:
+            value = self.backend.get(self.make_key(suite, file_name_key, config_version))
+        except Exception as e:
+            logger.warning(f"Lecture du checkpoint impossible: {str(e)}")
+            return None
+        if value is None:
+            return None
+
+        try:
+            checkpoint = json.loads(value)
+        except ValueError as e:
+            logger.warning(f"Checkpoint illisible pour {file_name_key}, ignoré: {str(e)}")
+            return None
+        if not isinstance(checkpoint, dict) or checkpoint.get('fingerprint') != _fingerprint(input_text):
+            logger.info(f"Checkpoint ignoré pour {file_name_key}: transcription différente")
+            return None
+        if reanalysis is not None and checkpoint.get('reanalysis') != reanalysis:
+            logger.info(f"Checkpoint ignoré pour {file_name_key}: réanalyse demandée")
+            return None
+        return checkpoint
+
+    def save(self, suite, file_name_key, config_version, input_text, results, failed, previous=None,
+             reanalysis=None):
+        """
+        Enregistre les résultats obtenus et les clés encore en échec
+
+        Args:
+            suite (str): Suite évaluée (nom de la lambda)
+            file_name_key (str): Clé S3 du fichier traité
+            config_version (str): metadata.version de prompts-config.json
+            input_text (str): Transcription évaluée
+            results (dict): Résultats obtenus (checkpoint précédent inclus)
+            failed (list): Clés en échec
+            previous (dict, optional): Checkpoint chargé en début d'invocation
+            reanalysis (optional): Valeur de forceReanalysis de l'événement, None hors réanalyse
+
+        Returns:
+            dict: Checkpoint enregistré
+        """
+        # Les essais ne se cumulent que sur une série d'échecs : après une évaluation
+        # complète, une nouvelle demande repart avec toutes ses tentatives
+        attempts = previous['attempts'] + 1 if previous and previous.get('failed') else 1
+        checkpoint = {
+            'fingerprint': _fingerprint(input_text),
+            'results': results,
+            'failed': list(failed),
+            'attempts': attempts,
+            'updatedAt': int(time.time()),
+        }
+        if reanalysis is not None:
+            checkpoint['reanalysis'] = reanalysis
+        if not file_name_key:
+            return checkpoint
+        try:
+            self.backend.set(
+                self.make_key(suite, file_name_key, config_version),
+                json.dumps(checkpoint, ensure_ascii=False),
+            )
+        except Exception as e:
+            logger.warning(f"Écriture du checkpoint impossible: {str(e)}")
+        return checkpoint
+
+    def should_retry(self, checkpoint):
+        """True si des prompts restent en échec et que les essais ne sont pas épuisés"""
+        return bool(checkpoint['failed']) and checkpoint['attempts'] < self.max_attempts
+
+
+def create_checkpoint_store():
+    """
+    Construit le store de checkpoints à partir de l'environnement
+
+    Variables:
+        CHECKPOINT_TABLE: table DynamoDB (même schéma que le cache des réponses)
+        CHECKPOINT_SQLITE_PATH: fichier SQLite (tests, local)
+        CHECKPOINT_TTL_SECONDS: durée de conservation (défaut 24 h)
+        CHECKPOINT_MAX_ATTEMPTS: tentatives avant de rendre un résultat partiel (défaut 3)
+
+    Returns:
+        CheckpointStore: Store configuré, ou None si aucun backend n'est défini
+    """
+    ttl_seconds = int(os.environ.get('CHECKPOINT_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+    if os.environ.get('CHECKPOINT_TABLE'):
+        backend = DynamoDBStore(os.environ['CHECKPOINT_TABLE'], ttl_seconds=ttl_seconds)
+    elif os.environ.get('CHECKPOINT_SQLITE_PATH'):
+        backend = SQLiteStore(os.environ['CHECKPOINT_SQLITE_PATH'], ttl_seconds=ttl_seconds)
+    else:
+        return None
+    return CheckpointStore(
+        backend,
+        max_attempts=int(os.environ.get('CHECKPOINT_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)),
+    )
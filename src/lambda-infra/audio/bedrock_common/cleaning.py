@@ -0,0 +1,329 @@
+import re
+
+# Préfixes communs qui ne sont pas nécessaires
+PREFIXES_TO_REMOVE = (
+    "Après avoir analysé la transcription de l'appel, ",
+    "Voici ",
+    "D'après l'analyse de la transcription, ",
+    "Basé sur la transcription fournie, "
+)
+
+CODE_FENCE = '```'
+
+# Caractères qui demandent l'analyse complète : sans eux, seuls les espaces sont à réduire
+_MARKUP = re.compile(r'[\n\\*_~`\[#]')
+
+# Unités lexicales d'une ligne ; un saut de ligne est réel ou échappé ("\n" littéral)
+_TOKEN = re.compile(r'''
+    (?P<text>[^*_~\[\]\\\n]+)
+  | (?P<newline>\n|\\n)
+  | (?P<delimiter>\*+|_+|~+)
+  | (?P<link_close>\]\([^)\n\\]*\))
+  | (?P<link_open>\[)
+  | (?P<other>.)
+''', re.VERBOSE)
+
+# Début de ligne : titre, puis (après un saut de ligne) puce ou numéro de liste
+_HEADING = re.compile(r'[ \t]*#+(?:[ \t]+|(?=\n|\\n|\Z))')
+_LIST_ITEM = re.compile(r'(?P<bullet>[-*] )|(?P<numbered>\d+\.(?:[ \t]+|(?=\n|\\n|\Z)))|' + _HEADING.pattern)
+
+_SPACES = re.compile(r'\s{2,}')
+_TRAILING_SPACES = re.compile(r'\s+\Z')
+
+# Dans une ligne en cours de streaming, caractères dont le rôle dépend de la suite
+_PENDING_MARKUP = re.compile(r'[*_~\[\\]')
+_PENDING_LINE_START = re.compile(r'[*_~\[\\#]')
+_FIRST_WORD = re.compile(r'\s*\S+\s')
+
+
+def _strip_prefix(text):
+    # 1. Supprimer les préfixes communs qui ne sont pas nécessaires
+    for prefix in PREFIXES_TO_REMOVE:
+        if text.startswith(prefix):
+            return text[len(prefix):]
+    return text
+
+
+def _strip_known_prefix(text):
+    """_strip_prefix sur un début de réponse, None tant qu'un préfixe reste possible"""
+    for prefix in PREFIXES_TO_REMOVE:
+        if text.startswith(prefix):
+            return text[len(prefix):]
+        if prefix.startswith(text):
+            return None
+    return text
+
+
+def _strip_code_blocks(text):
+    """Supprime les blocs ```...``` ; un ``` sans fermeture reste dans le texte"""
+    if CODE_FENCE not in text:
+        return text
+    parts = []
+    position = 0
+    while True:
+        start = text.find(CODE_FENCE, position)
+        if start < 0:
+            break
+        end = text.find(CODE_FENCE, start + 3)
+        if end < 0:
+            break
+        parts.append(text[position:start])
+        position = end + 3
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+class _LineScanner:
+    """
+    Analyse en une passe du texte sans blocs de code
+
+    Chaque ligne est découpée en unités (_TOKEN) : titres, puces et numéros sont
+    reconnus en début de ligne, les délimiteurs d'emphase et les crochets de lien sont
+    appariés au sein de la ligne (les délimiteurs d'au moins deux caractères restés sans
+    paire sont retirés en fin de ligne), les sauts de ligne deviennent des espaces. Le texte
+    peut être fourni en plusieurs segments coupés après un saut de ligne, ou dans une
+    ligne juste avant un délimiteur (l'état de début de ligne et le caractère précédent
+    sont conservés d'un segment à l'autre).
+    """
+
+    def __init__(self):
+        self.at_line_start = True
+        self.after_newline = False
+        self.previous = ' '
+
+    def scan(self, text):
+        """
+        Args:
+            text (str): Segment de texte sans bloc de code
+
+        Returns:
+            str: Texte produit, espaces non réduits
+        """
+        out = []
+        openers = []
+        # Délimiteurs d'au moins deux caractères ('**', '__', '~~'...) pas encore appariés
+        unpaired = []
+        link_open = None
+        previous = self.previous
+        position, length = 0, len(text)
+
+        while position < length:
+            if self.at_line_start:
+                self.at_line_start = False
+                line_start = (_LIST_ITEM if self.after_newline else _HEADING).match(text, position)
+                if line_start is not None:
+                    if line_start.lastgroup == 'bullet':
+                        out.append('• ')
+                    elif line_start.lastgroup == 'numbered':
+                        out.append('| ')
+                    position = line_start.end()
+                    previous = text[position - 1]
+                    continue
+
+            match = _TOKEN.match(text, position)
+            kind = match.lastgroup
+            token = match.group()
+            position = match.end()
+
+            if kind == 'newline':
+                self._drop_unpaired(out, unpaired)
+                out.append(' ')
+                openers.clear()
+                link_open = None
+                self.at_line_start = self.after_newline = True
+                previous = ' '
+                continue
+
+            if kind == 'delimiter':
+                char, size = token[0], len(token)
+                following = text[position] if position < length else ' '
+                can_close = size <= 3 and not previous.isspace() and not (char == '_' and following.isalnum())
+                can_open = size <= 3 and not following.isspace() and not (char == '_' and previous.isalnum())
+                closed = False
+                if can_close:
+                    for index in range(len(openers) - 1, -1, -1):
+                        if openers[index][1] == token:
+                            out[openers[index][0]] = ''
+                            del openers[index:]
+                            closed = True
+                            break
+                if not closed:
+                    if can_open:
+                        openers.append((len(out), token))
+                    if size >= 2:
+                        unpaired.append(len(out))
+                    out.append(token)
+            elif kind == 'link_open':
+                if link_open is None:
+                    link_open = len(out)
+                out.append(token)
+            elif kind == 'link_close':
+                if link_open is None:
+                    # Pas de lien ouvert : seul le ']' est du texte, la suite reste à analyser
+                    position = match.start() + 1
+                    token = ']'
+                    out.append(token)
+                else:
+                    out[link_open] = ''
+                    link_open = None
+            else:
+                out.append(token)
+            previous = token[-1]
+
+        # Un segment se termine en fin de ligne ou de texte dès qu'il contient un délimiteur
+        self._drop_unpaired(out, unpaired)
+        self.previous = previous
+        return ''.join(out)
+
+    @staticmethod
+    def _drop_unpaired(out, unpaired):
+        """Fin de ligne : les délimiteurs doubles ou triples sans paire sont du balisage, retirés"""
+        for index in unpaired:
+            out[index] = ''
+        unpaired.clear()
+
+
+def clean_response(text):
+    """
+    Nettoie et formate correctement la réponse du modèle
+
+    Préfixes inutiles et blocs de code supprimés, markdown (titres, emphase, liens)
+    retiré, listes à puces et numérotées mises en ligne (" • ", " | "), sauts de ligne
+    et espaces multiples réduits à un espace. Un texte sans caractère de balisage ne
+    demande qu'une réduction des espaces.
+
+    Args:
+        text (str): Texte de la réponse à nettoyer
+
+    Returns:
+        str: Texte nettoyé et correctement formaté
+    """
+    if not text:
+        return text
+
+    text = _strip_prefix(text)
+    if _MARKUP.search(text) is not None:
+        text = _LineScanner().scan(_strip_code_blocks(text))
+    return _SPACES.sub(' ', text).strip()
+
+
+class StreamingCleaner:
+    """
+    Version incrémentale de clean_response pour les réponses en streaming
+
+    Les étapes de clean_response sont appliquées au fil des fragments, chaque caractère
+    n'étant analysé qu'une fois : blocs de code retenus jusqu'à leur fermeture, lignes
+    analysées dès leur saut de ligne (ou jusqu'au premier caractère de balisage d'une
+    ligne en cours), espaces finaux retenus pour la réduction. Le texte déjà rendu est
+    un préfixe du résultat final et finish() rend exactement clean_response(texte complet).
+    """
+
+    def __init__(self):
+        self._raw = ''
+        self._prefix_checked = False
+        self._in_code = False
+        self._code_scanned = 3
+        self._line = ''
+        self._scanner = _LineScanner()
+        self._spaces = ''
+        self._started = False
+        self._parts = []
+
+    @property
+    def text(self):
+        """Texte nettoyé définitif reçu jusqu'ici"""
+        return ''.join(self._parts)
+
+    def _emit(self, text):
+        # Espaces finaux retenus : ils peuvent se réduire avec ceux du segment suivant
+        text = self._spaces + text
+        trailing = _TRAILING_SPACES.search(text)
+        self._spaces = trailing.group() if trailing else ''
+        text = _SPACES.sub(' ', text[:len(text) - len(self._spaces)])
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        if text:
+            self._parts.append(text)
+        return text
+
+    def _take_code_free(self):
+        """Texte brut débarrassé des blocs de code fermés, jusqu'à un ``` encore ouvert"""
+        parts = []
+        while True:
+            if self._in_code:
+                end = self._raw.find(CODE_FENCE, self._code_scanned)
+                if end < 0:
+                    self._code_scanned = max(3, len(self._raw) - 2)
+                    break
+                self._raw = self._raw[end + 3:]
+                self._in_code = False
+            else:
+                start = self._raw.find(CODE_FENCE)
+                if start < 0:
+                    # Des ` finaux peuvent commencer un ``` avec le fragment suivant
+                    keep = min(2, len(self._raw) - len(self._raw.rstrip('`')))
+                    parts.append(self._raw[:len(self._raw) - keep])
+                    self._raw = self._raw[len(self._raw) - keep:]
+                    break
+                parts.append(self._raw[:start])
+                self._raw = self._raw[start:]
+                self._in_code = True
+                self._code_scanned = 3
+        return ''.join(parts)
+
+    def _scan_lines(self):
+        """Analyse les lignes terminées, puis le début de la ligne en cours qui ne dépend plus de la suite"""
+        line = self._line
+        scanned = ''
+        escaped = line.rfind('\\n')
+        end = max(line.rfind('\n') + 1, escaped + 2 if escaped >= 0 else 0)
+        if end:
+            scanned = self._scanner.scan(line[:end])
+            line = line[end:]
+
+        at_line_start = self._scanner.at_line_start
+        markup = (_PENDING_LINE_START if at_line_start else _PENDING_MARKUP).search(line)
+        ready = markup.start() if markup else len(line)
+        # En début de ligne, titre, puce ou numéro ne sont fixés qu'après le premier mot
+        if ready and (not at_line_start or _FIRST_WORD.match(line, 0, ready)):
+            scanned += self._scanner.scan(line[:ready])
+            line = line[ready:]
+        self._line = line
+        return scanned
+
+    def feed(self, chunk):
+        """
+        Args:
+            chunk (str): Fragment de la réponse du modèle
+
+        Returns:
+            str: Texte nettoyé devenu définitif avec ce fragment (éventuellement vide)
+        """
+        self._raw += chunk
+        if not self._prefix_checked:
+            raw = _strip_known_prefix(self._raw)
+            if raw is None:
+                return ''
+            self._raw = raw
+            self._prefix_checked = True
+
+        self._line += self._take_code_free()
+        return self._emit(self._scan_lines())
+
+    def finish(self):
+        """
+        Returns:
+            str: Texte nettoyé complet, identique à clean_response(texte reçu)
+        """
+        if not self._prefix_checked:
+            self._raw = _strip_prefix(self._raw)
+            self._prefix_checked = True
+        self._line += self._take_code_free()
+        # Un ``` resté ouvert est du texte
+        self._line += self._raw
+        self._raw = ''
+        self._in_code = False
+        self._emit(self._scanner.scan(self._line))
+        self._line = self._spaces = ''
+        return self.text
@@ -0,0 +1,191 @@
+import os
+import json
+import logging
+
+from bedrock_common.concurrency import run_prompts_concurrently
+
+logger = logging.getLogger()
+
+# Réponse combinée : tous les critères dans un seul objet JSON, donc plus de tokens de sortie
+COMBINED_MAX_TOKENS = 4096
+
+
+def is_combined_mode():
+    """
+    Indique si le mode "mega-prompt" est activé (BEDROCK_EVALUATION_MODE=combined)
+
+    Returns:
+        bool: True si tous les critères doivent être demandés en un seul appel
+    """
+    return os.environ.get('BEDROCK_EVALUATION_MODE', 'per_prompt').lower() == 'combined'
+
+
+def build_combined_schema(prompt_jobs, object_keys=(), validators=None):
+    """
+    Construit le schéma JSON déclaré pour la réponse combinée
+
+    Args:
+        prompt_jobs (dict): Clé de résultat -> prompt du critère
+        object_keys (iterable): Clés dont la valeur attendue est un objet JSON
+        validators (dict, optional): Clé -> AnswerValidator : le format de réponse du profil
+                                     de génération (valeurs permises, bornes) entre dans le schéma
+
+    Returns:
+        dict: Schéma JSON de l'objet attendu
+    """
+    object_keys = set(object_keys)
+    validators = validators or {}
+    properties = {}
+    for key in prompt_jobs:
+        if key in object_keys:
+            properties[key] = {'type': 'object'}
+        elif validators.get(key) is not None:
+            properties[key] = validators[key].json_schema()
+        else:
+            properties[key] = {'type': 'string'}
+    return {
+        'type': 'object',
+        'properties': properties,
+        'required': list(prompt_jobs),
+    }
+
+
+def build_combined_prompt(template, prompt_jobs, object_keys=(), validators=None):
+    """
+    Construit un prompt unique demandant tous les critères sous forme d'un objet JSON
+
+    Args:
+        template (str): Template 'prompts.combined.template' de la configuration
+        prompt_jobs (dict): Clé de résultat -> prompt du critère
+        object_keys (iterable): Clés dont la valeur attendue est un objet JSON
+        validators (dict, optional): Clé -> AnswerValidator du profil de génération du critère
+
+    Returns:
+        str: Prompt combiné prêt à être envoyé
+    """
+    schema = json.dumps(build_combined_schema(prompt_jobs, object_keys, validators), indent=2, ensure_ascii=False)
+    criteria = '\n\n'.join(f"[{key}]\n{prompt}" for key, prompt in prompt_jobs.items())
+    return template.format(schema=schema, criteria=criteria)
+
+
+def extract_json_object(text):
+    """Extrait le premier objet JSON de la réponse (tolère un bloc ``` ou un préambule)"""
+    if not text:
+        return None
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def parse_combined_response(text, prompt_jobs, object_keys=()):
+    """
+    Parse et valide la réponse combinée du modèle
+
+    Args:
+        text (str): Réponse brute (non nettoyée) du modèle
+        prompt_jobs (dict): Clé de résultat -> prompt du critère
+        object_keys (iterable): Clés dont la valeur attendue est un objet JSON
+
+    Returns:
+        dict: Clé -> valeur texte pour chaque critère présent et valide.
+              Les objets JSON sont re-sérialisés, comme une réponse individuelle.
+    """
+    data = extract_json_object(text)
+    if data is None:
+        return {}
+
+    object_keys = set(object_keys)
+    parsed = {}
+    for key in prompt_jobs:
+        value = data.get(key)
+        if key in object_keys:
+            if isinstance(value, str):
+                value = extract_json_object(value)
+            if isinstance(value, dict):
+                parsed[key] = json.dumps(value, ensure_ascii=False)
+        elif isinstance(value, str) and value.strip():
+            parsed[key] = value
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            parsed[key] = str(value)
+    return parsed
+
+
+def run_combined_evaluation(input_text, prompt_jobs, invoke, clean, template,
+                            object_keys=(), json_keys=(), validators=None, max_workers=None, errors=None,
+                            scheduler=None, deferred=None):
+    """
+    Évalue tous les critères en un seul appel, avec repli par prompt pour les clés manquantes
+    ou dont la valeur est refusée par le validateur du critère
+
+    Args:
+        input_text (str): Transcription de l'appel
+        prompt_jobs (dict): Clé de résultat -> prompt du critère
+        invoke (callable): invoke_bedrock de la lambda (accepte clean= et max_tokens=)
+        clean (callable): clean_response de la lambda, appliqué à chaque valeur texte
+        template (str): Template du prompt combiné
+        object_keys (iterable): Clés dont la valeur attendue est un objet JSON
+        json_keys (iterable): Clés décodées ensuite en objet JSON : ni nettoyées, ni nettoyées au repli
+        validators (dict, optional): Clé -> AnswerValidator du profil de génération du critère
+        max_workers (int, optional): Limite de concurrence pour le repli
+        errors (dict, optional): Reçoit les échecs du repli (voir run_prompts_concurrently)
+        scheduler (DeadlineScheduler, optional): Échéance appliquée au repli
+        deferred (list, optional): Reçoit les clés reportées par le scheduler
+
+    Returns:
+        dict: Résultats indexés par clé, dans l'ordre de prompt_jobs
+    """
+    if not prompt_jobs:
+        return {}
+
+    combined_prompt = build_combined_prompt(template, prompt_jobs, object_keys, validators)
+    try:
+        raw_response = invoke(
+            input_text,
+            prompt=combined_prompt,
+            clean=False,
+            max_tokens=COMBINED_MAX_TOKENS
+        )
+        parsed = parse_combined_response(raw_response, prompt_jobs, object_keys)
+    except Exception as e:
+        logger.warning(f"Échec de l'appel combiné, repli sur les prompts individuels: {str(e)}")
+        parsed = {}
+
+    # Même traitement qu'une réponse individuelle : nettoyage puis forme canonique du validateur
+    json_keys = set(json_keys)
+    validators = validators or {}
+    answers = {}
+    for key, value in parsed.items():
+        if key not in json_keys:
+            value = clean(value)
+        validator = validators.get(key)
+        if validator is not None:
+            value = validator.validate(value)
+            if value is None:
+                continue
+        answers[key] = value
+
+    missing_jobs = {key: prompt for key, prompt in prompt_jobs.items() if key not in answers}
+    if missing_jobs:
+        logger.warning(f"Critères manquants ou invalides dans la réponse combinée: {list(missing_jobs)}")
+        json_prompts = {prompt_jobs[key] for key in json_keys if key in prompt_jobs}
+
+        def fallback_invoke(input_text, prompt=None, **kwargs):
+            # Les objets JSON sont décodés sur la réponse brute : le nettoyage markdown les abîmerait
+            if prompt in json_prompts:
+                kwargs.setdefault('clean', False)
+            return invoke(input_text, prompt=prompt, **kwargs)
+
+        answers.update(run_prompts_concurrently(
+            input_text, missing_jobs, fallback_invoke, max_workers,
+            errors=errors, scheduler=scheduler, deferred=deferred
+        ))
+    else:
+        logger.info("Tous les critères obtenus en un seul appel Bedrock")
+
+    return {key: answers[key] for key in prompt_jobs if key in answers}
@@ -0,0 +1,124 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from bedrock_common.rate_limiter import DeadlineExceededError
+
+logger = logging.getLogger()
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+# Marqueur interne d'un prompt en échec (une réponse peut valoir None ou '')
+_FAILED = object()
+
+
+def get_max_concurrency():
+    """
+    Lit la limite de concurrence depuis la variable d'environnement BEDROCK_MAX_CONCURRENCY
+
+    Returns:
+        int: Nombre maximum d'appels Bedrock simultanés (1 = exécution séquentielle)
+    """
+    try:
+        value = int(os.environ.get('BEDROCK_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+    except ValueError:
+        logger.warning("BEDROCK_MAX_CONCURRENCY invalide, utilisation de la valeur par défaut")
+        value = DEFAULT_MAX_CONCURRENCY
+    return max(1, value)
+
+
+def run_prompts_concurrently(input_text, prompt_jobs, invoke, max_workers=None, prime_first=False, errors=None,
+                             scheduler=None, deferred=None):
+    """
+    Exécute un ensemble de prompts sur la même transcription avec un pool de workers borné
+
+    Args:
+        input_text (str): Transcription envoyée à chaque prompt
+        prompt_jobs (dict): Clé de résultat -> prompt à envoyer
+        invoke (callable): Fonction appelée comme invoke(input_text, prompt=...)
+        max_workers (int, optional): Limite de concurrence. Si None, lue depuis l'environnement
+        prime_first (bool): Exécuter le premier prompt seul avant de paralléliser les autres,
+                            pour que le préfixe transcription soit écrit dans le cache Bedrock
+                            avant que les appels suivants ne le lisent
+        errors (dict, optional): Si fourni, reçoit clé -> exception pour chaque prompt en échec
+                                 au lieu d'interrompre l'exécution (résultats partiels)
+        scheduler (DeadlineScheduler, optional): N'admet un prompt que s'il tient avant l'échéance
+                                                 et n'attend pas les appels en vol au-delà
+        deferred (list, optional): Reçoit les clés reportées par le scheduler (requis avec scheduler)
+                                   et celles dont le backoff dépasserait l'échéance
+
+    Returns:
+        dict: Résultats indexés par clé, dans l'ordre de prompt_jobs
+              (sans les clés en échec quand errors est fourni)
+
+    Raises:
+        Exception: La première erreur rencontrée, comme en exécution séquentielle, si errors est None
+    """
+    if not prompt_jobs:
+        return {}
+    if max_workers is None:
+        max_workers = get_max_concurrency()
+    max_workers = min(max_workers, len(prompt_jobs)) or 1
+
+    def run_one(key, prompt):
+        if scheduler is not None and not scheduler.admit(prompt):
+            deferred.append(key)
+            return _FAILED
+        if errors is None:
+            return invoke(input_text, prompt=prompt)
+        try:
+            return invoke(input_text, prompt=prompt)
+        except DeadlineExceededError as e:
+            if deferred is None:
+                errors[key] = e
+            else:
+                logger.warning(f"Prompt {key} reporté: {str(e)}")
+                deferred.append(key)
+            return _FAILED
+        except Exception as e:
+            logger.warning(f"Échec du prompt {key}: {str(e)}")
+            errors[key] = e
+            return _FAILED
+
+    def collect(outcomes):
+        return {key: value for key, value in outcomes if value is not _FAILED}
+
+    if max_workers == 1:
+        return collect((key, run_one(key, prompt)) for key, prompt in prompt_jobs.items())
+
+    if prime_first:
+        first_key = next(iter(prompt_jobs))
+        results = collect([(first_key, run_one(first_key, prompt_jobs[first_key]))])
+        remaining_jobs = {key: prompt for key, prompt in prompt_jobs.items() if key != first_key}
+        if remaining_jobs:
+            results.update(run_prompts_concurrently(
+                input_text, remaining_jobs, invoke, max_workers,
+                errors=errors, scheduler=scheduler, deferred=deferred
+            ))
+        return {key: results[key] for key in prompt_jobs if key in results}
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {
+        key: executor.submit(run_one, key, prompt)
+        for key, prompt in prompt_jobs.items()
+    }
+    try:
+        if scheduler is None:
+            return collect((key, future.result()) for key, future in futures.items())
+
+        # À l'échéance, les prompts non terminés sont reportés (les appels en vol ne sont pas attendus)
+        done, _ = wait(futures.values(), timeout=scheduler.remaining_seconds())
+        outcomes = []
+        for key, future in futures.items():
+            if future in done:
+                outcomes.append((key, future.result()))
+            else:
+                future.cancel()
+                deferred.append(key)
+        return collect(outcomes)
+    except Exception:
+        for future in futures.values():
+            future.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=scheduler is None, cancel_futures=True)
@@ -0,0 +1,942 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from bedrock_common.batch import estimate_item_ms, get_batch_item_concurrency, parse_batch_event
+from bedrock_common.checkpoints import IncompleteEvaluationError, create_checkpoint_store
+from bedrock_common.cleaning import clean_response
+from bedrock_common.combined import extract_json_object, is_combined_mode, run_combined_evaluation
+from bedrock_common.concurrency import get_max_concurrency, run_prompts_concurrently
+from bedrock_common.generation import DEFAULT_PROFILE
+from bedrock_common.hedging import create_hedger
+from bedrock_common.incremental import IncrementalStore, create_incremental_store
+from bedrock_common.keyword_classifier import is_keyword_classifier_enabled
+from bedrock_common.metrics import InvocationMetrics, attach_monitoring, summarize_event
+from bedrock_common.near_duplicates import create_near_duplicate_index
+from bedrock_common.prompt_registry import PromptConfigStore
+from bedrock_common.rate_limiter import estimate_request_tokens, get_admission_controller, stats_delta
+from bedrock_common.request_builder import build_request_body, extract_usage, is_prompt_caching_enabled
+from bedrock_common.result_cache import LRUStore, create_result_cache, make_cache_key
+from bedrock_common.scheduler import DeadlineScheduler, get_latency_model, order_by_priority
+from bedrock_common.startup import create_bedrock_client, warm_up
+from bedrock_common.streaming import is_streaming_enabled, read_response_stream
+from bedrock_common.suites import select_suites
+from bedrock_common.transcript import chunk_fingerprint, prepare_transcript
+
+logger = logging.getLogger()
+
+MODEL_ID = "anthropic.claude-3-5-haiku-20241022-v1:0"
+REGION_NAME = 'us-west-2'
+
+
+def load_prompts_config():
+    """Charge la configuration des prompts depuis le fichier JSON partagé par les suites"""
+    try:
+        config_path = os.path.join(os.path.dirname(__file__), 'prompts-config.json')
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return config
+    except FileNotFoundError:
+        logger.error(f"Fichier prompts-config.json non trouvé")
+        raise
+    except json.JSONDecodeError as e:
+        logger.error(f"Erreur de parsing JSON: {str(e)}")
+        raise
+
+
+def _entry_id(input_text):
+    return hashlib.sha256(input_text.encode('utf-8')).hexdigest()[:32]
+
+
+class _SuiteRun:
+    """État d'une suite pendant une invocation (résultats repris, échecs, métriques)"""
+
+    def __init__(self, suite):
+        self.suite = suite
+        self.metrics = InvocationMetrics()
+        self.checkpoint = None
+        self.completed = {}
+        self.local_results = {}
+        self.prompt_jobs = {}
+        self.results = {}
+        self.summary = None
+        self.signature = None
+        self.reused_results = {}
+        self.near_duplicate = None
+
+    def invoke_for(self, engine, scheduler=None, refresh=False):
+        """
+        invoke(input_text, prompt=...) imputant les mesures et le budget de sortie à la suite ;
+        avec un scheduler, le backoff s'arrête à l'échéance de l'invocation. Avec refresh, les
+        réponses du cache sont ignorées et remplacées (réanalyse manuelle)
+        """
+        def invoke(input_text, prompt=None, **kwargs):
+            if scheduler is not None:
+                kwargs.setdefault('remaining_ms', scheduler.remaining_ms)
+            if refresh:
+                kwargs.setdefault('refresh', True)
+            return engine.invoke(
+                input_text,
+                prompt=prompt,
+                metrics=self.metrics,
+                default_max_tokens=self.suite.default_max_tokens,
+                **kwargs
+            )
+        return invoke
+
+
+class EvaluationEngine:
+    """
+    Moteur d'évaluation commun aux lambdas Bedrock
+
+    Un seul client, un seul contrôle d'admission, un seul cache de réponses et un seul
+    pool de workers pour toutes les suites demandées par un événement : les prompts de
+    plusieurs suites sont ordonnancés ensemble sur la même transcription (le préfixe mis
+    en cache par Bedrock est écrit une fois pour toutes les suites). Chaque suite garde
+    ses métriques, son checkpoint et la forme de sortie attendue par Step Functions.
+    """
+
+    def __init__(self, client, model_id=MODEL_ID, max_concurrency=None, prompt_store=None,
+                 result_cache=None, checkpoint_store=None, hedger=None, near_duplicates=None,
+                 incremental_store=None):
+        """
+        Args:
+            client: Client bedrock-runtime (boto3, LazyClient ou stub)
+            model_id (str): Modèle par défaut, remplacé par le profil du prompt s'il en définit un
+            max_concurrency (int, optional): Appels simultanés. Par défaut BEDROCK_MAX_CONCURRENCY
+            prompt_store (PromptConfigStore, optional): Par défaut la configuration partagée
+            result_cache (ResultCache, optional): Cache des réponses Bedrock
+            checkpoint_store (CheckpointStore, optional): Résultats conservés entre les tentatives
+            hedger (HedgedInvoker, optional): Duplication des appels lents vers une route secondaire
+            near_duplicates (NearDuplicateIndex, optional): Évaluations d'appels quasi identiques
+            incremental_store (IncrementalStore, optional): États des évaluations par lots de segments.
+                Par défaut en mémoire
+        """
+        self.client = client
+        self.model_id = model_id
+        self.max_concurrency = max_concurrency or get_max_concurrency()
+        self.prompt_store = prompt_store or PromptConfigStore(load_prompts_config)
+        self.result_cache = result_cache
+        self.checkpoint_store = checkpoint_store
+        # Contrôle d'admission partagé par tous les appels au modèle (RPM/TPM, AIMD, backoff)
+        self.admission = get_admission_controller(model_id, max_concurrency=self.max_concurrency)
+        self.hedger = hedger
+        self.near_duplicates = near_duplicates
+        # À défaut de store partagé, les lots d'un appel doivent arriver sur le même conteneur
+        self.incremental_store = incremental_store or IncrementalStore(LRUStore())
+
+    def get_registry(self):
+        """Récupère les prompts compilés de la configuration courante"""
+        return self.prompt_store.get_registry()
+
+    def warm_up(self):
+        """Phase init en mode eager : configuration compilée et client Bedrock créé, sans appel réseau"""
+        return warm_up(self.client, self.prompt_store)
+
+    def invoke(self, input_text, prompt=None, clean=True, max_tokens=None, metrics=None, use_profile=True,
+               default_max_tokens=2024, prompt_key=None, remaining_ms=None, refresh=False):
+        """
+        Call Bedrock model (Anthropic Claude) with the given input and prompt
+
+        Args:
+            input_text (str): The user input text to process
+            prompt (str, optional): Custom prompt to use. If None, uses BEDROCK_PROMPT or base.bedrock_prompt
+            clean (bool): Apply clean_response to the generated content
+            max_tokens (int, optional): Override the default max_tokens
+            metrics (InvocationMetrics, optional): Records latency, token usage and cost per prompt
+            use_profile (bool): Apply the prompt's generation profile from prompts-config.json
+            default_max_tokens (int): max_tokens when neither the profile nor max_tokens sets it
+            prompt_key (str, optional): 'section.nom' key of the prompt (profile and metrics). If None,
+                                        resolved from the prompt text
+            remaining_ms (callable, optional): Time left before the invocation deadline; a backoff
+                                               that would exceed it raises DeadlineExceededError
+            refresh (bool): Ignore the cached answer and overwrite it with the new one (forced re-analysis)
+
+        Returns:
+            str: The generated content from Bedrock
+        """
+        try:
+            # Profil de génération du critère (budget, température, arrêt, validateur)
+            registry = self.get_registry()
+            bedrock_prompt = prompt or os.environ.get('BEDROCK_PROMPT') or registry.get('base.bedrock_prompt')
+            prompt_key = prompt_key or registry.key_for_prompt(bedrock_prompt)
+            profile = registry.profile(prompt_key) if use_profile else DEFAULT_PROFILE
+            model_id = profile.model_id or self.model_id
+            params = profile.request_params(default_max_tokens=default_max_tokens, max_tokens=max_tokens)
+
+            metric_key = prompt_key or 'adhoc'
+            started = time.perf_counter()
+
+            # Réponse déjà calculée pour cette transcription, ce prompt et cette version de config
+            content = None
+            cache_key = None
+            if self.result_cache is not None:
+                config_version = registry.version
+                self.result_cache.set_config_version(config_version)
+                cache_key = make_cache_key(input_text, bedrock_prompt, model_id, params, config_version)
+                content = None if refresh else self.result_cache.get(cache_key)
+                if content is not None and metrics is not None:
+                    metrics.record_prompt(metric_key, model_id, (time.perf_counter() - started) * 1000, cache_hit=True)
+
+            cleaned_content = None
+            if content is None:
+                # Transcription en tête (préfixe mis en cache), instruction du critère en dernier
+                request_body = build_request_body(input_text, bedrock_prompt, **params)
+                request = {
+                    'modelId': model_id,
+                    'contentType': "application/json",
+                    'accept': "application/json",
+                    'body': request_body.encode('utf-8'),
+                }
+
+                streaming = clean and is_streaming_enabled()
+
+                def send(client, target_model_id, cancelled=None):
+                    """Un appel sur un client et un modèle (route principale ou double de hedging)"""
+                    target_request = dict(request, modelId=target_model_id)
+                    if streaming:
+                        # Réponse nettoyée au fil du flux, lecture arrêtée dès que le validateur a sa réponse
+                        streamed = read_response_stream(
+                            client.invoke_model_with_response_stream(**target_request)['body'],
+                            profile.validator,
+                            cancelled=cancelled
+                        )
+                        if streamed is not None:
+                            streamed['model_id'] = target_model_id
+                        return streamed
+
+                    response = client.invoke_model(**target_request)
+                    # invoke_model rend la main à la réception des en-têtes, le corps est lu ensuite
+                    headers_at = time.perf_counter()
+                    if cancelled is not None and cancelled.is_set():
+                        response['body'].close()
+                        return None
+
+                    # Parse response
+                    response_body = json.loads(response['body'].read())
+                    return {
+                        'content': response_body['content'][0]['text'],
+                        'cleaned': None,
+                        'usage': extract_usage(response_body),
+                        'first_text_at': headers_at,
+                        'stopped_early': False,
+                        'model_id': target_model_id,
+                    }
+
+                # Send request (débit, concurrence adaptative et backoff gérés par le contrôleur d'admission,
+                # duplication des appels lents vers une route secondaire si BEDROCK_HEDGING)
+                admission_report = {'retries': 0}
+                admission = get_admission_controller(model_id, self.max_concurrency)
+                estimated_tokens = estimate_request_tokens(request_body, params['max_tokens'])
+                if self.hedger is not None:
+                    # Doubles et bascules admis par le même contrôleur que l'appel principal
+                    call = lambda: self.hedger.call(
+                        send, self.client, model_id, metric_key, len(input_text),
+                        admission=admission, estimated_tokens=estimated_tokens
+                    )
+                else:
+                    call = lambda: send(self.client, model_id)
+                result = admission.call(
+                    call,
+                    estimated_tokens=estimated_tokens,
+                    report=admission_report,
+                    remaining_ms=remaining_ms
+                )
+                content = result['content']
+                cleaned_content = result['cleaned']
+                usage = result['usage']
+                ttfb_ms = ((result['first_text_at'] or time.perf_counter()) - started) * 1000
+                if result['stopped_early'] and metrics is not None:
+                    metrics.increment('early_stops')
+
+                if metrics is not None:
+                    metrics.record_prompt(
+                        metric_key,
+                        result['model_id'],
+                        (time.perf_counter() - started) * 1000,
+                        ttfb_ms=ttfb_ms,
+                        usage=usage,
+                        retries=admission_report['retries']
+                    )
+
+                if cache_key is not None:
+                    self.result_cache.set(cache_key, content)
+
+            if not clean:
+                return content
+
+            if cleaned_content is None:
+                cleaned_content = clean_response(content)
+
+            # Réponse courte attendue : forme canonique, ou nouvel essai avec le profil par défaut
+            if profile.validator is not None:
+                answer = profile.validator.validate(cleaned_content)
+                if answer is None:
+                    if metrics is not None:
+                        metrics.increment('invalid_answers')
+                    logger.warning(
+                        f"Réponse invalide pour le profil {profile.name}: {cleaned_content[:80]!r}, "
+                        f"nouvel essai avec le profil par défaut"
+                    )
+                    return self.invoke(
+                        input_text,
+                        prompt=bedrock_prompt,
+                        max_tokens=max_tokens,
+                        metrics=metrics,
+                        use_profile=False,
+                        default_max_tokens=default_max_tokens,
+                        prompt_key=prompt_key,
+                        remaining_ms=remaining_ms,
+                        refresh=refresh
+                    )
+                return answer
+
+            return cleaned_content
+
+        except Exception as e:
+            logger.error(f"Error invoking Bedrock: {str(e)}")
+            raise e
+
+    def handle(self, event, context, default_suites, chunk_summaries=None):
+        """
+        Handler commun : valide l'événement, évalue les suites demandées et formate la sortie
+
+        Args:
+            event (dict): Lambda event data ('suites' optionnel : nom, liste ou 'all')
+            context: Lambda context
+            default_suites (tuple): Suites évaluées si l'événement n'en précise pas
+            chunk_summaries (dict, optional): Résumés des morceaux déjà obtenus (mode incrémental)
+
+        Returns:
+            dict: Sortie de la suite si une seule est demandée, sinon sorties indexées par suite
+        """
+        file_name_key = event.get('fileNameKey', '')
+        analysis = event.get('analysis', '')
+        try:
+            logger.info(f"Received event: {summarize_event(event)}")
+
+            input_text = event.get('originalText', '')
+            if not input_text:
+                return {
+                    'statusCode': 400,
+                    'body': 'Missing originalText in request',
+                    'fileNameKey': file_name_key,
+                }
+
+            try:
+                suites = select_suites(event, default_suites)
+            except ValueError as e:
+                return {
+                    'statusCode': 400,
+                    'body': str(e),
+                    'fileNameKey': file_name_key,
+                }
+
+            return self.evaluate(event, context, suites, chunk_summaries)
+
+        except IncompleteEvaluationError:
+            raise
+
+        except KeyError as e:
+            logger.error(f"Missing required environment variable: {str(e)}")
+            return {
+                'statusCode': 500,
+                'body': f"Configuration error: {str(e)}",
+                'fileNameKey': file_name_key,
+                'analysis': analysis,
+            }
+
+        except Exception as e:
+            logger.error(f"Error processing request: {str(e)}")
+            return {
+                'statusCode': 500,
+                'body': f"Error: {str(e)}"
+            }
+
+    def handle_batch(self, event, context, default_suites):
+        """
+        Handler batch (reprise de campagne) : plusieurs transcriptions dans une invocation
+
+        Les items partagent le client, le cache, le contrôle d'admission (débit et
+        concurrence globaux) et l'échéance de l'invocation. Un item n'est commencé que
+        si son estimation tient dans le temps restant ; les items non commencés ou à
+        retenter sont rendus dans batchItemFailures (format de réponse partielle SQS),
+        les entrées invalides (400) ne le sont pas puisqu'une nouvelle tentative échouerait.
+
+        Args:
+            event (dict): {'items': [...]} ou événement SQS {'Records': [...]}
+            context: Lambda context
+            default_suites (tuple): Suites évaluées si ni l'item ni l'événement n'en précise
+
+        Returns:
+            dict: {'results': [...], 'failures': [...], 'batchItemFailures': [...], 'summary': {...}}
+        """
+        started = time.perf_counter()
+        items, invalid = parse_batch_event(event)
+        failures = [
+            {'itemIdentifier': identifier, 'statusCode': 400, 'error': message, 'retryable': False}
+            for identifier, message in invalid
+        ]
+        registry = self.get_registry()
+        item_concurrency = min(get_batch_item_concurrency(), max(1, len(items)))
+        workers_per_item = max(1, self.max_concurrency // item_concurrency)
+        logger.info(f"Batch de {len(items)} transcriptions, {item_concurrency} en parallèle")
+
+        def run_item(identifier, item_event):
+            try:
+                suites = select_suites(item_event, default_suites)
+            except ValueError:
+                suites = []
+            if suites and item_event.get('originalText'):
+                prompt_keys = [prompt_key for suite in suites for prompt_key in suite.prompts.values()]
+                scheduler = DeadlineScheduler(context, item_event['originalText'], registry.key_for_prompt)
+                slowest_ms = max(
+                    scheduler.latency_model.estimate(prompt_key, scheduler.input_chars) for prompt_key in prompt_keys
+                )
+                needed_ms = estimate_item_ms(len(prompt_keys), workers_per_item, slowest_ms)
+                if needed_ms > scheduler.remaining_ms():
+                    logger.warning(f"Item {identifier} reporté: {needed_ms:.0f} ms estimés, échéance trop proche")
+                    return {'itemIdentifier': identifier, 'statusCode': 503,
+                            'error': 'Échéance de l\'invocation', 'retryable': True}
+            try:
+                output = self.handle(item_event, context, default_suites)
+            except IncompleteEvaluationError as e:
+                return {'itemIdentifier': identifier, 'statusCode': 206, 'error': str(e), 'retryable': True}
+            return dict(output, itemIdentifier=identifier)
+
+        with ThreadPoolExecutor(max_workers=item_concurrency) as executor:
+            futures = [executor.submit(run_item, identifier, item_event) for identifier, item_event in items]
+            outputs = [future.result() for future in futures]
+
+        results = []
+        for output in outputs:
+            if 'retryable' in output:
+                failures.append(output)
+            elif output.get('statusCode', 500) >= 400:
+                failures.append({
+                    'itemIdentifier': output['itemIdentifier'],
+                    'statusCode': output.get('statusCode', 500),
+                    'error': output.get('body'),
+                    'retryable': output.get('statusCode', 500) >= 500,
+                })
+            else:
+                results.append(output)
+
+        summary = {
+            'items': len(items) + len(invalid),
+            'succeeded': len(results),
+            'incomplete': sum(1 for output in results if output['statusCode'] == 206),
+            'failed': len(failures),
+            'handler_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        logger.info(f"Batch terminé: {json.dumps(summary)}")
+        return {
+            'results': results,
+            'failures': failures,
+            'batchItemFailures': [
+                {'itemIdentifier': failure['itemIdentifier']} for failure in failures if failure['retryable']
+            ],
+            'summary': summary,
+        }
+
+    def handle_incremental(self, event, context, default_suites):
+        """
+        Handler incrémental : évaluation d'un appel par lots de segments, pendant la transcription
+
+        Chaque lot complète l'état de l'appel (segments reçus, résumés des morceaux clos,
+        sujet et produit détectés localement), conservé dans le store incrémental. Dès que
+        l'appel dépasse le seuil map-reduce, les morceaux clos sont résumés au fil des lots ;
+        au dernier lot ('final': true), l'évaluation porte sur le même texte que handle et
+        seul le dernier morceau reste à résumer. La sortie finale est celle de lambda_handler.
+
+        Args:
+            event (dict): {'fileNameKey', 'audioSegments' (lot), 'segmentOffset' (rang du premier
+                          segment du lot, optionnel), 'final', 'suites', 'analysis'}
+            context: Lambda context
+            default_suites (tuple): Suites évaluées si l'événement n'en précise pas
+
+        Returns:
+            dict: Sortie de handle au dernier lot, sinon {'statusCode': 202, 'incremental': état provisoire}
+        """
+        file_name_key = event.get('fileNameKey', '')
+        segments = event.get('audioSegments') or []
+        if not file_name_key or not isinstance(segments, list):
+            return {
+                'statusCode': 400,
+                'body': 'Missing fileNameKey or audioSegments in request',
+                'fileNameKey': file_name_key,
+            }
+        try:
+            suites = select_suites(event, default_suites)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': str(e),
+                'fileNameKey': file_name_key,
+            }
+
+        state = self.incremental_store.load(file_name_key)
+        try:
+            added = state.append(segments, event.get('segmentOffset'))
+        except ValueError as e:
+            logger.error(f"Lot incomplet pour {file_name_key}: {str(e)}")
+            return {
+                'statusCode': 409,
+                'body': str(e),
+                'fileNameKey': file_name_key,
+            }
+        original_text = state.original_text
+
+        if event.get('final'):
+            # L'état reste enregistré tant que l'évaluation est partielle : une nouvelle tentative
+            # du dernier lot repart des mêmes segments. Un échec d'écriture n'empêche pas
+            # l'évaluation, qui porte sur les segments en mémoire.
+            self.incremental_store.save(file_name_key, state)
+            logger.info(f"Dernier lot de {file_name_key}: {len(state.segments)} segments, {len(state.summaries)} résumés repris")
+            final_event = dict(event, originalText=original_text, audioSegments=state.segments)
+            output = self.handle(final_event, context, default_suites, chunk_summaries=state.summaries)
+            if output.get('statusCode') == 200:
+                self.incremental_store.delete(file_name_key, state)
+            return output
+
+        registry = self.get_registry()
+        metrics = InvocationMetrics()
+        prepared = prepare_transcript(original_text, state.segments)
+        # Seul le dernier morceau peut encore grandir : les précédents sont résumés dès maintenant
+        closed = [
+            (index, chunk) for index, chunk in enumerate(prepared.chunks[:-1], start=1)
+            if chunk_fingerprint(chunk) not in state.summaries
+        ]
+        if closed:
+            try:
+                state.summaries.update(self._summarize(closed, registry, metrics))
+            except Exception as e:
+                logger.warning(f"Résumé anticipé des morceaux impossible, repris au dernier lot: {str(e)}")
+                metrics.increment('map_reduce_fallbacks')
+
+        # Sujet et produit provisoires, détectés localement sur la transcription partielle
+        if is_keyword_classifier_enabled():
+            for suite in suites:
+                for result_key, prompt_key in (suite.local_classification or {}).items():
+                    classifier = registry.keyword_classifiers.get(prompt_key)
+                    match = classifier.classify(original_text, record=False) if classifier else None
+                    state.criteria[result_key] = match['label'] if match else None
+
+        if not self.incremental_store.save(file_name_key, state):
+            # Lot non conservé : l'appelant doit le renvoyer (segmentOffset évite les doublons)
+            return {
+                'statusCode': 503,
+                'body': 'Incremental state could not be saved, resend the batch',
+                'fileNameKey': file_name_key,
+            }
+        progress = {
+            'segments': len(state.segments),
+            'addedSegments': added,
+            'compactTokens': prepared.compact_tokens,
+            'summarizedChunks': len(state.summaries),
+            'criteria': state.criteria,
+        }
+        metrics.annotate('incremental', progress)
+        metrics.emit('incremental')
+        return {
+            'statusCode': 202,
+            'fileNameKey': file_name_key,
+            'analysis': event.get('analysis', ''),
+            'incremental': progress,
+        }
+
+    def _prepare(self, run, registry, input_text, file_name_key, reanalysis=None):
+        """Reprend le checkpoint de la suite et résout localement ce qui peut l'être"""
+        prompt_jobs = run.suite.prompt_jobs(registry)
+
+        # Résultats des tentatives précédentes : seuls les prompts manquants sont réexécutés
+        if self.checkpoint_store is not None:
+            run.checkpoint = self.checkpoint_store.load(
+                run.suite.name, file_name_key, registry.version, input_text, reanalysis=reanalysis
+            )
+            if run.checkpoint is not None:
+                run.completed = run.checkpoint['results']
+                prompt_jobs = {key: prompt for key, prompt in prompt_jobs.items() if key not in run.completed}
+                run.metrics.increment('checkpoint_reused', len(run.completed))
+                logger.info(
+                    f"Checkpoint {run.suite.name} repris: {len(run.completed)} résultats, "
+                    f"{len(prompt_jobs)} prompts à exécuter"
+                )
+
+        # Catégories résolues localement quand elles apparaissent littéralement dans la transcription
+        if run.suite.local_classification and is_keyword_classifier_enabled():
+            for result_key, prompt_key in run.suite.local_classification.items():
+                if result_key not in prompt_jobs:
+                    continue
+                classifier = registry.keyword_classifiers.get(prompt_key)
+                match = classifier.classify(input_text) if classifier else None
+                if match is not None:
+                    logger.info(f"{result_key} résolu localement: {json.dumps(match, ensure_ascii=False)}")
+                    run.local_results[result_key] = match['label']
+                    run.metrics.increment('local_classifications')
+                    del prompt_jobs[result_key]
+
+        run.prompt_jobs = prompt_jobs
+
+    def _reuse_near_duplicate(self, run, registry):
+        """
+        Reprend les résultats d'un appel quasi identique déjà évalué pour les prompts restants ;
+        les catégories résolues localement sur la transcription courante sont conservées
+        """
+        if not run.prompt_jobs:
+            return
+        match = self.near_duplicates.lookup(f"{run.suite.name}#{registry.version}", run.signature)
+        if match is None:
+            return
+        run.near_duplicate = {
+            'fileNameKey': match['fileNameKey'],
+            'similarity': match['similarity'],
+            'reused': self.near_duplicates.reuse,
+        }
+        if not self.near_duplicates.reuse:
+            logger.info(f"Quasi-doublon de {match['fileNameKey']} ({match['similarity']}), mode shadow: évaluation complète")
+            run.metrics.increment('near_duplicate_shadow_matches')
+            return
+        run.reused_results = {key: value for key, value in match['results'].items() if key in run.prompt_jobs}
+        run.prompt_jobs = {key: prompt for key, prompt in run.prompt_jobs.items() if key not in run.reused_results}
+        run.metrics.increment('near_duplicate_reused', len(run.reused_results))
+        logger.info(
+            f"{run.suite.name}: {len(run.reused_results)} résultats repris de {match['fileNameKey']} "
+            f"(similarité {match['similarity']}), {len(run.prompt_jobs)} prompts à exécuter"
+        )
+
+    def _summarize(self, chunks, registry, metrics, refresh=False):
+        """
+        Résume des morceaux en parallèle
+
+        Le libellé ne dépend que du rang : un morceau résumé pendant la transcription (nombre
+        total inconnu) envoie le même texte qu'au dernier lot, et reste dans le cache des réponses.
+
+        Args:
+            chunks (list): (rang, morceau) à résumer
+            registry: Prompts compilés
+            metrics (InvocationMetrics): Mesures de l'invocation
+            refresh (bool): Résumés recalculés sans le cache des réponses (réanalyse manuelle)
+
+        Returns:
+            dict: Empreinte du morceau -> résumé
+        """
+        def summarize(item):
+            index, chunk = item
+            return self.invoke(
+                f"Partie {index} de la transcription :\n{chunk}",
+                prompt=registry.get('preprocessing.chunk_summary'),
+                prompt_key='preprocessing.chunk_summary',
+                clean=False,
+                metrics=metrics,
+                refresh=refresh
+            )
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(chunks))) as executor:
+            summaries = list(executor.map(summarize, chunks))
+        return {chunk_fingerprint(chunk): summary for (_, chunk), summary in zip(chunks, summaries)}
+
+    def _summarize_chunks(self, prepared, registry, metrics, summaries=None, refresh=False):
+        """
+        Étape map des transcriptions longues : les morceaux sont résumés en parallèle et les
+        prompts portent ensuite sur les résumés. En cas d'échec, ils portent sur le texte compacté.
+        Les morceaux déjà résumés pendant la transcription (summaries) ne sont pas renvoyés au modèle.
+        """
+        summaries = dict(summaries or {})
+        total = len(prepared.chunks)
+        missing = [
+            (index, chunk) for index, chunk in enumerate(prepared.chunks, start=1)
+            if chunk_fingerprint(chunk) not in summaries
+        ]
+        if len(missing) < total:
+            metrics.increment('chunk_summaries_reused', total - len(missing))
+        if missing:
+            try:
+                summaries.update(self._summarize(missing, registry, metrics, refresh))
+            except Exception as e:
+                logger.warning(f"Résumé des morceaux impossible, évaluation sur la transcription compactée: {str(e)}")
+                metrics.increment('map_reduce_fallbacks')
+                return
+        prepared.use_summaries([summaries[chunk_fingerprint(chunk)] for chunk in prepared.chunks])
+
+    def _run_prompts(self, runs, registry, input_text, scheduler, errors, deferred, refresh=False):
+        """
+        Exécute les prompts en attente de toutes les suites, résultats rangés par suite ;
+        avec refresh, sans lire le cache des réponses
+        """
+        if is_combined_mode():
+            # Un appel combiné par suite (schéma et clés objet propres à la suite), repli par prompt
+            for run in runs:
+                run.results = run_combined_evaluation(
+                    input_text,
+                    run.prompt_jobs,
+                    run.invoke_for(self, scheduler, refresh),
+                    clean_response,
+                    registry.get('combined.template'),
+                    object_keys=run.suite.object_keys,
+                    json_keys=run.suite.json_keys,
+                    validators={
+                        key: registry.profile(run.suite.prompts[key]).validator
+                        for key in run.prompt_jobs
+                        if registry.profile(run.suite.prompts[key]).validator is not None
+                    },
+                    max_workers=self.max_concurrency,
+                    errors=errors,
+                    scheduler=scheduler,
+                    deferred=deferred
+                )
+            return
+
+        # Un seul pool pour toutes les suites : les clés de résultat sont propres à chaque suite
+        run_by_prompt = {}
+        key_by_prompt = {}
+        prompt_jobs = {}
+        json_prompts = set()
+        for run in runs:
+            for key, prompt in run.prompt_jobs.items():
+                run_by_prompt.setdefault(prompt, run)
+                # Profil et métriques de la clé déclarée par la suite
+                key_by_prompt.setdefault(prompt, run.suite.prompts[key])
+                prompt_jobs[key] = prompt
+                if key in run.suite.json_keys:
+                    json_prompts.add(prompt)
+        invokers = {id(run): run.invoke_for(self, scheduler, refresh) for run in runs}
+
+        def invoke(input_text, prompt=None, **kwargs):
+            # Les objets JSON sont décodés sur la réponse brute : le nettoyage markdown les abîmerait
+            if prompt in json_prompts:
+                kwargs.setdefault('clean', False)
+            return invokers[id(run_by_prompt[prompt])](
+                input_text, prompt=prompt, prompt_key=key_by_prompt[prompt], **kwargs
+            )
+
+        # Prompts prioritaires d'abord, toutes suites confondues
+        prompt_jobs = order_by_priority(prompt_jobs, registry.key_for_prompt, registry.priorities)
+        results = run_prompts_concurrently(
+            input_text,
+            prompt_jobs,
+            invoke,
+            max_workers=self.max_concurrency,
+            prime_first=is_prompt_caching_enabled(),
+            errors=errors,
+            scheduler=scheduler,
+            deferred=deferred
+        )
+        for run in runs:
+            run.results = {key: results[key] for key in run.prompt_jobs if key in results}
+
+    def _finalize(self, run, event, registry, input_text, prompt_text, file_name_key, errors, deferred,
+                  admission_delta, hedging_delta=None):
+        """Fusionne les résultats de la suite, enregistre son checkpoint et ses métriques"""
+        suite = run.suite
+        results = run.results
+        suite_errors = {key: errors[key] for key in suite.result_keys if key in errors}
+
+        # Objet JSON extrait de la réponse (bloc ``` ou préambule tolérés) ; un objet illisible
+        # est traité comme un échec du prompt (réexécuté à la tentative suivante)
+        for key in suite.json_keys:
+            if key in results:
+                data = extract_json_object(results[key])
+                if data is None:
+                    logger.warning(f"{key} n'est pas un objet JSON valide: {results[key][:80]!r}")
+                    suite_errors[key] = ValueError(f"{key}: objet JSON invalide")
+                    del results[key]
+                else:
+                    results[key] = data
+
+        # Objet JSON rendu sous forme de texte : même sérialisation compacte en mode combiné
+        # (objet re-sérialisé) et par prompt (réponse nettoyée, mise en forme du modèle)
+        for key in suite.object_keys:
+            if key in results and key not in suite.json_keys:
+                data = extract_json_object(results[key])
+                if data is not None:
+                    results[key] = json.dumps(data, ensure_ascii=False)
+
+        results.update(run.reused_results)
+        results.update(run.local_results)
+        results.update(run.completed)
+        failed_keys = [key for key in suite.result_keys if key in suite_errors]
+        deferred_keys = [key for key in suite.result_keys if key in deferred]
+        missing_keys = failed_keys + deferred_keys
+        # Seules les évaluations complètes et obtenues du modèle servent de référence
+        if run.signature is not None and not run.reused_results and not missing_keys:
+            self.near_duplicates.add(
+                f"{suite.name}#{registry.version}", run.signature, _entry_id(input_text), file_name_key,
+                {key: results[key] for key in suite.result_keys if key in results}
+            )
+        if self.checkpoint_store is not None:
+            run.checkpoint = self.checkpoint_store.save(
+                suite.name, file_name_key, registry.version, input_text, results, missing_keys,
+                previous=run.checkpoint, reanalysis=event.get('forceReanalysis') or None
+            )
+        results = {key: results[key] for key in suite.result_keys if key in results}
+
+        # Compteurs de l'invocation, émis au format EMF et joints à la sortie
+        metrics = run.metrics
+        score_record = None
+        if suite.record_builder is not None:
+            score_record = suite.record_builder(results)
+            if score_record['invalid_fields']:
+                logger.warning(f"Scores illisibles: {score_record['invalid_fields']}")
+                metrics.increment('invalid_scores', len(score_record['invalid_fields']))
+        metrics.annotate('admission', admission_delta)
+        if hedging_delta is not None:
+            metrics.annotate('hedging', hedging_delta)
+        if self.result_cache is not None:
+            metrics.annotate('result_cache', self.result_cache.stats())
+        if self.near_duplicates is not None:
+            metrics.annotate('near_duplicates', self.near_duplicates.stats())
+        if suite.local_classification:
+            metrics.annotate('keyword_classifiers', {
+                prompt_key: classifier.stats() for prompt_key, classifier in registry.keyword_classifiers.items()
+            })
+        if failed_keys:
+            metrics.increment('failed_prompts', len(failed_keys))
+        if deferred_keys:
+            metrics.increment('deferred_prompts', len(deferred_keys))
+        summary = run.summary = metrics.emit(suite.name)
+        get_latency_model().observe_invocation(summary['prompts'], len(prompt_text))
+
+        output = {
+            'statusCode': 206 if missing_keys else 200,
+            'bedrockResult': results,
+            'fileNameKey': file_name_key,
+            'analysis': event.get('analysis', ''),
+            'incomplete': bool(missing_keys),
+            'failedKeys': failed_keys,
+            'deferredKeys': deferred_keys,
+            'monitoring': attach_monitoring(event, suite.stage, summary),
+        }
+        if run.near_duplicate is not None and run.near_duplicate['reused']:
+            # Évaluation reprise d'un appel quasi identique, signalée pour le contrôle qualité
+            output['nearDuplicate'] = run.near_duplicate
+        if score_record is not None:
+            # Relevé typé à côté du texte, enregistré et agrégé par store_response
+            output['scoreRecord'] = score_record
+        return output
+
+    def evaluate(self, event, context, suites, chunk_summaries=None):
+        """
+        Évalue les suites sur la transcription de l'événement en une seule passe
+
+        Args:
+            event (dict): Événement validé (originalText présent)
+            context: Lambda context (échéance de l'invocation)
+            suites (list): Suites à évaluer
+            chunk_summaries (dict, optional): Résumés des morceaux déjà obtenus (mode incrémental)
+
+        Returns:
+            dict: Sortie de la suite, ou {'suites': {nom: sortie}, 'monitoring': ...} pour plusieurs suites
+
+        Raises:
+            IncompleteEvaluationError: Si des prompts manquent et qu'une suite peut encore être retentée
+        """
+        input_text = event['originalText']
+        file_name_key = event.get('fileNameKey', '')
+        registry = self.get_registry()
+        admission_before = self.admission.stats()
+        hedging_before = self.hedger.stats() if self.hedger is not None else None
+
+        # Réanalyse manuelle : checkpoints des évaluations précédentes, réponses en cache et
+        # évaluations d'appels quasi identiques sont ignorés
+        reanalysis = event.get('forceReanalysis') or None
+        refresh = reanalysis is not None
+
+        runs = [_SuiteRun(suite) for suite in suites]
+        for run in runs:
+            self._prepare(run, registry, input_text, file_name_key, reanalysis)
+
+        # Appels courts quasi identiques à un appel déjà évalué (même suite, même configuration)
+        if self.near_duplicates is not None:
+            signature = self.near_duplicates.signature_for(input_text)
+            for run in runs:
+                run.signature = signature
+                if signature is not None and not refresh:
+                    self._reuse_near_duplicate(run, registry)
+
+        # Transcription compactée (ou résumée si elle est très longue) pour les prompts ; les
+        # checkpoints et la classification locale restent sur originalText
+        prepared = prepare_transcript(input_text, event.get('audioSegments'))
+        prompt_count = sum(len(run.prompt_jobs) for run in runs)
+        if prepared.chunks and prompt_count:
+            self._summarize_chunks(prepared, registry, runs[0].metrics, chunk_summaries, refresh)
+        prompt_text = prepared.text
+        transcript_report = prepared.report(prompt_count)
+        logger.info(f"Transcription préparée: {json.dumps(transcript_report)}")
+        for run in runs:
+            run.metrics.annotate('transcript', transcript_report)
+
+        # Chaque prompt n'est lancé que s'il tient dans le temps restant de l'invocation
+        scheduler = DeadlineScheduler(context, prompt_text, registry.key_for_prompt)
+        errors = {}
+        deferred = []
+        self._run_prompts(runs, registry, prompt_text, scheduler, errors, deferred, refresh)
+
+        admission_delta = stats_delta(admission_before, self.admission.stats())
+        hedging_delta = stats_delta(hedging_before, self.hedger.stats()) if self.hedger is not None else None
+        outputs = {
+            run.suite.name: self._finalize(
+                run, event, registry, input_text, prompt_text, file_name_key, errors, deferred, admission_delta,
+                hedging_delta
+            )
+            for run in runs
+        }
+
+        # Nouvelle tentative Step Functions tant qu'un checkpoint le permet, sinon résultat partiel
+        if self.checkpoint_store is not None:
+            missing_keys = []
+            retry = False
+            for run in runs:
+                output = outputs[run.suite.name]
+                suite_missing = output['failedKeys'] + output['deferredKeys']
+                missing_keys.extend(suite_missing)
+                retry = retry or (bool(suite_missing) and self.checkpoint_store.should_retry(run.checkpoint))
+            if retry:
+                attempts = max(run.checkpoint['attempts'] for run in runs)
+                raise IncompleteEvaluationError(missing_keys, attempts)
+
+        if len(runs) == 1:
+            return outputs[runs[0].suite.name]
+
+        # Bloc monitoring commun : une entrée par étape ('callMining', 'postCall')
+        monitoring = event.get('monitoring')
+        for run in runs:
+            monitoring = attach_monitoring({'monitoring': monitoring}, run.suite.stage, run.summary)
+        return {
+            'statusCode': 206 if any(output['incomplete'] for output in outputs.values()) else 200,
+            'fileNameKey': file_name_key,
+            'analysis': event.get('analysis', ''),
+            'suites': outputs,
+            'monitoring': monitoring,
+        }
+
+
+def create_engine():
+    """
+    Construit le moteur à partir de l'environnement (client, caches, checkpoints)
+
+    Returns:
+        EvaluationEngine: Moteur partagé par les invocations à chaud du conteneur
+    """
+    # Nombre d'appels Bedrock simultanés, le pool HTTP du client est dimensionné en conséquence
+    max_concurrency = get_max_concurrency()
+    return EvaluationEngine(
+        # Client créé pendant l'init en mode eager, au premier appel en mode lazy
+        create_bedrock_client(REGION_NAME, max_pool_connections=max_concurrency),
+        model_id=MODEL_ID,
+        max_concurrency=max_concurrency,
+        prompt_store=PromptConfigStore(load_prompts_config),
+        # Cache des réponses Bedrock (LRU mémoire conservé à chaud + tier persistant optionnel)
+        result_cache=create_result_cache(),
+        # Résultats partiels conservés entre les tentatives Step Functions (CHECKPOINT_TABLE)
+        checkpoint_store=create_checkpoint_store(),
+        # Appels lents dupliqués vers une autre région ou un profil d'inférence (BEDROCK_HEDGING)
+        hedger=create_hedger(REGION_NAME, max_concurrency=max_concurrency),
+        # Réutilisation des évaluations d'appels courts quasi identiques (NEAR_DUPLICATE_MODE)
+        near_duplicates=create_near_duplicate_index(),
+        # États des évaluations incrémentales entre les lots de segments (INCREMENTAL_TABLE)
+        incremental_store=create_incremental_store(),
+    )
@@ -0,0 +1,182 @@
+import re
+import unicodedata
+
+from bedrock_common.request_builder import SYSTEM_PROMPT
+
+DEFAULT_TEMPERATURE = 0.7
+DEFAULT_TOP_P = 0.999
+DEFAULT_TOP_K = 250
+
+_INTEGER_PATTERN = re.compile(r'-?\d+')
+# Dénominateur de l'échelle après la note ("4/5", "4 sur 5")
+_SCALE_PATTERN = re.compile(r'\s*(?:/|sur)\s*(\d+)')
+
+
+def normalize_answer(text):
+    """Minuscules, sans accents ni ponctuation de fin, pour comparer des réponses courtes"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return text.strip().strip('"\'«» .,;:!').lower()
+
+
+class AnswerValidator:
+    """
+    Valide une réponse courte et la ramène à sa forme canonique
+
+    Types supportés :
+        {"type": "enum", "values": ["Oui", "Non"]}
+        {"type": "integer", "min": 1, "max": 5}
+    """
+
+    def __init__(self, spec):
+        self.type = spec['type']
+        if self.type == 'enum':
+            self.choices = list(spec['values'])
+            # Les valeurs longues d'abord : "Non résolu" doit être reconnu avant "Non"
+            self.values = sorted(spec['values'], key=len, reverse=True)
+            self._patterns = [
+                (re.compile(re.escape(normalize_answer(value)) + r'\b'), value)
+                for value in self.values
+            ]
+        elif self.type == 'integer':
+            self.min = spec.get('min')
+            self.max = spec.get('max')
+        else:
+            raise ValueError(f"Type de validateur inconnu: {self.type}")
+
+    def json_schema(self):
+        """
+        Returns:
+            dict: Contrainte de format de la réponse, en JSON Schema (schéma du mode combiné)
+        """
+        if self.type == 'enum':
+            return {'type': 'string', 'enum': self.choices}
+        schema = {'type': 'integer'}
+        if self.min is not None:
+            schema['minimum'] = self.min
+        if self.max is not None:
+            schema['maximum'] = self.max
+        return schema
+
+    def validate(self, text):
+        """
+        Args:
+            text (str): Réponse nettoyée du modèle
+
+        Returns:
+            str: Forme canonique de la réponse, ou None si elle est invalide
+        """
+        if not text:
+            return None
+
+        if self.type == 'enum':
+            answer = normalize_answer(text)
+            for pattern, value in self._patterns:
+                if pattern.match(answer):
+                    return value
+            return None
+
+        # Un seul entier dans la réponse : "sur une échelle de 1 à 5, je donne 4" est ambigu
+        numbers = list(_INTEGER_PATTERN.finditer(text))
+        if not numbers:
+            return None
+        if len(numbers) > 1:
+            scale = _SCALE_PATTERN.match(text, numbers[0].end())
+            if (len(numbers) > 2 or scale is None or scale.end() != numbers[1].end()
+                    or self.max is None or int(scale.group(1)) != self.max):
+                return None
+        value = int(numbers[0].group())
+        if (self.min is not None and value < self.min) or (self.max is not None and value > self.max):
+            return None
+        return str(value)
+
+    def validate_prefix(self, text):
+        """
+        Réponse déjà acquise au vu d'un début de réponse nettoyée (streaming)
+
+        Args:
+            text (str): Préfixe définitif de la réponse nettoyée
+
+        Returns:
+            str: Forme canonique que validate() rendra quelle que soit la suite, ou None
+        """
+        if not text:
+            return None
+
+        if self.type == 'enum':
+            answer = normalize_answer(text)
+            for pattern, value in self._patterns:
+                match = pattern.match(answer)
+                if match is not None:
+                    # Un caractère suit la valeur : la frontière de mot ne dépend plus de la suite
+                    return value if match.end() < len(answer) else None
+                if normalize_answer(value).startswith(answer):
+                    # Une valeur plus longue ("Non résolu") peut encore apparaître
+                    return None
+            return None
+
+        # Entier : la suite peut toujours en citer un autre, qui rend la réponse ambiguë
+        return None
+
+
+class GenerationProfile:
+    """
+    Paramètres de génération d'un prompt (section generation_profiles de prompts-config.json)
+
+    Les champs absents reprennent les valeurs par défaut de la lambda.
+    """
+
+    def __init__(self, spec=None, name='default'):
+        spec = spec or {}
+        self.name = name
+        self.max_tokens = spec.get('max_tokens')
+        self.temperature = spec.get('temperature', DEFAULT_TEMPERATURE)
+        self.top_p = spec.get('top_p', DEFAULT_TOP_P)
+        self.top_k = spec.get('top_k', DEFAULT_TOP_K)
+        self.stop_sequences = spec.get('stop_sequences') or None
+        self.system = spec.get('system') or SYSTEM_PROMPT
+        self.model_id = spec.get('model_id')
+        self.validator = AnswerValidator(spec['validator']) if spec.get('validator') else None
+
+    def request_params(self, default_max_tokens, max_tokens=None):
+        """
+        Args:
+            default_max_tokens (int): max_tokens par défaut de la lambda
+            max_tokens (int, optional): Valeur imposée par l'appelant
+
+        Returns:
+            dict: Paramètres pour build_request_body (et pour la clé de cache)
+        """
+        params = {
+            'max_tokens': max_tokens or self.max_tokens or default_max_tokens,
+            'temperature': self.temperature,
+            'top_p': self.top_p,
+            'top_k': self.top_k,
+            'system_text': self.system,
+        }
+        if self.stop_sequences:
+            params['stop_sequences'] = self.stop_sequences
+        return params
+
+
+DEFAULT_PROFILE = GenerationProfile()
+
+
+def load_generation_profiles(config):
+    """
+    Associe chaque clé de prompt à son profil de génération
+
+    Args:
+        config (dict): Configuration complète
+
+    Returns:
+        dict: Clé 'section.nom' -> GenerationProfile
+    """
+    profiles = {
+        name: GenerationProfile(spec, name=name)
+        for name, spec in config.get('generation_profiles', {}).items()
+    }
+    return {
+        prompt_key: profiles[profile_name]
+        for prompt_key, profile_name in config.get('prompt_profiles', {}).items()
+    }
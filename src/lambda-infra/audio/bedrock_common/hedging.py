@@ -0,0 +1,439 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+from bedrock_common.rate_limiter import is_retryable_error, is_throttling_error
+from bedrock_common.scheduler import REFERENCE_CHARS
+from bedrock_common.startup import create_bedrock_client
+
+logger = logging.getLogger()
+
+DEFAULT_HEDGE_PERCENTILE = 95
+DEFAULT_MIN_HEDGE_DELAY_MS = 500
+DEFAULT_HEDGE_MAX_RATIO = 0.2
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET_SECONDS = 30
+
+# Mesures conservées par prompt, et nombre minimal avant de fixer un délai de duplication
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+
+def is_hedging_enabled():
+    """
+    Indique si les appels lents sont dupliqués vers une route secondaire (BEDROCK_HEDGING)
+
+    Returns:
+        bool: False par défaut
+    """
+    return os.environ.get('BEDROCK_HEDGING', 'false').lower() == 'true'
+
+
+def parse_hedge_targets(spec):
+    """
+    Interprète BEDROCK_HEDGE_TARGETS : routes secondaires séparées par des virgules,
+    'region' (même modèle) ou 'region=modelId', où {model} est remplacé par le modèle
+    de l'appel (par exemple 'us-east-1=us.{model}' pour le profil d'inférence inter-régions)
+
+    Args:
+        spec (str): Valeur de la variable
+
+    Returns:
+        list: Routes secondaires, dans l'ordre de préférence
+    """
+    routes = []
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        region, _, model_template = item.partition('=')
+        routes.append(Route(region.strip(), model_template.strip() or None))
+    return routes
+
+
+class Route:
+    """Région Bedrock et, éventuellement, modèle ou profil d'inférence équivalent"""
+
+    def __init__(self, region, model_template=None):
+        self.region = region
+        self.model_template = model_template
+        self.name = f"{region}/{model_template}" if model_template else region
+
+    def model_for(self, model_id):
+        if not self.model_template:
+            return model_id
+        return self.model_template.replace('{model}', model_id)
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur d'une route : ouvert après `failures` erreurs transitoires consécutives
+    (throttling, 5xx), la route est évitée pendant reset_seconds, puis un seul appel
+    d'essai est admis (semi-ouvert) ; son succès referme le disjoncteur
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failures=DEFAULT_BREAKER_FAILURES, reset_seconds=DEFAULT_BREAKER_RESET_SECONDS,
+                 clock=time.monotonic):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.opens = 0
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def available(self):
+        """
+        Returns:
+            bool: True si allow() admettrait un appel, sans consommer l'appel d'essai
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return self._clock() - self._opened_at >= self.reset_seconds
+            return not self._probing
+
+    def allow(self):
+        """
+        Returns:
+            bool: True si un appel peut être envoyé sur la route (consomme l'appel d'essai
+                  d'une route semi-ouverte : à n'appeler qu'au moment d'envoyer)
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            if self.state != self.CLOSED:
+                logger.info(f"Route Bedrock {self.name} rétablie")
+            self.state = self.CLOSED
+
+    def release(self):
+        """
+        Fin d'un appel d'essai qui ne renseigne pas sur la santé de la route (erreur non
+        transitoire, interruption) : le prochain appel sert d'essai à son tour
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._consecutive >= self.failures):
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+                self.opens += 1
+                logger.warning(
+                    f"Route Bedrock {self.name} évitée pendant {self.reset_seconds}s "
+                    f"après {self._consecutive} erreurs consécutives"
+                )
+
+
+class HedgedInvoker:
+    """
+    Appels Bedrock dupliqués vers une route secondaire quand ils tardent
+
+    Un appel est envoyé sur la première route dont le disjoncteur est fermé (bascule sur
+    la route secondaire si la région principale est évitée). S'il n'a pas répondu au
+    percentile BEDROCK_HEDGE_PERCENTILE des latences observées pour ce prompt, un double
+    part sur la route suivante ; la première réponse est gardée et l'autre est annulée
+    (flux fermé, corps non lu : botocore ne peut pas interrompre une requête en vol).
+    Une erreur transitoire bascule immédiatement sur la route suivante. Le nombre de
+    doubles est plafonné à BEDROCK_HEDGE_MAX_RATIO des appels. Doubles et bascules sont
+    des requêtes en plus de l'appel admis : elles passent par le contrôle d'admission du
+    modèle (débit RPM/TPM, concurrence) et ne partent que s'il les admet sans attendre.
+    """
+
+    def __init__(self, primary_region, routes, max_concurrency=4, percentile=DEFAULT_HEDGE_PERCENTILE,
+                 min_delay_ms=DEFAULT_MIN_HEDGE_DELAY_MS, max_ratio=DEFAULT_HEDGE_MAX_RATIO,
+                 breaker_failures=DEFAULT_BREAKER_FAILURES, breaker_reset_seconds=DEFAULT_BREAKER_RESET_SECONDS,
+                 client_factory=None, clock=time.monotonic):
+        """
+        Args:
+            primary_region (str): Région du client principal
+            routes (list): Routes secondaires (parse_hedge_targets)
+            max_concurrency (int): Taille du pool HTTP des clients secondaires
+            percentile (float): Percentile des latences au-delà duquel l'appel est dupliqué
+            min_delay_ms (float): Délai minimal avant duplication
+            max_ratio (float): Part maximale d'appels dupliqués
+            breaker_failures (int): Erreurs consécutives qui ouvrent le disjoncteur d'une route
+            breaker_reset_seconds (float): Durée pendant laquelle une route ouverte est évitée
+            client_factory (callable, optional): region -> client bedrock-runtime
+            clock (callable): Horloge des disjoncteurs
+        """
+        self.primary = Route(primary_region)
+        self.routes = [self.primary] + [route for route in routes if route.name != primary_region]
+        self.percentile = percentile
+        self.min_delay_ms = min_delay_ms
+        self.max_ratio = max_ratio
+        self.breakers = {
+            route.name: CircuitBreaker(route.name, breaker_failures, breaker_reset_seconds, clock=clock)
+            for route in self.routes
+        }
+        self._client_factory = client_factory or (
+            lambda region: create_bedrock_client(region, max_pool_connections=max_concurrency)
+        )
+        # Clients des régions secondaires, créés au premier double (remplaçables dans les benchmarks)
+        self.clients = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            'calls': 0,
+            'hedges': 0,
+            'hedge_wins': 0,
+            'failovers': 0,
+            'cancelled': 0,
+            'skipped_hedges': 0,
+        }
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def _client_for(self, route, primary_client):
+        if route.region == self.primary.region:
+            return primary_client
+        with self._lock:
+            client = self.clients.get(route.region)
+            if client is None:
+                client = self.clients[route.region] = self._client_factory(route.region)
+        return client
+
+    @staticmethod
+    def _scale(input_chars):
+        # Même normalisation que scheduler.LatencyModel
+        return 1 + input_chars / REFERENCE_CHARS
+
+    def observe(self, prompt_key, input_chars, latency_ms):
+        normalized = latency_ms / self._scale(input_chars)
+        with self._lock:
+            for key in (prompt_key, '*'):
+                self._samples.setdefault(key, deque(maxlen=LATENCY_WINDOW)).append(normalized)
+
+    def hedge_delay_ms(self, prompt_key, input_chars):
+        """
+        Returns:
+            float: Délai avant duplication pour ce prompt, None tant que les mesures manquent
+        """
+        with self._lock:
+            samples = self._samples.get(prompt_key)
+            if samples is None or len(samples) < MIN_LATENCY_SAMPLES:
+                samples = self._samples.get('*')
+            if samples is None or len(samples) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay_ms, ordered[index] * self._scale(input_chars))
+
+    def _allow_hedge(self):
+        with self._lock:
+            return self._counters['hedges'] < self.max_ratio * self._counters['calls'] + 1
+
+    def _start(self, route, send, primary_client, model_id, cancelled, outcomes, forced=False,
+               admission=None, estimated_tokens=0):
+        """
+        Envoie l'appel sur la route si son disjoncteur l'admet (forced : route principale
+        utilisée faute de mieux, quel que soit son disjoncteur)
+
+        Args:
+            admission (AdmissionController, optional): Contrôle d'admission d'une requête
+                                                       supplémentaire (double ou bascule)
+            estimated_tokens (int): Tokens estimés pour le seau TPM
+
+        Returns:
+            bool: True si l'appel est parti
+        """
+        breaker = self.breakers[route.name]
+        if not forced and not breaker.allow():
+            return False
+        if admission is not None and not admission.try_admit(estimated_tokens):
+            breaker.release()
+            return False
+        client = self._client_for(route, primary_client)
+
+        def attempt():
+            started = time.perf_counter()
+            settled = False
+            throttled = False
+            try:
+                try:
+                    result = send(client, route.model_for(model_id), cancelled)
+                except Exception as e:
+                    throttled = is_throttling_error(e)
+                    if is_retryable_error(e):
+                        breaker.record_failure()
+                        settled = True
+                    outcomes.put((route, None, e, 0.0))
+                    return
+                breaker.record_success()
+                settled = True
+                outcomes.put((route, result, None, (time.perf_counter() - started) * 1000))
+            finally:
+                # Sans verdict sur la route, l'appel d'essai d'une route semi-ouverte est rendu
+                if not settled:
+                    breaker.release()
+                if admission is not None:
+                    admission.release(throttled=throttled)
+
+        threading.Thread(target=attempt, name=f"bedrock-{route.name}", daemon=True).start()
+        return True
+
+    def call(self, send, primary_client, model_id, prompt_key, input_chars, admission=None, estimated_tokens=0):
+        """
+        Args:
+            send (callable): (client, model_id, cancelled) -> résultat ; cancelled est un
+                             threading.Event positionné quand une autre route a répondu
+            primary_client: Client de la région principale
+            model_id (str): Modèle de l'appel
+            prompt_key (str): Clé du prompt (latences observées par prompt)
+            input_chars (int): Taille de la transcription
+            admission (AdmissionController, optional): Contrôle d'admission du modèle, pour les
+                                                       requêtes au-delà du premier envoi
+            estimated_tokens (int): Tokens estimés d'une requête pour le seau TPM
+
+        Returns:
+            Résultat de send() de la première route qui répond
+
+        Raises:
+            Exception: Erreur de la dernière route essayée si aucune ne répond
+        """
+        self._count('calls')
+        # Sélection sans effet sur les disjoncteurs : l'appel d'essai d'une route semi-ouverte
+        # n'est consommé que si la route est réellement utilisée (_start)
+        routes = [route for route in self.routes if self.breakers[route.name].available()]
+        forced = not routes
+        routes = routes or [self.primary]
+
+        outcomes = queue.Queue()
+        cancelled = threading.Event()
+        started = time.perf_counter()
+        delay_ms = self.hedge_delay_ms(prompt_key, input_chars)
+
+        def start_next(index, extra=True):
+            """
+            Démarre la première route admise à partir de index ; rend l'indice suivant, None sinon
+            (extra : requête en plus de l'appel déjà admis par l'appelant)
+            """
+            while index < len(routes):
+                if self._start(routes[index], send, primary_client, model_id, cancelled, outcomes, forced=forced,
+                               admission=admission if extra else None, estimated_tokens=estimated_tokens):
+                    return index + 1
+                index += 1
+            return None
+
+        next_route = start_next(0, extra=False)
+        if next_route is None:
+            # Appels d'essai pris entre la sélection et l'envoi : la route principale quand même
+            routes = [self.primary]
+            self._start(self.primary, send, primary_client, model_id, cancelled, outcomes, forced=True)
+            next_route = 1
+        first_route = routes[next_route - 1]
+        if first_route is not self.primary:
+            self._count('failovers')
+        pending, error = 1, None
+
+        while pending:
+            timeout = None
+            if delay_ms is not None and next_route < len(routes):
+                timeout = max(0.0, delay_ms / 1000 - (time.perf_counter() - started))
+            try:
+                route, result, route_error, latency_ms = outcomes.get(timeout=timeout)
+            except queue.Empty:
+                # Pas de réponse au percentile : double sur la route suivante, une fois par appel
+                if self._allow_hedge():
+                    following = start_next(next_route)
+                    if following is not None:
+                        self._count('hedges')
+                        pending += 1
+                    else:
+                        # Routes évitées ou double refusé par le contrôle d'admission
+                        self._count('skipped_hedges')
+                    next_route = following or len(routes)
+                else:
+                    self._count('skipped_hedges')
+                delay_ms = None
+                continue
+
+            pending -= 1
+            if route_error is None:
+                cancelled.set()
+                self._count(f"wins.{route.name}")
+                if route is not first_route:
+                    self._count('hedge_wins')
+                if pending:
+                    self._count('cancelled', pending)
+                self.observe(prompt_key, input_chars, latency_ms)
+                return result
+
+            error = route_error
+            if not pending and next_route < len(routes) and is_retryable_error(route_error):
+                # Erreur transitoire sans double en vol : bascule immédiate sur la route suivante
+                following = start_next(next_route)
+                if following is not None:
+                    logger.warning(f"Erreur transitoire sur {route.name}, bascule sur {routes[following - 1].name}")
+                    self._count('failovers')
+                    pending += 1
+                next_route = following or len(routes)
+
+        raise error
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['breaker_opens'] = sum(breaker.opens for breaker in self.breakers.values())
+        return stats
+
+
+def create_hedger(primary_region, max_concurrency=4):
+    """
+    Invocateur avec duplication des appels lents, selon l'environnement
+
+    Variables:
+        BEDROCK_HEDGING: active la duplication (false par défaut)
+        BEDROCK_HEDGE_TARGETS: routes secondaires ('us-east-1', 'us-east-1=us.{model}', ...)
+        BEDROCK_HEDGE_PERCENTILE, BEDROCK_HEDGE_MIN_DELAY_MS, BEDROCK_HEDGE_MAX_RATIO
+        BEDROCK_BREAKER_FAILURES, BEDROCK_BREAKER_RESET_SECONDS
+
+    Args:
+        primary_region (str): Région du client principal
+        max_concurrency (int): Appels simultanés (pool HTTP des clients secondaires)
+
+    Returns:
+        HedgedInvoker: None si la duplication est désactivée ou sans route secondaire
+    """
+    if not is_hedging_enabled():
+        return None
+    routes = parse_hedge_targets(os.environ.get('BEDROCK_HEDGE_TARGETS', ''))
+    if not routes:
+        logger.warning("BEDROCK_HEDGING activé sans BEDROCK_HEDGE_TARGETS : pas de duplication")
+        return None
+    return HedgedInvoker(
+        primary_region,
+        routes,
+        max_concurrency=max_concurrency,
+        percentile=float(os.environ.get('BEDROCK_HEDGE_PERCENTILE', DEFAULT_HEDGE_PERCENTILE)),
+        min_delay_ms=float(os.environ.get('BEDROCK_HEDGE_MIN_DELAY_MS', DEFAULT_MIN_HEDGE_DELAY_MS)),
+        max_ratio=float(os.environ.get('BEDROCK_HEDGE_MAX_RATIO', DEFAULT_HEDGE_MAX_RATIO)),
+        breaker_failures=int(os.environ.get('BEDROCK_BREAKER_FAILURES', DEFAULT_BREAKER_FAILURES)),
+        breaker_reset_seconds=float(os.environ.get('BEDROCK_BREAKER_RESET_SECONDS', DEFAULT_BREAKER_RESET_SECONDS)),
+    )
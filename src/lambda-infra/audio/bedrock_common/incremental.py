@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import logging
+
+from bedrock_common.result_cache import DynamoDBStore, LRUStore, SQLiteStore
+
+logger = logging.getLogger()
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+# JSON d'une page de segments : un item DynamoDB est limité à 400 Ko
+DEFAULT_PAGE_BYTES = 256 * 1024
+
+
+def paginate_segments(segments, max_bytes=DEFAULT_PAGE_BYTES):
+    """
+    Découpe les segments en pages d'au plus max_bytes de JSON (un segment plus gros forme
+    sa propre page). Le découpage d'un préfixe ne dépend que de ce préfixe : un lot ajouté
+    ne modifie que la dernière page enregistrée et les suivantes.
+
+    Args:
+        segments (list): audioSegments
+        max_bytes (int): Taille maximale d'une page
+
+    Returns:
+        list: (début, fin) des segments de chaque page
+    """
+    pages = []
+    start, size = 0, 0
+    for index, segment in enumerate(segments):
+        length = len(json.dumps(segment, ensure_ascii=False).encode('utf-8')) + 1
+        if index > start and size + length > max_bytes:
+            pages.append((start, index))
+            start, size = index, 0
+        size += length
+    if start < len(segments):
+        pages.append((start, len(segments)))
+    return pages
+
+
+class IncrementalState:
+    """
+    État d'une évaluation incrémentale, complété à chaque lot de segments
+
+    Attributes:
+        segments (list): audioSegments reçus, dans l'ordre
+        summaries (dict): Empreinte d'un morceau clos -> résumé (étape map faite pendant la transcription)
+        criteria (dict): Catégories détectées localement sur la transcription partielle (provisoires)
+        saved_segments (int): Segments déjà enregistrés dans le store
+        saved_pages (int): Pages de segments déjà enregistrées
+    """
+
+    def __init__(self, segments=None, summaries=None, criteria=None):
+        self.segments = segments or []
+        self.summaries = summaries or {}
+        self.criteria = criteria or {}
+        self.saved_segments = 0
+        self.saved_pages = 0
+
+    @property
+    def original_text(self):
+        """Texte continu des segments reçus, comme la transcription de Transcribe"""
+        return ' '.join(
+            segment.get('transcript', '') for segment in self.segments if segment.get('transcript')
+        )
+
+    def append(self, segments, offset=None):
+        """
+        Ajoute un lot de segments ; un lot déjà reçu (nouvelle tentative) n'est pas dupliqué
+
+        Args:
+            segments (list): Nouveaux audioSegments
+            offset (int, optional): Rang du premier segment du lot dans l'appel. Par défaut
+                                    à la suite des segments reçus
+
+        Returns:
+            int: Segments réellement ajoutés
+
+        Raises:
+            ValueError: Si le lot commence après le dernier segment reçu (lot manquant)
+        """
+        received = len(self.segments)
+        offset = received if offset is None else offset
+        if offset > received:
+            raise ValueError(f"Segments {received} à {offset - 1} manquants")
+        added = segments[received - offset:]
+        self.segments.extend(added)
+        return len(added)
+
+    def to_dict(self):
+        """Item principal de l'état, sans les segments (enregistrés par pages)"""
+        return {
+            'segmentCount': len(self.segments),
+            'summaries': self.summaries,
+            'criteria': self.criteria,
+            'updatedAt': int(time.time()),
+        }
+
+
+class IncrementalStore:
+    """
+    États des évaluations incrémentales, conservés entre les invocations d'un même appel
+
+    Le backend est tout objet exposant get(key), set(key, value) et delete(key) sur des
+    chaînes (SQLiteStore en local, DynamoDBStore en production, LRUStore en mémoire). Un
+    état est identifié par le fileNameKey : un item principal (résumés, catégories, nombre
+    de pages) et les segments répartis en pages de taille bornée, seules les pages
+    modifiées étant réécrites à chaque lot. Les erreurs sont journalisées : une lecture
+    impossible ou incohérente donne un état vide, une écriture impossible rend False.
+    """
+
+    def __init__(self, backend, page_bytes=DEFAULT_PAGE_BYTES):
+        self.backend = backend
+        self.page_bytes = page_bytes
+
+    @staticmethod
+    def make_key(file_name_key):
+        return f"incremental#{file_name_key}"
+
+    @staticmethod
+    def make_page_key(file_name_key, page):
+        return f"incremental#{file_name_key}#segments#{page}"
+
+    def load(self, file_name_key):
+        """
+        Returns:
+            IncrementalState: État enregistré, ou état vide
+        """
+        try:
+            value = self.backend.get(self.make_key(file_name_key))
+            if value is None:
+                return IncrementalState()
+            data = json.loads(value)
+            segments = []
+            for page in range(data['pages']):
+                page_value = self.backend.get(self.make_page_key(file_name_key, page))
+                if page_value is None:
+                    raise ValueError(f"page de segments {page} absente")
+                segments.extend(json.loads(page_value))
+            if len(segments) != data['segmentCount']:
+                raise ValueError(f"{len(segments)} segments lus sur {data['segmentCount']}")
+        except Exception as e:
+            logger.warning(f"Lecture de l'état incrémental impossible: {str(e)}")
+            return IncrementalState()
+
+        state = IncrementalState(segments, data['summaries'], data['criteria'])
+        state.saved_segments = len(segments)
+        state.saved_pages = data['pages']
+        return state
+
+    def save(self, file_name_key, state):
+        """
+        Enregistre les pages contenant des segments ajoutés, puis l'item principal : celui-ci
+        ne désigne ainsi que des pages déjà écrites
+
+        Returns:
+            bool: True si l'état est enregistré
+        """
+        pages = paginate_segments(state.segments, self.page_bytes)
+        try:
+            for page, (start, end) in enumerate(pages):
+                if end > state.saved_segments:
+                    self.backend.set(
+                        self.make_page_key(file_name_key, page),
+                        json.dumps(state.segments[start:end], ensure_ascii=False),
+                    )
+            item = dict(state.to_dict(), pages=len(pages))
+            self.backend.set(self.make_key(file_name_key), json.dumps(item, ensure_ascii=False))
+        except Exception as e:
+            logger.error(f"Enregistrement de l'état incrémental de {file_name_key} impossible: {str(e)}")
+            return False
+        state.saved_segments = len(state.segments)
+        state.saved_pages = len(pages)
+        return True
+
+    def delete(self, file_name_key, state):
+        """
+        Supprime l'état d'un appel évalué : l'item principal d'abord, puis ses pages
+
+        Returns:
+            bool: True si l'état est supprimé
+        """
+        try:
+            self.backend.delete(self.make_key(file_name_key))
+            for page in range(state.saved_pages):
+                self.backend.delete(self.make_page_key(file_name_key, page))
+        except Exception as e:
+            logger.warning(f"Suppression de l'état incrémental de {file_name_key} impossible: {str(e)}")
+            return False
+        return True
+
+
+def create_incremental_store():
+    """
+    Construit le store des évaluations incrémentales à partir de l'environnement
+
+    Variables:
+        INCREMENTAL_TABLE: table DynamoDB (même schéma que le cache des réponses)
+        INCREMENTAL_SQLITE_PATH: fichier SQLite (tests, local)
+        INCREMENTAL_TTL_SECONDS: durée de conservation d'un état (défaut 24 h)
+
+    Returns:
+        IncrementalStore: Store configuré (mémoire du conteneur à défaut de table)
+    """
+    ttl_seconds = int(os.environ.get('INCREMENTAL_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+    if os.environ.get('INCREMENTAL_TABLE'):
+        backend = DynamoDBStore(os.environ['INCREMENTAL_TABLE'], ttl_seconds=ttl_seconds)
+    elif os.environ.get('INCREMENTAL_SQLITE_PATH'):
+        backend = SQLiteStore(os.environ['INCREMENTAL_SQLITE_PATH'], ttl_seconds=ttl_seconds)
+    else:
+        backend = LRUStore(max_entries=256, ttl_seconds=ttl_seconds)
+    return IncrementalStore(backend)
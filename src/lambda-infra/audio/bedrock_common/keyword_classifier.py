@@ -0,0 +1,190 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, deque
+
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_MIN_HITS = 2
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def _stem(word):
+    # Pluriel simple : "forfaits" et "forfait" doivent correspondre
+    return word[:-1] if len(word) > 3 and word.endswith(('s', 'x')) else word
+
+
+def normalize_text(text):
+    """
+    Normalise un texte pour la recherche de mots-clés : sans accents, en minuscules,
+    ponctuation et tirets remplacés par des espaces, pluriels simples retirés
+
+    Returns:
+        str: Mots normalisés séparés par un espace, encadrés d'espaces
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    words = [_stem(word) for word in _NON_WORD.split(text) if word]
+    return f" {' '.join(words)} "
+
+
+class AhoCorasick:
+    """Automate de recherche multi-motifs en un seul passage sur le texte"""
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns (dict): Motif -> valeur renvoyée à chaque occurrence
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for pattern, value in patterns.items():
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state].append(value)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text):
+        """
+        Args:
+            text (str): Texte normalisé
+
+        Yields:
+            Valeur associée à chaque motif trouvé (occurrences chevauchantes incluses)
+        """
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            yield from self._output[state]
+
+
+class KeywordClassifier:
+    """
+    Classifieur local par index de mots-clés, construit une fois à partir des
+    dictionnaires catégorie -> mots-clés de la configuration
+
+    Le libellé renvoyé est le mot-clé d'origine le plus fréquent dans la transcription.
+    La confiance est la part de ses occurrences dans l'ensemble des occurrences trouvées.
+    """
+
+    def __init__(self, groups, threshold=DEFAULT_THRESHOLD, min_hits=DEFAULT_MIN_HITS):
+        self.threshold = threshold
+        self.min_hits = min_hits
+        patterns = {}
+        for category, keywords in groups.items():
+            for keyword in keywords:
+                normalized = normalize_text(keyword)
+                if normalized.strip():
+                    patterns.setdefault(normalized, (keyword, category))
+        self._automaton = AhoCorasick(patterns)
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.local_hits = 0
+
+    def score(self, text):
+        """
+        Returns:
+            Counter: (mot-clé, catégorie) -> nombre d'occurrences
+        """
+        return Counter(self._automaton.iter_matches(normalize_text(text)))
+
+    def classify(self, text, record=True):
+        """
+        Args:
+            text (str): Transcription de l'appel
+            record (bool): Compte la tentative dans stats() (False pour un état provisoire)
+
+        Returns:
+            dict: label, category, confidence et hits si la confiance atteint le seuil, sinon None
+        """
+        counts = self.score(text)
+        result = None
+        if counts:
+            (keyword, category), hits = counts.most_common(1)[0]
+            confidence = hits / sum(counts.values())
+            if hits >= self.min_hits and confidence >= self.threshold:
+                result = {
+                    'label': keyword,
+                    'category': category,
+                    'confidence': round(confidence, 3),
+                    'hits': hits,
+                }
+
+        if record:
+            with self._lock:
+                self.attempts += 1
+                if result is not None:
+                    self.local_hits += 1
+        return result
+
+    def stats(self):
+        """
+        Returns:
+            dict: Tentatives, réponses locales (appels Bedrock évités) et taux de succès
+        """
+        with self._lock:
+            return {
+                'attempts': self.attempts,
+                'local_hits': self.local_hits,
+                'model_calls_saved': self.local_hits,
+                'hit_rate': round(self.local_hits / self.attempts, 4) if self.attempts else 0.0,
+            }
+
+
+def is_keyword_classifier_enabled():
+    """
+    KEYWORD_CLASSIFIER_ENABLED ('true' pour résoudre localement sujet et produit)
+
+    Désactivé par défaut : le libellé local est le mot-clé de la configuration, alors que le
+    modèle peut en citer deux ou préciser le produit (volume, durée). À activer après avoir
+    vérifié la précision sur un échantillon étiqueté de la campagne.
+    """
+    return os.environ.get('KEYWORD_CLASSIFIER_ENABLED', 'false').lower() == 'true'
+
+
+def build_keyword_classifiers(config):
+    """
+    Construit les classifieurs sujet et produit à partir de la configuration
+
+    Variables:
+        KEYWORD_CLASSIFIER_THRESHOLD: confiance minimale (défaut 0.6)
+        KEYWORD_CLASSIFIER_MIN_HITS: occurrences minimales du mot-clé retenu (défaut 2)
+
+    Returns:
+        dict: Clé de prompt ('categorization.identification_sujet', ...) -> KeywordClassifier
+    """
+    threshold = float(os.environ.get('KEYWORD_CLASSIFIER_THRESHOLD', DEFAULT_THRESHOLD))
+    min_hits = int(os.environ.get('KEYWORD_CLASSIFIER_MIN_HITS', DEFAULT_MIN_HITS))
+    classifiers = {}
+    if config.get('categories'):
+        classifiers['categorization.identification_sujet'] = KeywordClassifier(
+            config['categories'], threshold=threshold, min_hits=min_hits
+        )
+    if config.get('product_categories'):
+        classifiers['categorization.identification_produit'] = KeywordClassifier(
+            config['product_categories'], threshold=threshold, min_hits=min_hits
+        )
+    return classifiers
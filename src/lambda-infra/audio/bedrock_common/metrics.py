@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import random
+import threading
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'QualityPro/BedrockEvaluation')
+
+# Prix en USD par million de tokens (entrée, sortie, écriture cache, lecture cache)
+MODEL_PRICING_PER_MILLION = {
+    'anthropic.claude-3-5-haiku-20241022-v1:0': {
+        'input_tokens': 0.80,
+        'output_tokens': 4.00,
+        'cache_creation_input_tokens': 1.00,
+        'cache_read_input_tokens': 0.08,
+    },
+}
+
+TOKEN_FIELDS = (
+    'input_tokens',
+    'output_tokens',
+    'cache_read_input_tokens',
+    'cache_creation_input_tokens',
+)
+
+EVENT_TEXT_PREVIEW_CHARS = 200
+
+
+def estimate_cost(model_id, usage):
+    """
+    Args:
+        model_id (str): Identifiant du modèle Bedrock
+        usage (dict): Compteurs de tokens (extract_usage)
+
+    Returns:
+        float: Coût estimé en USD, 0 si le modèle n'a pas de tarif connu
+    """
+    pricing = MODEL_PRICING_PER_MILLION.get(model_id)
+    if not pricing and model_id.count('.') > 1:
+        # Profil d'inférence inter-régions ('us.anthropic...') : tarif du modèle sous-jacent
+        pricing = MODEL_PRICING_PER_MILLION.get(model_id.split('.', 1)[1])
+    if not pricing:
+        return 0.0
+    return sum(usage.get(field, 0) * price for field, price in pricing.items()) / 1_000_000
+
+
+def summarize_event(event):
+    """
+    Version journalisable de l'événement : les textes longs sont tronqués et
+    remplacés par leur longueur. L'événement complet n'est journalisé que pour
+    une fraction EVENT_LOG_SAMPLE_RATE des invocations (0 par défaut).
+
+    Returns:
+        str: Événement sérialisé en JSON
+    """
+    sample_rate = float(os.environ.get('EVENT_LOG_SAMPLE_RATE', 0))
+    if sample_rate and random.random() < sample_rate:
+        return json.dumps(event, ensure_ascii=False)
+
+    summary = {}
+    for key, value in event.items():
+        if isinstance(value, str) and len(value) > EVENT_TEXT_PREVIEW_CHARS:
+            summary[key] = f"{value[:EVENT_TEXT_PREVIEW_CHARS]}… ({len(value)} caractères)"
+        elif isinstance(value, (dict, list)):
+            summary[key] = f"<{type(value).__name__} {len(value)} éléments>"
+        else:
+            summary[key] = value
+    return json.dumps(summary, ensure_ascii=False)
+
+
+def _emf_record(dimensions, metrics, properties=None):
+    """Construit une ligne au format CloudWatch Embedded Metric Format"""
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [
+                {
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [list(dimensions)],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in metrics.items()],
+                }
+            ],
+        },
+    }
+    record.update(dimensions)
+    record.update({name: value for name, (value, _) in metrics.items()})
+    record.update(properties or {})
+    return json.dumps(record, ensure_ascii=False)
+
+
+class InvocationMetrics:
+    """
+    Mesures d'une invocation : une entrée par prompt (latence, TTFB, tokens, coût,
+    nouvelles tentatives, cache) et un résumé pour le handler (thread-safe)
+    """
+
+    def __init__(self, function_name=None):
+        self.function_name = function_name or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')
+        self.started = time.perf_counter()
+        self.prompts = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def record_prompt(self, prompt_key, model_id, wall_ms, ttfb_ms=None, usage=None,
+                      retries=0, cache_hit=False):
+        """
+        Enregistre un appel (ou une réponse servie par le cache) pour un prompt
+
+        Args:
+            prompt_key (str): Clé du prompt ('conversation_analysis.resume_general', ...)
+            model_id (str): Identifiant du modèle
+            wall_ms (float): Durée totale de l'appel
+            ttfb_ms (float, optional): Délai avant le premier octet de réponse
+            usage (dict, optional): Compteurs de tokens de la réponse
+            retries (int): Nouvelles tentatives effectuées
+            cache_hit (bool): Réponse servie par le cache de résultats
+        """
+        usage = usage or {}
+        entry = {
+            'model_id': model_id,
+            'wall_ms': round(wall_ms, 1),
+            'ttfb_ms': round(ttfb_ms, 1) if ttfb_ms is not None else None,
+            'retries': retries,
+            'cache_hit': cache_hit,
+            'cost_usd': round(estimate_cost(model_id, usage), 6),
+        }
+        entry.update({field: usage.get(field, 0) for field in TOKEN_FIELDS})
+        with self._lock:
+            # Une clé peut être appelée deux fois (repli du profil de génération) : on cumule
+            previous = self.prompts.get(prompt_key)
+            if previous is not None:
+                for field in ('wall_ms', 'retries', 'cost_usd') + TOKEN_FIELDS:
+                    entry[field] = round(entry[field] + previous[field], 6)
+                entry['calls'] = previous['calls'] + 1
+            else:
+                entry['calls'] = 1
+            self.prompts[prompt_key] = entry
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def annotate(self, name, value):
+        """Joint une valeur au résumé (statistiques du cache, de l'admission, ...)"""
+        with self._lock:
+            self.counters[name] = value
+
+    def summary(self):
+        """
+        Returns:
+            dict: Résumé de l'invocation, joint à la sortie du handler sous 'monitoring'
+        """
+        with self._lock:
+            prompts = {key: dict(entry) for key, entry in self.prompts.items()}
+            counters = dict(self.counters)
+        totals = {field: sum(entry[field] for entry in prompts.values()) for field in TOKEN_FIELDS}
+        return {
+            'handler_ms': round((time.perf_counter() - self.started) * 1000, 1),
+            'model_calls': sum(entry['calls'] for entry in prompts.values() if not entry['cache_hit']),
+            'cache_hits': sum(1 for entry in prompts.values() if entry['cache_hit']),
+            'retries': sum(entry['retries'] for entry in prompts.values()),
+            'cost_usd': round(sum(entry['cost_usd'] for entry in prompts.values()), 6),
+            'tokens': totals,
+            'counters': counters,
+            'prompts': prompts,
+        }
+
+    def emit(self, suite):
+        """
+        Écrit les métriques sur stdout au format EMF (une ligne par prompt et une pour le handler)
+
+        Args:
+            suite (str): Nom de la suite évaluée, utilisé comme dimension
+
+        Returns:
+            dict: Résumé de l'invocation
+        """
+        summary = self.summary()
+        for prompt_key, entry in summary['prompts'].items():
+            print(_emf_record(
+                {'FunctionName': self.function_name, 'Suite': suite, 'Prompt': prompt_key},
+                {
+                    'PromptLatency': (entry['wall_ms'], 'Milliseconds'),
+                    'PromptTimeToFirstByte': (entry['ttfb_ms'] or 0, 'Milliseconds'),
+                    'InputTokens': (entry['input_tokens'], 'Count'),
+                    'OutputTokens': (entry['output_tokens'], 'Count'),
+                    'CacheReadTokens': (entry['cache_read_input_tokens'], 'Count'),
+                    'CacheWriteTokens': (entry['cache_creation_input_tokens'], 'Count'),
+                    'Retries': (entry['retries'], 'Count'),
+                    'ResultCacheHit': (int(entry['cache_hit']), 'Count'),
+                    'CostUSD': (entry['cost_usd'], 'None'),
+                },
+                {'ModelId': entry['model_id']},
+            ))
+        print(_emf_record(
+            {'FunctionName': self.function_name, 'Suite': suite},
+            {
+                'HandlerLatency': (summary['handler_ms'], 'Milliseconds'),
+                'ModelCalls': (summary['model_calls'], 'Count'),
+                'ResultCacheHits': (summary['cache_hits'], 'Count'),
+                'Retries': (summary['retries'], 'Count'),
+                'CostUSD': (summary['cost_usd'], 'None'),
+                'InputTokens': (summary['tokens']['input_tokens'], 'Count'),
+                'OutputTokens': (summary['tokens']['output_tokens'], 'Count'),
+                'HedgedCalls': (summary['counters'].get('hedging', {}).get('hedges', 0), 'Count'),
+                'HedgeWins': (summary['counters'].get('hedging', {}).get('hedge_wins', 0), 'Count'),
+            },
+            {'Counters': summary['counters']},
+        ))
+        return summary
+
+
+def attach_monitoring(event, stage, summary):
+    """
+    Ajoute le résumé des métriques au bloc monitoring reçu de Step Functions,
+    sans modifier l'événement d'origine (format attendu par store_response)
+
+    Args:
+        event (dict): Événement reçu par le handler
+        stage (str): Clé sous monitoring.bedrock ('callMining', 'postCall')
+        summary (dict): Résumé de InvocationMetrics
+
+    Returns:
+        dict: Nouveau bloc monitoring
+    """
+    monitoring = dict(event.get('monitoring') or {})
+    bedrock = dict(monitoring.get('bedrock') or {})
+    stage_entry = dict(bedrock.get(stage) or {})
+    stage_entry['metrics'] = summary
+    bedrock[stage] = stage_entry
+    monitoring['bedrock'] = bedrock
+    return monitoring
@@ -0,0 +1,295 @@
+import os
+import json
+import random
+import hashlib
+import logging
+import threading
+
+from bedrock_common.keyword_classifier import normalize_text as normalize_words
+from bedrock_common.result_cache import DynamoDBStore, LRUStore, SQLiteStore
+from bedrock_common.transcript import estimate_tokens, normalize_text
+
+logger = logging.getLogger()
+
+MODES = ('off', 'shadow', 'reuse')
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_MAX_TOKENS = 1500
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+# Signature MinHash de 64 valeurs découpée en 8 bandes de 8 : deux transcriptions partagent
+# un seau avec une probabilité 1-(1-J^8)^8 (99 % à J=0,9, 17 % à J=0,5)
+NUM_PERM = 64
+BANDS = 8
+SHINGLE_SIZE = 3
+# En dessous, la similarité estimée n'a pas de sens (appel vide ou quasi vide)
+MIN_SHINGLES = 10
+# Entrées conservées par seau : les plus récentes suffisent à trouver un appel type
+MAX_BUCKET_ENTRIES = 16
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def get_near_duplicate_mode():
+    """
+    Returns:
+        str: NEAR_DUPLICATE_MODE : 'off' (défaut), 'shadow' (recherche et journalisation
+             seulement) ou 'reuse' (réutilise l'évaluation d'un appel quasi identique)
+    """
+    mode = os.environ.get('NEAR_DUPLICATE_MODE', 'off').lower()
+    return mode if mode in MODES else 'off'
+
+
+def get_similarity_threshold():
+    """
+    Returns:
+        float: Similarité de Jaccard estimée à partir de laquelle deux transcriptions sont
+               considérées comme quasi identiques (NEAR_DUPLICATE_THRESHOLD)
+    """
+    return float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', DEFAULT_THRESHOLD))
+
+
+def get_max_tokens():
+    """
+    Returns:
+        int: Taille maximale des transcriptions indexées (NEAR_DUPLICATE_MAX_TOKENS) : les
+             appels courts et répétitifs sont visés, les longs appels sont toujours évalués
+    """
+    return int(os.environ.get('NEAR_DUPLICATE_MAX_TOKENS', DEFAULT_MAX_TOKENS))
+
+
+def shingle_text(text):
+    """
+    Triplets de mots de la transcription normalisée : hésitations et bruit retirés, sans
+    accents ni ponctuation, chiffres masqués (numéros, montants, horodatages)
+
+    Args:
+        text (str): Transcription
+
+    Returns:
+        set: Triplets de mots
+    """
+    words = [
+        '#' if word.isdigit() else word
+        for word in normalize_words(normalize_text(text or '')).split()
+    ]
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[index:index + SHINGLE_SIZE]) for index in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+class MinHasher:
+    """Signatures MinHash : permutations (a*x+b) mod p sur un hash 64 bits de chaque triplet"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingles):
+        """
+        Args:
+            shingles (set): Triplets de mots
+
+        Returns:
+            list: num_perm valeurs minimales (entiers 32 bits)
+        """
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+            for shingle in shingles
+        ]
+        return [
+            min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashes)
+            for a, b in self.permutations
+        ]
+
+
+def estimate_similarity(signature, other):
+    """Similarité de Jaccard estimée : part des valeurs MinHash identiques"""
+    if not signature or len(signature) != len(other):
+        return 0.0
+    return sum(1 for a, b in zip(signature, other) if a == b) / len(signature)
+
+
+def band_keys(signature, bands=BANDS):
+    """
+    Args:
+        signature (list): Signature MinHash
+        bands (int): Nombre de bandes
+
+    Returns:
+        list: Une clé de seau LSH par bande
+    """
+    rows = len(signature) // bands
+    return [
+        f"{band}:" + hashlib.blake2b(
+            ','.join(str(value) for value in signature[band * rows:(band + 1) * rows]).encode('ascii'),
+            digest_size=8,
+        ).hexdigest()
+        for band in range(bands)
+    ]
+
+
+class NearDuplicateIndex:
+    """
+    Index LSH des transcriptions déjà évaluées, pour réutiliser l'évaluation d'un appel
+    quasi identique (décroché de SVI, faux numéro, consultation de solde...)
+
+    Le backend est tout objet exposant get(key) et set(key, value) sur des chaînes
+    (LRUStore en mémoire, SQLiteStore en local, DynamoDBStore en production). Chaque
+    seau LSH liste les empreintes des entrées récentes ; une entrée garde la signature
+    et les résultats de la suite. Les index sont séparés par suite et par version de
+    configuration. Les erreurs du backend sont journalisées et traitées comme des absences.
+    """
+
+    def __init__(self, backend, mode='reuse', threshold=DEFAULT_THRESHOLD, max_tokens=DEFAULT_MAX_TOKENS,
+                 hasher=None):
+        self.backend = backend
+        self.mode = mode
+        self.threshold = threshold
+        self.max_tokens = max_tokens
+        self.hasher = hasher or MinHasher()
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'candidates': 0, 'matches': 0, 'added': 0, 'skipped': 0, 'errors': 0}
+
+    @property
+    def reuse(self):
+        """True si les évaluations trouvées remplacent les appels au modèle (sinon mode shadow)"""
+        return self.mode == 'reuse'
+
+    def _count(self, counter, value=1):
+        with self._lock:
+            self._stats[counter] += value
+
+    def signature_for(self, text):
+        """
+        Returns:
+            list: Signature MinHash de la transcription, ou None si elle est trop longue
+                  ou trop courte pour être comparée
+        """
+        if estimate_tokens(text) > self.max_tokens:
+            self._count('skipped')
+            return None
+        shingles = shingle_text(text)
+        if len(shingles) < MIN_SHINGLES:
+            self._count('skipped')
+            return None
+        return self.hasher.signature(shingles)
+
+    def _get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Lecture de l'index des quasi-doublons impossible: {str(e)}")
+            self._count('errors')
+            return None
+        return json.loads(value) if value is not None else None
+
+    def lookup(self, namespace, signature):
+        """
+        Cherche l'entrée la plus proche parmi celles qui partagent un seau LSH
+
+        Args:
+            namespace (str): Suite et version de configuration
+            signature (list): Signature de signature_for
+
+        Returns:
+            dict: {'entryId', 'fileNameKey', 'similarity', 'results'} ou None
+        """
+        self._count('lookups')
+        entry_ids = []
+        for key in band_keys(signature):
+            for entry_id in self._get(f"nearduplicate#{namespace}#bucket#{key}") or []:
+                if entry_id not in entry_ids:
+                    entry_ids.append(entry_id)
+        self._count('candidates', len(entry_ids))
+
+        best = None
+        for entry_id in entry_ids:
+            entry = self._get(f"nearduplicate#{namespace}#entry#{entry_id}")
+            if entry is None:
+                continue
+            similarity = estimate_similarity(signature, entry['signature'])
+            if similarity >= self.threshold and (best is None or similarity > best['similarity']):
+                best = {
+                    'entryId': entry_id,
+                    'fileNameKey': entry.get('fileNameKey', ''),
+                    'similarity': round(similarity, 4),
+                    'results': entry['results'],
+                }
+        if best is not None:
+            self._count('matches')
+        return best
+
+    def add(self, namespace, signature, entry_id, file_name_key, results):
+        """
+        Indexe une évaluation complète
+
+        Args:
+            namespace (str): Suite et version de configuration
+            signature (list): Signature de la transcription évaluée
+            entry_id (str): Empreinte de la transcription
+            file_name_key (str): Fichier évalué (traçabilité des réutilisations)
+            results (dict): bedrockResult de la suite
+        """
+        try:
+            self.backend.set(
+                f"nearduplicate#{namespace}#entry#{entry_id}",
+                json.dumps({'signature': signature, 'fileNameKey': file_name_key, 'results': results},
+                           ensure_ascii=False),
+            )
+            # Lecture puis écriture de chaque seau : une écriture concurrente peut perdre une
+            # entrée, qui sera indexée par le prochain appel semblable
+            for key in band_keys(signature):
+                bucket_key = f"nearduplicate#{namespace}#bucket#{key}"
+                value = self.backend.get(bucket_key)
+                entry_ids = [item for item in (json.loads(value) if value else []) if item != entry_id]
+                entry_ids.append(entry_id)
+                self.backend.set(bucket_key, json.dumps(entry_ids[-MAX_BUCKET_ENTRIES:]))
+        except Exception as e:
+            logger.warning(f"Écriture de l'index des quasi-doublons impossible: {str(e)}")
+            self._count('errors')
+            return
+        self._count('added')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['match_rate'] = round(stats['matches'] / stats['lookups'], 4) if stats['lookups'] else 0.0
+        return stats
+
+
+def create_near_duplicate_index():
+    """
+    Construit l'index des quasi-doublons à partir de l'environnement
+
+    Variables:
+        NEAR_DUPLICATE_MODE: 'off' (défaut), 'shadow' ou 'reuse'
+        NEAR_DUPLICATE_THRESHOLD: similarité minimale (défaut 0.9)
+        NEAR_DUPLICATE_MAX_TOKENS: taille maximale des transcriptions indexées
+        NEAR_DUPLICATE_TABLE: table DynamoDB (même schéma que le cache des réponses)
+        NEAR_DUPLICATE_SQLITE_PATH: fichier SQLite (tests, local)
+        NEAR_DUPLICATE_TTL_SECONDS: durée de conservation des entrées (défaut 30 jours)
+
+    Returns:
+        NearDuplicateIndex: Index configuré (mémoire du conteneur à défaut de table), ou None si désactivé
+    """
+    mode = get_near_duplicate_mode()
+    if mode == 'off':
+        return None
+
+    ttl_seconds = int(os.environ.get('NEAR_DUPLICATE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+    if os.environ.get('NEAR_DUPLICATE_TABLE'):
+        backend = DynamoDBStore(os.environ['NEAR_DUPLICATE_TABLE'], ttl_seconds=ttl_seconds)
+    elif os.environ.get('NEAR_DUPLICATE_SQLITE_PATH'):
+        backend = SQLiteStore(os.environ['NEAR_DUPLICATE_SQLITE_PATH'], ttl_seconds=ttl_seconds)
+    else:
+        backend = LRUStore(max_entries=4096, ttl_seconds=ttl_seconds)
+    return NearDuplicateIndex(
+        backend,
+        mode=mode,
+        threshold=get_similarity_threshold(),
+        max_tokens=get_max_tokens(),
+    )
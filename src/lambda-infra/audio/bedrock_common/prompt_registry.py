@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from bedrock_common.generation import DEFAULT_PROFILE, load_generation_profiles
+from bedrock_common.keyword_classifier import build_keyword_classifiers
+
+logger = logging.getLogger()
+
+DEFAULT_RELOAD_TTL_SECONDS = 300
+# Versions compilées gardées en mémoire : la courante et la précédente (appels en cours
+# pendant un rechargement)
+MAX_COMPILED_VERSIONS = 2
+
+# Prompts construits à partir d'un template et des listes de la configuration
+DYNAMIC_PROMPTS = {
+    'identification_sujet': 'identification_sujet_template',
+    'identification_produit': 'identification_produit_template',
+}
+
+
+def _format_keyword_list(groups):
+    """Formate un dictionnaire catégorie -> mots-clés en lignes 'Titre: mot1, mot2'"""
+    return '\n'.join(
+        f"{name.replace('_', ' ').title()}: {', '.join(keywords)}"
+        for name, keywords in groups.items()
+    )
+
+
+def _format_examples(examples):
+    return '\n'.join(f"* {example}" for example in examples)
+
+
+def build_dynamic_prompt(template_key, config):
+    """
+    Construit dynamiquement les prompts en utilisant les catégories du JSON
+
+    Args:
+        template_key (str): Clé du template ('identification_sujet' ou 'identification_produit')
+        config (dict): Configuration complète
+
+    Returns:
+        str: Prompt complet avec les catégories intégrées
+    """
+    prompts = config['prompts']['categorization']
+
+    if template_key == 'identification_sujet':
+        return prompts['identification_sujet_template'].format(
+            categories_list=_format_keyword_list(config['categories']),
+            examples=_format_examples(config['examples']['subject_classification'])
+        )
+
+    elif template_key == 'identification_produit':
+        return prompts['identification_produit_template'].format(
+            product_categories_list=_format_keyword_list(config['product_categories']),
+            product_examples=_format_examples(config['examples']['product_identification'])
+        )
+
+    return None
+
+
+class PromptRegistry:
+    """
+    Prompts compilés d'une version de configuration : chaque clé 'section.nom'
+    pointe vers le texte final, prêt à être envoyé
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.version = config.get('metadata', {}).get('version')
+        self.prompts = {}
+        for section, entries in config['prompts'].items():
+            for name, text in entries.items():
+                self.prompts[f"{section}.{name}"] = text
+        categorization = config['prompts'].get('categorization', {})
+        for name, template_key in DYNAMIC_PROMPTS.items():
+            if template_key in categorization:
+                self.prompts[f"categorization.{name}"] = build_dynamic_prompt(name, config)
+
+        # Clé d'origine de chaque texte compilé (dimension des métriques)
+        self._keys_by_prompt = {}
+        for key, text in self.prompts.items():
+            self._keys_by_prompt.setdefault(text, key)
+
+        # Index de mots-clés des prompts de catégorisation (réponse locale sans Bedrock)
+        self.keyword_classifiers = build_keyword_classifiers(config)
+
+        # Ordre d'exécution sous contrainte d'échéance (1 = le plus important)
+        self.priorities = config.get('prompt_priorities', {})
+
+        # Profils de génération par clé 'section.nom'
+        self.profiles = load_generation_profiles(config)
+
+    def get(self, key):
+        """
+        Args:
+            key (str): Clé 'section.nom', par exemple 'conversation_analysis.resume_general'
+
+        Returns:
+            str: Prompt compilé
+
+        Raises:
+            KeyError: Si la clé n'existe pas dans la configuration
+        """
+        return self.prompts[key]
+
+    def __getitem__(self, key):
+        return self.prompts[key]
+
+    def profile(self, key):
+        """
+        Args:
+            key (str): Clé 'section.nom' du prompt
+
+        Returns:
+            GenerationProfile: Profil associé au prompt, ou le profil par défaut
+        """
+        return self.profiles.get(key, DEFAULT_PROFILE)
+
+    def profile_for_prompt(self, prompt):
+        """
+        Profil d'un prompt dont seul le texte est connu (prompt passé par l'appelant)
+
+        Args:
+            prompt (str): Texte compilé d'un prompt
+
+        Returns:
+            GenerationProfile: Profil de la clé d'origine du texte, ou le profil par défaut
+        """
+        return self.profile(self.key_for_prompt(prompt))
+
+    def key_for_prompt(self, prompt):
+        """
+        Args:
+            prompt (str): Texte compilé d'un prompt
+
+        Returns:
+            str: Clé 'section.nom' du prompt, ou None pour un prompt construit à la volée
+        """
+        return self._keys_by_prompt.get(prompt)
+
+
+# Registres compilés, mémorisés par metadata.version (les plus récemment utilisés)
+_registries_by_version = OrderedDict()
+_registries_lock = threading.Lock()
+
+
+def compile_registry(config):
+    """
+    Compile la configuration, une seule fois par metadata.version
+
+    Seules les MAX_COMPILED_VERSIONS dernières versions utilisées restent en mémoire :
+    un conteneur à chaud qui recharge sa configuration ne cumule pas les registres.
+
+    Args:
+        config (dict): Configuration complète
+
+    Returns:
+        PromptRegistry: Registre compilé
+    """
+    version = config.get('metadata', {}).get('version')
+    with _registries_lock:
+        registry = _registries_by_version.get(version)
+        if registry is None:
+            registry = PromptRegistry(config)
+            _registries_by_version[version] = registry
+            logger.info(f"Prompts compilés pour la version {version}")
+            while len(_registries_by_version) > MAX_COMPILED_VERSIONS:
+                _registries_by_version.popitem(last=False)
+        else:
+            _registries_by_version.move_to_end(version)
+        return registry
+
+
+def _parse_s3_uri(uri):
+    bucket, _, key = uri[len('s3://'):].partition('/')
+    return bucket, key
+
+
+class PromptConfigStore:
+    """
+    Source de la configuration des prompts
+
+    La configuration locale est chargée au premier accès. Si PROMPTS_CONFIG_S3_URI est
+    défini, l'objet S3 est relu au plus une fois toutes les PROMPTS_CONFIG_TTL_SECONDS
+    secondes avec un GET conditionnel (If-None-Match) : tant qu'il n'a pas changé,
+    aucun parsing ni recompilation n'a lieu.
+    """
+
+    def __init__(self, local_loader, s3_uri=None, ttl_seconds=None, s3_client=None):
+        self.local_loader = local_loader
+        self.s3_uri = s3_uri if s3_uri is not None else os.environ.get('PROMPTS_CONFIG_S3_URI')
+        if ttl_seconds is None:
+            ttl_seconds = int(os.environ.get('PROMPTS_CONFIG_TTL_SECONDS', DEFAULT_RELOAD_TTL_SECONDS))
+        self.ttl_seconds = ttl_seconds
+        self._s3_client = s3_client
+        self._registry = None
+        self._etag = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def s3_client(self):
+        if self._s3_client is None:
+            import boto3
+            self._s3_client = boto3.client('s3')
+        return self._s3_client
+
+    def get_registry(self):
+        """
+        Returns:
+            PromptRegistry: Registre compilé de la configuration courante
+        """
+        registry = self._registry
+        if registry is not None and (not self.s3_uri or time.time() < self._next_check):
+            return registry
+
+        with self._lock:
+            if self._registry is None:
+                self._registry = compile_registry(self.local_loader())
+            if self.s3_uri and time.time() >= self._next_check:
+                self._refresh_from_s3()
+                self._next_check = time.time() + self.ttl_seconds
+            return self._registry
+
+    def _refresh_from_s3(self):
+        from botocore.exceptions import ClientError
+
+        bucket, key = _parse_s3_uri(self.s3_uri)
+        request = {'Bucket': bucket, 'Key': key}
+        if self._etag:
+            request['IfNoneMatch'] = self._etag
+        try:
+            response = self.s3_client.get_object(**request)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+                return
+            logger.warning(f"Rechargement de la configuration depuis {self.s3_uri} impossible: {str(e)}")
+            return
+        except Exception as e:
+            logger.warning(f"Rechargement de la configuration depuis {self.s3_uri} impossible: {str(e)}")
+            return
+
+        try:
+            config = json.loads(response['Body'].read())
+        except json.JSONDecodeError as e:
+            logger.error(f"Erreur de parsing JSON de la configuration distante: {str(e)}")
+            return
+
+        self._etag = response.get('ETag')
+        registry = compile_registry(config)
+        if registry is not self._registry:
+            logger.info(f"Configuration des prompts rechargée depuis S3 (version {registry.version})")
+        self._registry = registry
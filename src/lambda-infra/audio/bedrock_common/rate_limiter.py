@@ -0,0 +1,379 @@
+import os
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger()
+
+DEFAULT_REQUESTS_PER_MINUTE = 200
+DEFAULT_TOKENS_PER_MINUTE = 400000
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE_SECONDS = 0.5
+DEFAULT_BACKOFF_MAX_SECONDS = 20.0
+
+# Codes d'erreur Bedrock qui justifient un nouvel essai
+RETRYABLE_ERROR_CODES = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ServiceUnavailableException',
+    'InternalServerException',
+    'ModelNotReadyException',
+    'ModelTimeoutException',
+}
+THROTTLING_ERROR_CODES = {'ThrottlingException', 'TooManyRequestsException'}
+# Erreurs réseau botocore, identifiées par nom pour ne pas importer botocore ici
+RETRYABLE_EXCEPTION_NAMES = {'ReadTimeoutError', 'ConnectTimeoutError', 'EndpointConnectionError'}
+
+
+class DeadlineExceededError(Exception):
+    """
+    Levée quand le prochain essai après backoff dépasserait l'échéance de l'invocation :
+    le prompt est reporté (nouvelle tentative Step Functions) au lieu de dormir jusqu'au timeout
+    """
+
+
+def _error_details(error):
+    response = getattr(error, 'response', None) or {}
+    code = response.get('Error', {}).get('Code')
+    status = response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return code, status
+
+
+def is_throttling_error(error):
+    code, status = _error_details(error)
+    return code in THROTTLING_ERROR_CODES or status == 429
+
+
+def is_retryable_error(error):
+    """
+    Args:
+        error (Exception): Erreur levée par invoke_model
+
+    Returns:
+        bool: True pour un throttling, une erreur 5xx ou une erreur réseau transitoire
+    """
+    if type(error).__name__ in RETRYABLE_EXCEPTION_NAMES:
+        return True
+    code, status = _error_details(error)
+    return code in RETRYABLE_ERROR_CODES or status == 429 or (status is not None and status >= 500)
+
+
+def estimate_request_tokens(request_body, max_tokens):
+    """
+    Estime les tokens décomptés par le quota TPM : entrée (~4 caractères par token)
+    plus max_tokens, réservé par Bedrock au moment de la requête
+    """
+    return len(request_body) // 4 + max_tokens
+
+
+class TokenBucket:
+    """Seau à jetons rechargé en continu à rate_per_minute, capacité d'une minute"""
+
+    def __init__(self, rate_per_minute, clock=time.monotonic):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self._available = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._available = min(self.capacity, self._available + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def reserve(self, amount):
+        """
+        Réserve amount jetons, éventuellement à découvert
+
+        Returns:
+            float: Durée à attendre (secondes) avant de pouvoir envoyer la requête
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self._available -= amount
+            if self._available >= 0:
+                return 0.0
+            return -self._available / self.rate_per_second
+
+    def try_reserve(self, amount):
+        """
+        Réserve amount jetons seulement s'ils sont disponibles tout de suite
+
+        Returns:
+            bool: True si les jetons sont réservés
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._available < amount:
+                return False
+            self._available -= amount
+            return True
+
+    def refund(self, amount):
+        """Rend des jetons réservés pour une requête finalement non envoyée"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self._available = min(self.capacity, self._available + amount)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limite de requêtes en vol ajustée en AIMD : +1 après `limit` succès consécutifs,
+    divisée par deux à chaque throttling
+    """
+
+    def __init__(self, initial_limit, min_limit=1, max_limit=None):
+        self.min_limit = min_limit
+        self.max_limit = max_limit or initial_limit
+        self.limit = max(min_limit, min(initial_limit, self.max_limit))
+        self.in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Returns:
+            float: Temps passé à attendre une place (secondes)
+        """
+        started = time.monotonic()
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+        return time.monotonic() - started
+
+    def try_acquire(self):
+        """
+        Returns:
+            bool: True si une place est prise sans attendre
+        """
+        with self._condition:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, throttled=False):
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self._successes = 0
+                self.limit = max(self.min_limit, self.limit // 2)
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self._successes = 0
+                    self.limit += 1
+            self._condition.notify_all()
+
+
+class AdmissionController:
+    """
+    Couche d'admission client pour un modèle Bedrock : débit (RPM/TPM), concurrence
+    adaptative et nouvelles tentatives avec backoff exponentiel et jitter
+    """
+
+    def __init__(self, model_id, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE, max_concurrency=4,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE_SECONDS,
+                 backoff_max=DEFAULT_BACKOFF_MAX_SECONDS, sleep=time.sleep, rng=random.random):
+        self.model_id = model_id
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrencyLimiter(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        self._rng = rng
+        self._lock = threading.Lock()
+        self._counters = {
+            'calls': 0,
+            'retries': 0,
+            'throttles': 0,
+            'server_errors': 0,
+            'failures': 0,
+            'deadline_exceeded': 0,
+            'extra_requests': 0,
+            'refused_extra_requests': 0,
+            'rate_wait_seconds': 0.0,
+            'concurrency_wait_seconds': 0.0,
+            'backoff_wait_seconds': 0.0,
+        }
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def _refund(self, estimated_tokens):
+        if self.request_bucket is not None:
+            self.request_bucket.refund(1)
+        if self.token_bucket is not None:
+            self.token_bucket.refund(estimated_tokens)
+
+    def _wait_for_rate(self, estimated_tokens, remaining_ms=None):
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.reserve(estimated_tokens))
+        if wait > 0:
+            if remaining_ms is not None and wait * 1000 >= remaining_ms():
+                # Requête non envoyée : la réservation est rendue aux seaux
+                self._refund(estimated_tokens)
+                self._count('deadline_exceeded')
+                raise DeadlineExceededError(
+                    f"Attente de débit de {wait:.2f}s au-delà de l'échéance de l'invocation ({self.model_id})"
+                )
+            self._count('rate_wait_seconds', wait)
+            self._sleep(wait)
+
+    def try_admit(self, estimated_tokens=0):
+        """
+        Admission sans attente d'une requête supplémentaire (double d'un appel lent, bascule
+        sur une autre route) : elle n'est envoyée que si le débit et la concurrence le
+        permettent tout de suite, et doit alors être suivie de release()
+
+        Args:
+            estimated_tokens (int): Tokens estimés pour le seau TPM
+
+        Returns:
+            bool: True si la requête peut partir
+        """
+        admitted = True
+        if self.request_bucket is not None:
+            admitted = self.request_bucket.try_reserve(1)
+        if admitted and self.token_bucket is not None and not self.token_bucket.try_reserve(estimated_tokens):
+            admitted = False
+            if self.request_bucket is not None:
+                self.request_bucket.refund(1)
+        # Place de concurrence prise en dernier : un refus ne compte pas dans l'ajustement AIMD
+        if admitted and not self.concurrency.try_acquire():
+            admitted = False
+            self._refund(estimated_tokens)
+        self._count('extra_requests' if admitted else 'refused_extra_requests')
+        return admitted
+
+    def release(self, throttled=False):
+        """Fin d'une requête admise par try_admit()"""
+        self.concurrency.release(throttled=throttled)
+
+    def backoff_delay(self, attempt):
+        """Backoff exponentiel plafonné avec full jitter"""
+        return self._rng() * min(self.backoff_max, self.backoff_base * (2 ** attempt))
+
+    def call(self, fn, estimated_tokens=0, report=None, remaining_ms=None):
+        """
+        Exécute fn() sous contrôle d'admission
+
+        Args:
+            fn (callable): Appel Bedrock à exécuter (sans argument)
+            estimated_tokens (int): Tokens estimés pour le seau TPM
+            report (dict, optional): Reçoit le nombre de nouvelles tentatives de cet appel ('retries')
+            remaining_ms (callable, optional): Temps restant avant l'échéance de l'invocation
+                                               (DeadlineScheduler.remaining_ms)
+
+        Returns:
+            Résultat de fn()
+
+        Raises:
+            DeadlineExceededError: Si l'attente de débit ou de backoff dépasse le temps restant
+            Exception: L'erreur d'origine si elle n'est pas transitoire ou si les essais sont épuisés
+        """
+        self._count('calls')
+        attempt = 0
+        while True:
+            self._wait_for_rate(estimated_tokens, remaining_ms)
+            self._count('concurrency_wait_seconds', self.concurrency.acquire())
+            throttled = False
+            try:
+                return fn()
+            except Exception as e:
+                error = e
+                throttled = is_throttling_error(e)
+                retryable = is_retryable_error(e)
+                if retryable:
+                    self._count('throttles' if throttled else 'server_errors')
+                if not retryable or attempt >= self.max_retries:
+                    self._count('failures')
+                    raise
+            finally:
+                self.concurrency.release(throttled=throttled)
+
+            delay = self.backoff_delay(attempt)
+            if remaining_ms is not None and delay * 1000 >= remaining_ms():
+                self._count('deadline_exceeded')
+                raise DeadlineExceededError(
+                    f"Backoff de {delay:.2f}s au-delà de l'échéance de l'invocation ({self.model_id})"
+                ) from error
+            attempt += 1
+            if report is not None:
+                report['retries'] = attempt
+            self._count('retries')
+            self._count('backoff_wait_seconds', delay)
+            logger.warning(
+                f"Erreur transitoire Bedrock ({self.model_id}), essai {attempt}/{self.max_retries} "
+                f"dans {delay:.2f}s, limite de concurrence {self.concurrency.limit}"
+            )
+            self._sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        for name in ('rate_wait_seconds', 'concurrency_wait_seconds', 'backoff_wait_seconds'):
+            stats[name] = round(stats[name], 3)
+        stats['concurrency_limit'] = self.concurrency.limit
+        return stats
+
+
+def stats_delta(before, after):
+    """Différence de compteurs entre deux relevés de stats() (pour une invocation)"""
+    delta = {}
+    for key, value in after.items():
+        if key == 'concurrency_limit':
+            delta[key] = value
+        elif isinstance(value, float):
+            delta[key] = round(value - before.get(key, 0), 3)
+        else:
+            delta[key] = value - before.get(key, 0)
+    return delta
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_admission_controller(model_id, max_concurrency=4):
+    """
+    Contrôleur partagé par tous les appels (et invocations à chaud) d'un même modèle
+
+    Variables:
+        BEDROCK_RPM, BEDROCK_TPM: quotas par modèle (0 = pas de limite)
+        BEDROCK_MAX_RETRIES, BEDROCK_BACKOFF_BASE_SECONDS, BEDROCK_BACKOFF_MAX_SECONDS
+
+    Args:
+        model_id (str): Identifiant du modèle Bedrock
+        max_concurrency (int): Limite de concurrence initiale et maximale
+
+    Returns:
+        AdmissionController: Contrôleur du modèle
+    """
+    with _controllers_lock:
+        controller = _controllers.get(model_id)
+        if controller is None:
+            controller = AdmissionController(
+                model_id,
+                requests_per_minute=int(os.environ.get('BEDROCK_RPM', DEFAULT_REQUESTS_PER_MINUTE)),
+                tokens_per_minute=int(os.environ.get('BEDROCK_TPM', DEFAULT_TOKENS_PER_MINUTE)),
+                max_concurrency=max_concurrency,
+                max_retries=int(os.environ.get('BEDROCK_MAX_RETRIES', DEFAULT_MAX_RETRIES)),
+                backoff_base=float(os.environ.get('BEDROCK_BACKOFF_BASE_SECONDS', DEFAULT_BACKOFF_BASE_SECONDS)),
+                backoff_max=float(os.environ.get('BEDROCK_BACKOFF_MAX_SECONDS', DEFAULT_BACKOFF_MAX_SECONDS)),
+            )
+            _controllers[model_id] = controller
+        return controller
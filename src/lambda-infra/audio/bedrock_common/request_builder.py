@@ -0,0 +1,98 @@
+import os
+import json
+
+ANTHROPIC_VERSION = "bedrock-2023-05-31"
+
+SYSTEM_PROMPT = "Vous êtes un expert en management de la qualité spécialisé dans l'expérience client (CX). Répondez exclusivement en français avec une approche professionnelle et technique. Fournissez des réponses directes sans introduction inutile ni formatage markdown. Pour les listes, utilisez uniquement les balises HTML (<ul>, <li>, <ol>). Concentrez-vous sur des insights actionnables, des méthodologies concrètes et des bonnes pratiques terrain. Évitez les généralités et privilégiez l'expertise sectorielle"
+
+USAGE_FIELDS = (
+    'input_tokens',
+    'output_tokens',
+    'cache_read_input_tokens',
+    'cache_creation_input_tokens',
+)
+
+
+def is_prompt_caching_enabled():
+    """
+    Indique si le préfixe transcription doit être marqué pour le cache Bedrock (BEDROCK_PROMPT_CACHING)
+
+    Returns:
+        bool: True par défaut
+    """
+    return os.environ.get('BEDROCK_PROMPT_CACHING', 'true').lower() != 'false'
+
+
+def build_request_body(input_text, instruction, max_tokens, system_text=SYSTEM_PROMPT,
+                       temperature=0.7, top_p=0.999, top_k=250, stop_sequences=None, cache=None):
+    """
+    Construit le corps de requête Claude avec la transcription en tête
+
+    Le texte système et la transcription forment un préfixe identique pour tous les
+    critères d'un même appel : il est marqué cache_control pour que les appels suivants
+    relisent ce préfixe depuis le cache. L'instruction propre au critère vient en dernier.
+
+    Args:
+        input_text (str): Transcription de l'appel
+        instruction (str): Prompt du critère évalué
+        max_tokens (int): Nombre maximum de tokens générés
+        system_text (str): Texte système commun
+        temperature (float): Température d'échantillonnage
+        top_p (float): Paramètre top_p
+        top_k (int): Paramètre top_k
+        stop_sequences (list, optional): Séquences qui arrêtent la génération
+        cache (bool, optional): Marquer le préfixe pour le cache. Si None, lu depuis l'environnement
+
+    Returns:
+        str: Corps JSON de la requête invoke_model
+    """
+    if cache is None:
+        cache = is_prompt_caching_enabled()
+
+    transcript_block = {
+        "type": "text",
+        "text": f"<transcript>\n{input_text}\n</transcript>"
+    }
+    if cache:
+        transcript_block["cache_control"] = {"type": "ephemeral"}
+
+    body = {
+        "anthropic_version": ANTHROPIC_VERSION,
+        "max_tokens": max_tokens,
+        "top_p": top_p,
+        "top_k": top_k,
+        "system": [{"type": "text", "text": system_text}],
+        "temperature": temperature,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    transcript_block,
+                    {
+                        "type": "text",
+                        "text": instruction
+                    }
+                ]
+            }
+        ]
+    }
+    if stop_sequences:
+        body["stop_sequences"] = list(stop_sequences)
+
+    return json.dumps(body)
+
+
+def extract_usage(response_body):
+    """
+    Extrait les compteurs de tokens (dont lecture/écriture du cache) de la réponse
+
+    Args:
+        response_body (dict): Réponse invoke_model décodée
+
+    Returns:
+        dict: Compteurs USAGE_FIELDS, 0 si absents
+    """
+    usage = response_body.get('usage') or {}
+    return {field: int(usage.get(field) or 0) for field in USAGE_FIELDS}
+
+
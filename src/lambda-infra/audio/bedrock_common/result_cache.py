@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger()
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def make_cache_key(input_text, prompt, model_id, params, config_version):
+    """
+    Calcule la clé de cache d'une évaluation (hash du contenu)
+
+    Args:
+        input_text (str): Transcription de l'appel
+        prompt (str): Prompt résolu du critère
+        model_id (str): Identifiant du modèle Bedrock
+        params (dict): Paramètres d'échantillonnage et texte système
+        config_version (str): metadata.version de prompts-config.json
+
+    Returns:
+        str: Empreinte SHA-256 hexadécimale
+    """
+    payload = json.dumps(
+        {
+            'input_text': input_text,
+            'prompt': prompt,
+            'model_id': model_id,
+            'params': params,
+            'config_version': config_version,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LRUStore:
+    """Tier mémoire : LRU borné en taille avec expiration, conservé entre invocations à chaud"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteStore:
+    """Tier persistant local (fichier SQLite), utilisé pour les tests et les benchmarks"""
+
+    def __init__(self, path, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bedrock_cache ("
+            "cache_key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM bedrock_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM bedrock_cache WHERE cache_key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO bedrock_cache (cache_key, value, expires_at, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl_seconds, now),
+            )
+            self._conn.execute("DELETE FROM bedrock_cache WHERE expires_at <= ?", (now,))
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM bedrock_cache WHERE cache_key NOT IN ("
+                    "SELECT cache_key FROM bedrock_cache ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM bedrock_cache WHERE cache_key = ?", (key,))
+            self._conn.commit()
+
+
+class DynamoDBStore:
+    """Tier persistant de production : table DynamoDB avec TTL natif sur l'attribut expiresAt"""
+
+    def __init__(self, table_name, ttl_seconds=DEFAULT_TTL_SECONDS, client=None):
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('dynamodb')
+        return self._client
+
+    def get(self, key):
+        response = self.client.get_item(
+            TableName=self.table_name,
+            Key={'cacheKey': {'S': key}},
+        )
+        item = response.get('Item')
+        if not item:
+            return None
+        # Le TTL DynamoDB supprime les éléments en différé : on revérifie l'expiration
+        if int(item['expiresAt']['N']) <= time.time():
+            return None
+        return item['value']['S']
+
+    def set(self, key, value):
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                'cacheKey': {'S': key},
+                'value': {'S': value},
+                'expiresAt': {'N': str(int(time.time() + self.ttl_seconds))},
+            },
+        )
+
+    def delete(self, key):
+        self.client.delete_item(
+            TableName=self.table_name,
+            Key={'cacheKey': {'S': key}},
+        )
+
+
+class ResultCache:
+    """
+    Cache des réponses Bedrock à deux niveaux : LRU mémoire puis tier persistant optionnel
+
+    Les erreurs du tier persistant sont journalisées et traitées comme des absences :
+    le cache ne doit jamais faire échouer une évaluation.
+    """
+
+    def __init__(self, memory=None, persistent=None):
+        self.memory = memory if memory is not None else LRUStore()
+        self.persistent = persistent
+        self.config_version = None
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_persistent = 0
+        self.misses = 0
+
+    def set_config_version(self, config_version):
+        """Vide le tier mémoire quand la version de prompts-config.json change"""
+        if config_version != self.config_version:
+            if self.config_version is not None:
+                logger.info(f"Version des prompts {self.config_version} -> {config_version}, cache mémoire vidé")
+            self.memory.clear()
+            self.config_version = config_version
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count('hits_memory')
+            return value
+
+        if self.persistent is not None:
+            try:
+                value = self.persistent.get(key)
+            except Exception as e:
+                logger.warning(f"Lecture du cache persistant impossible: {str(e)}")
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+                self._count('hits_persistent')
+                return value
+
+        self._count('misses')
+        return None
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, value)
+            except Exception as e:
+                logger.warning(f"Écriture du cache persistant impossible: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            hits = self.hits_memory + self.hits_persistent
+            total = hits + self.misses
+            return {
+                'hits_memory': self.hits_memory,
+                'hits_persistent': self.hits_persistent,
+                'misses': self.misses,
+                'hit_rate': round(hits / total, 4) if total else 0.0,
+                'memory_entries': len(self.memory),
+            }
+
+
+def create_result_cache():
+    """
+    Construit le cache à partir de l'environnement
+
+    Variables:
+        BEDROCK_CACHE_ENABLED: 'false' pour désactiver le cache
+        BEDROCK_CACHE_MAX_ENTRIES: taille du LRU mémoire
+        BEDROCK_CACHE_TTL_SECONDS: durée de vie des entrées
+        BEDROCK_CACHE_TABLE: table DynamoDB du tier persistant (production)
+        BEDROCK_CACHE_SQLITE_PATH: fichier SQLite du tier persistant (tests, local)
+
+    Returns:
+        ResultCache: Cache configuré, ou None si désactivé
+    """
+    if os.environ.get('BEDROCK_CACHE_ENABLED', 'true').lower() == 'false':
+        return None
+
+    ttl_seconds = int(os.environ.get('BEDROCK_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+    memory = LRUStore(
+        max_entries=int(os.environ.get('BEDROCK_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        ttl_seconds=ttl_seconds,
+    )
+
+    persistent = None
+    if os.environ.get('BEDROCK_CACHE_TABLE'):
+        persistent = DynamoDBStore(os.environ['BEDROCK_CACHE_TABLE'], ttl_seconds=ttl_seconds)
+    elif os.environ.get('BEDROCK_CACHE_SQLITE_PATH'):
+        persistent = SQLiteStore(os.environ['BEDROCK_CACHE_SQLITE_PATH'], ttl_seconds=ttl_seconds)
+
+    return ResultCache(memory=memory, persistent=persistent)
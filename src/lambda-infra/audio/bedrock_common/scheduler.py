@@ -0,0 +1,151 @@
+import os
+import math
+import logging
+import threading
+
+logger = logging.getLogger()
+
+DEFAULT_SAFETY_MARGIN_MS = 5000
+DEFAULT_PRIORITY = 10
+
+# Estimation initiale, avant toute mesure : latence d'un prompt pour une transcription de référence
+DEFAULT_ESTIMATE_MS = 4000.0
+REFERENCE_CHARS = 4000
+EWMA_ALPHA = 0.3
+
+
+class LatencyModel:
+    """
+    Estimation de la latence de chaque prompt, apprise au fil des invocations à chaud
+
+    La latence est ramenée à une transcription de référence (REFERENCE_CHARS caractères)
+    puis lissée par moyenne mobile exponentielle ; l'estimation est remise à l'échelle
+    de la transcription courante. Un prompt jamais mesuré reprend la moyenne de tous les
+    prompts, puis default_ms tant qu'aucune mesure n'existe.
+    """
+
+    ALL_PROMPTS = '*'
+
+    def __init__(self, default_ms=DEFAULT_ESTIMATE_MS, alpha=EWMA_ALPHA):
+        self.default_ms = default_ms
+        self.alpha = alpha
+        self._per_reference = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scale(input_chars):
+        return 1 + input_chars / REFERENCE_CHARS
+
+    def observe(self, prompt_key, input_chars, latency_ms):
+        normalized = latency_ms / self._scale(input_chars)
+        with self._lock:
+            for key in (prompt_key, self.ALL_PROMPTS):
+                previous = self._per_reference.get(key)
+                self._per_reference[key] = (
+                    normalized if previous is None else previous + self.alpha * (normalized - previous)
+                )
+
+    def estimate(self, prompt_key, input_chars):
+        """
+        Returns:
+            float: Latence estimée en millisecondes
+        """
+        with self._lock:
+            per_reference = self._per_reference.get(prompt_key)
+            if per_reference is None:
+                per_reference = self._per_reference.get(self.ALL_PROMPTS, self.default_ms)
+        return per_reference * self._scale(input_chars)
+
+    def observe_invocation(self, prompts, input_chars):
+        """
+        Apprend des mesures d'une invocation (résumé InvocationMetrics['prompts'])
+
+        Les réponses servies par le cache et les appels répétés (repli de profil) sont ignorés.
+        """
+        for prompt_key, entry in prompts.items():
+            if not entry['cache_hit'] and entry['calls'] == 1:
+                self.observe(prompt_key, input_chars, entry['wall_ms'])
+
+
+_latency_model = LatencyModel()
+
+
+def get_latency_model():
+    """Modèle partagé par les invocations à chaud du conteneur"""
+    return _latency_model
+
+
+class DeadlineScheduler:
+    """
+    Admission des prompts en fonction du temps restant de l'invocation Lambda
+
+    Un prompt n'est lancé que si son estimation tient dans le temps restant, moins une
+    marge réservée à l'enregistrement du checkpoint et à la réponse. Sans contexte Lambda
+    (scripts, benchmarks), tous les prompts sont admis.
+    """
+
+    def __init__(self, context, input_text, key_for_prompt, latency_model=None, safety_margin_ms=None):
+        """
+        Args:
+            context: Contexte Lambda (get_remaining_time_in_millis), ou None
+            input_text (str): Transcription évaluée
+            key_for_prompt (callable): Texte du prompt -> clé 'section.nom'
+            latency_model (LatencyModel, optional): Par défaut le modèle partagé
+            safety_margin_ms (int, optional): Par défaut DEADLINE_SAFETY_MARGIN_MS
+        """
+        self.context = context if hasattr(context, 'get_remaining_time_in_millis') else None
+        self.input_chars = len(input_text or '')
+        self.key_for_prompt = key_for_prompt
+        self.latency_model = latency_model or get_latency_model()
+        if safety_margin_ms is None:
+            safety_margin_ms = int(os.environ.get('DEADLINE_SAFETY_MARGIN_MS', DEFAULT_SAFETY_MARGIN_MS))
+        self.safety_margin_ms = safety_margin_ms
+
+    def remaining_ms(self):
+        """Temps utilisable avant l'échéance (infini sans contexte Lambda)"""
+        if self.context is None:
+            return math.inf
+        return self.context.get_remaining_time_in_millis() - self.safety_margin_ms
+
+    def remaining_seconds(self):
+        """Délai d'attente des résultats, None sans contexte Lambda"""
+        remaining = self.remaining_ms()
+        return None if remaining == math.inf else max(0.0, remaining / 1000)
+
+    def estimate_ms(self, prompt):
+        return self.latency_model.estimate(self.key_for_prompt(prompt) or 'adhoc', self.input_chars)
+
+    def admit(self, prompt):
+        """
+        Returns:
+            bool: True si le prompt peut être lancé sans dépasser l'échéance
+        """
+        remaining = self.remaining_ms()
+        if remaining == math.inf:
+            return True
+        estimate = self.estimate_ms(prompt)
+        if estimate > remaining:
+            logger.warning(
+                f"Prompt {self.key_for_prompt(prompt)} reporté: {estimate:.0f} ms estimés, "
+                f"{remaining:.0f} ms disponibles"
+            )
+            return False
+        return True
+
+
+def order_by_priority(prompt_jobs, key_for_prompt, priorities):
+    """
+    Trie les prompts par priorité croissante (1 = le plus important), ordre d'origine à égalité
+
+    Args:
+        prompt_jobs (dict): Clé de résultat -> prompt
+        key_for_prompt (callable): Texte du prompt -> clé 'section.nom'
+        priorities (dict): Clé 'section.nom' -> priorité (section prompt_priorities)
+
+    Returns:
+        dict: prompt_jobs réordonné
+    """
+    return dict(sorted(
+        prompt_jobs.items(),
+        key=lambda item: priorities.get(key_for_prompt(item[1]), DEFAULT_PRIORITY),
+    ))
@@ -0,0 +1,143 @@
+from bedrock_common.generation import AnswerValidator, normalize_answer
+
+# Version du relevé de scores : à incrémenter si un champ change de type ou de sens
+SCORE_SCHEMA_VERSION = 1
+
+# Champ entier du relevé -> clé de résultat de la suite post_call_survey, bornes
+SCORE_FIELDS = (
+    ('satisfaction', 'satisfaction_globale', 1, 5),
+    ('time_adequacy', 'time_adequacy', 1, 5),
+    ('assistance_adequacy', 'assistance_adequacy', 1, 5),
+    ('ease_of_resolution', 'easy_of_response', 1, 5),
+    ('nps', 'net_promoter', 0, 10),
+)
+
+RESOLUTION_VALUES = {
+    'Résolu': 'resolved',
+    'Partiellement résolu': 'partially_resolved',
+    'Non résolu': 'unresolved',
+}
+CHURN_RISK_VALUES = {'faible': 'low', 'moyen': 'medium', 'eleve': 'high'}
+SENTIMENT_VALUES = {'positif': 'positive', 'neutre': 'neutral', 'negatif': 'negative'}
+
+_INTEGER_VALIDATORS = {
+    field: AnswerValidator({'type': 'integer', 'min': low, 'max': high})
+    for field, _, low, high in SCORE_FIELDS
+}
+_RESOLUTION_VALIDATOR = AnswerValidator({'type': 'enum', 'values': list(RESOLUTION_VALUES)})
+_PROBABILITY_VALIDATOR = AnswerValidator({'type': 'integer', 'min': 0, 'max': 100})
+
+
+def nps_category(score):
+    """Promoteur (9-10), passif (7-8) ou détracteur (0-6)"""
+    if score is None:
+        return None
+    if score >= 9:
+        return 'promoter'
+    return 'passive' if score >= 7 else 'detractor'
+
+
+def csat_category(score):
+    """Satisfait (4-5), neutre (3) ou insatisfait (1-2)"""
+    if score is None:
+        return None
+    if score >= 4:
+        return 'satisfied'
+    return 'neutral' if score == 3 else 'dissatisfied'
+
+
+def _integer(validator, value):
+    if isinstance(value, bool):
+        return None
+    answer = validator.validate(value if isinstance(value, str) else str(value))
+    return int(answer) if answer is not None else None
+
+
+def _enum(values, value):
+    return values.get(normalize_answer(value)) if isinstance(value, str) else None
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    answer = normalize_answer(value) if isinstance(value, str) else None
+    return {'true': True, 'oui': True, 'false': False, 'non': False}.get(answer)
+
+
+def build_score_record(results):
+    """
+    Relevé typé des scores d'une enquête post-appel
+
+    Chaque champ est validé à partir du texte de bedrockResult (entiers bornés,
+    énumérations) ; une valeur absente reste None, une valeur présente mais illisible
+    est None et citée dans invalid_fields. La fonction ne lève pas d'exception.
+
+    Args:
+        results (dict): bedrockResult de la suite post_call_survey
+
+    Returns:
+        dict: Relevé (schema_version, scores, catégories NPS/CSAT, résolution, risque
+              de churn...) et 'counters', sa contribution aux agrégats de la campagne
+    """
+    record = {'schema_version': SCORE_SCHEMA_VERSION}
+    invalid = []
+
+    def parsed(field, raw, value):
+        if raw not in (None, '') and value is None:
+            invalid.append(field)
+        record[field] = value
+
+    for field, result_key, _, _ in SCORE_FIELDS:
+        raw = results.get(result_key)
+        parsed(field, raw, _integer(_INTEGER_VALIDATORS[field], raw) if raw is not None else None)
+
+    raw = results.get('resolution_prompt_status')
+    answer = _RESOLUTION_VALIDATOR.validate(raw) if isinstance(raw, str) else None
+    parsed('resolution', raw, RESOLUTION_VALUES.get(answer))
+
+    analysis = results.get('conversation_analysis')
+    if analysis is not None and not isinstance(analysis, dict):
+        invalid.append('conversation_analysis')
+        analysis = None
+    analysis = analysis or {}
+    risk = analysis.get('risk_assessment') if isinstance(analysis.get('risk_assessment'), dict) else {}
+    metrics = analysis.get('conversation_metrics') if isinstance(analysis.get('conversation_metrics'), dict) else {}
+
+    raw = risk.get('churn_risk_level')
+    parsed('churn_risk', raw, _enum(CHURN_RISK_VALUES, raw))
+    raw = risk.get('churn_probability')
+    parsed('churn_probability', raw, _integer(_PROBABILITY_VALIDATOR, raw) if raw is not None else None)
+    raw = risk.get('urgent_callback_required')
+    parsed('urgent_callback', raw, _boolean(raw))
+    raw = metrics.get('dominant_sentiment')
+    parsed('dominant_sentiment', raw, _enum(SENTIMENT_VALUES, raw))
+
+    record['nps_category'] = nps_category(record['nps'])
+    record['csat_category'] = csat_category(record['satisfaction'])
+    record['invalid_fields'] = invalid
+    record['counters'] = score_counters(record)
+    return record
+
+
+def score_counters(record):
+    """
+    Contribution d'un relevé aux agrégats de sa campagne : compteurs entiers à additionner
+    (ADD DynamoDB), la différence de deux contributions corrigeant une réévaluation
+
+    Args:
+        record (dict): Relevé de build_score_record
+
+    Returns:
+        dict: Nom du compteur -> valeur (sommes et effectifs par score, effectifs par catégorie)
+    """
+    counters = {'responses': 1, 'invalid_records': int(bool(record.get('invalid_fields')))}
+    for field in [field for field, _, _, _ in SCORE_FIELDS] + ['churn_probability']:
+        value = record.get(field)
+        counters[f"{field}_count"] = int(value is not None)
+        counters[f"{field}_sum"] = value or 0
+    for field in ('nps_category', 'csat_category', 'resolution', 'churn_risk', 'dominant_sentiment'):
+        value = record.get(field)
+        if value is not None:
+            counters[f"{field.replace('_category', '')}_{value}"] = 1
+    counters['urgent_callbacks'] = int(record.get('urgent_callback') is True)
+    return counters
@@ -0,0 +1,131 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger()
+
+DEFAULT_INIT_BUDGET_MS = 1500
+
+
+def get_startup_mode():
+    """
+    Mode de démarrage (BEDROCK_STARTUP_MODE)
+
+    - eager : client créé et configuration compilée pendant la phase init
+    - lazy : rien n'est fait à l'import, le client est créé au premier appel
+
+    Par défaut eager dans Lambda, lazy ailleurs (scripts, benchmarks).
+
+    Returns:
+        str: 'eager' ou 'lazy'
+    """
+    mode = os.environ.get('BEDROCK_STARTUP_MODE')
+    if not mode:
+        mode = 'eager' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'lazy'
+    return mode.lower()
+
+
+class LazyClient:
+    """Client boto3 créé au premier accès à un attribut (thread-safe)"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get_client(), name)
+
+
+def create_bedrock_client(region_name, max_pool_connections, mode=None):
+    """
+    Crée le client bedrock-runtime selon le mode de démarrage
+
+    boto3 n'est importé qu'à la création effective du client, ce qui le sort
+    du chemin d'import en mode lazy.
+
+    Args:
+        region_name (str): Région AWS
+        max_pool_connections (int): Taille du pool HTTP
+        mode (str, optional): 'eager' ou 'lazy'. Si None, lu depuis l'environnement
+
+    Returns:
+        Client boto3 ou LazyClient
+    """
+    def factory():
+        import boto3
+        from botocore.config import Config
+
+        return boto3.client(
+            'bedrock-runtime',
+            region_name=region_name,
+            # Les nouvelles tentatives sont gérées par rate_limiter.AdmissionController
+            config=Config(
+                max_pool_connections=max_pool_connections,
+                retries={'mode': 'standard', 'total_max_attempts': 1},
+            ),
+        )
+
+    if (mode or get_startup_mode()) == 'lazy':
+        return LazyClient(factory)
+    return factory()
+
+
+def warm_up(client, prompt_store):
+    """
+    Prépare l'invocation pendant la phase init, sans appel réseau : compile la
+    configuration des prompts et crée le client bedrock-runtime (modèle de service
+    botocore, résolution des credentials). Un appel distant ici allongerait l'init de
+    chaque démarrage à froid, et ses nouvelles tentatives pourraient dépasser le budget.
+
+    Args:
+        client: Client bedrock-runtime (boto3 ou LazyClient)
+        prompt_store (PromptConfigStore): Source de la configuration des prompts
+
+    Returns:
+        dict: Durées en millisecondes de chaque étape
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    prompt_store.get_registry()
+    timings['config_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    started = time.perf_counter()
+    try:
+        # Crée un LazyClient ; sans effet sur un client déjà créé
+        client.meta
+    except Exception as e:
+        logger.debug(f"Préchauffage du client Bedrock: {str(e)}")
+    timings['client_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    return timings
+
+
+def report_init(init_started, timings=None):
+    """
+    Journalise la durée d'init du module et la compare au budget INIT_BUDGET_MS
+
+    Args:
+        init_started (float): time.perf_counter() relevé en tête du module
+        timings (dict, optional): Détail des étapes de warm_up
+
+    Returns:
+        float: Durée totale d'init en millisecondes
+    """
+    init_ms = round((time.perf_counter() - init_started) * 1000, 1)
+    budget_ms = float(os.environ.get('INIT_BUDGET_MS', DEFAULT_INIT_BUDGET_MS))
+    details = f" {timings}" if timings else ""
+    if init_ms > budget_ms:
+        logger.warning(f"Init en {init_ms} ms, au-delà du budget de {budget_ms} ms{details}")
+    else:
+        logger.info(f"Init en {init_ms} ms (budget {budget_ms} ms){details}")
+    return init_ms
@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import logging
+
+from bedrock_common.cleaning import StreamingCleaner
+from bedrock_common.request_builder import USAGE_FIELDS
+
+logger = logging.getLogger()
+
+# Erreurs transmises dans le flux après la réponse HTTP (invoke_model_with_response_stream)
+STREAM_ERROR_EVENTS = (
+    'internalServerException',
+    'modelStreamErrorException',
+    'validationException',
+    'throttlingException',
+    'modelTimeoutException',
+    'serviceUnavailableException',
+)
+
+
+def is_streaming_enabled():
+    """
+    Indique si les prompts sont invoqués en streaming (BEDROCK_STREAMING)
+
+    Returns:
+        bool: False par défaut
+    """
+    return os.environ.get('BEDROCK_STREAMING', 'false').lower() == 'true'
+
+
+class StreamError(Exception):
+    """Erreur reçue dans le flux, au format botocore ClientError (attribut response)"""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.response = {'Error': {'Code': code[0].upper() + code[1:]}}
+
+
+def read_response_stream(event_stream, validator=None, cancelled=None):
+    """
+    Lit une réponse Claude en streaming et la nettoie au fil de l'eau
+
+    Avec un validateur, la lecture s'arrête (flux fermé) dès que la réponse nettoyée
+    déjà définitive suffit à fixer la réponse canonique.
+
+    Args:
+        event_stream: Corps de invoke_model_with_response_stream (itérable d'événements 'chunk')
+        validator (AnswerValidator, optional): Validateur du profil de génération
+        cancelled (threading.Event, optional): Positionné quand la réponse n'est plus attendue
+                                               (appel dupliqué servi par une autre route)
+
+    Returns:
+        dict: 'content' (texte brut reçu), 'cleaned' (identique à clean_response(content)),
+              'answer' (réponse canonique si arrêt anticipé), 'usage', 'first_text_at'
+              (time.perf_counter() du premier fragment) et 'stopped_early' ; None si la
+              lecture a été annulée
+    """
+    cleaner = StreamingCleaner()
+    parts = []
+    usage = dict.fromkeys(USAGE_FIELDS, 0)
+    first_text_at = None
+    answer = None
+
+    for event in event_stream:
+        if cancelled is not None and cancelled.is_set():
+            if hasattr(event_stream, 'close'):
+                event_stream.close()
+            return None
+        for code in STREAM_ERROR_EVENTS:
+            if code in event:
+                raise StreamError(code, event[code].get('message', ''))
+        if 'chunk' not in event:
+            continue
+
+        message = json.loads(event['chunk']['bytes'])
+        kind = message.get('type')
+        if kind == 'message_start':
+            start_usage = message.get('message', {}).get('usage') or {}
+            for field in USAGE_FIELDS:
+                usage[field] = int(start_usage.get(field) or 0)
+        elif kind == 'content_block_delta':
+            text = message.get('delta', {}).get('text', '')
+            if first_text_at is None:
+                first_text_at = time.perf_counter()
+            parts.append(text)
+            if cleaner.feed(text) and validator is not None:
+                answer = validator.validate_prefix(cleaner.text)
+                if answer is not None:
+                    break
+        elif kind == 'message_delta':
+            usage['output_tokens'] = int((message.get('usage') or {}).get('output_tokens') or 0)
+
+    if answer is not None and hasattr(event_stream, 'close'):
+        event_stream.close()
+
+    content = ''.join(parts)
+    if answer is not None:
+        # Flux interrompu : pas de message_delta, tokens de sortie estimés sur le texte reçu
+        usage['output_tokens'] = max(1, len(content) // 4)
+
+    return {
+        'content': content,
+        'cleaned': cleaner.finish() if content else content,
+        'answer': answer,
+        'usage': usage,
+        'first_text_at': first_text_at,
+        'stopped_early': answer is not None,
+    }
@@ -0,0 +1,116 @@
+from bedrock_common.scores import build_score_record
+
+
+class Suite:
+    """
+    Suite d'évaluation : ensemble de critères évalués sur une transcription et forme
+    de la sortie rendue à Step Functions
+
+    Args:
+        name (str): Nom de la suite (sélection par événement, métriques, checkpoints)
+        stage (str): Clé sous monitoring.bedrock ('callMining', 'postCall')
+        prompts (dict): Clé de résultat -> clé 'section.nom' du prompt, dans l'ordre de sortie
+        object_keys (tuple): Clés dont la valeur attendue est un objet JSON, rendu en texte compact
+        json_keys (tuple): Clés rendues décodées (dict) dans bedrockResult
+        local_classification (dict): Clés de résultat pouvant être résolues par l'index de mots-clés
+        default_max_tokens (int): max_tokens des prompts sans profil de génération
+        record_builder (callable, optional): bedrockResult -> relevé typé joint à la sortie ('scoreRecord')
+    """
+
+    def __init__(self, name, stage, prompts, object_keys=(), json_keys=(), local_classification=None,
+                 default_max_tokens=2024, record_builder=None):
+        self.name = name
+        self.stage = stage
+        self.prompts = prompts
+        self.object_keys = tuple(object_keys)
+        self.json_keys = tuple(json_keys)
+        self.local_classification = local_classification or {}
+        self.default_max_tokens = default_max_tokens
+        self.record_builder = record_builder
+
+    @property
+    def result_keys(self):
+        return list(self.prompts)
+
+    def prompt_jobs(self, registry):
+        """
+        Returns:
+            dict: Clé de résultat -> prompt compilé
+        """
+        return {result_key: registry.get(prompt_key) for result_key, prompt_key in self.prompts.items()}
+
+
+QUALITY_ANALYSIS = Suite(
+    'quality_analysis',
+    stage='callMining',
+    prompts={
+        'prompt_actions_agent': 'conversation_analysis.action_agent',
+        'prompt_evaluation_qualite': 'quality_evaluation.evaluation_qualite',
+        'prompt_evaluation_politesse': 'quality_evaluation.evaluation_politesse',
+        'prompt_identification_produit': 'categorization.identification_produit',
+        'prompt_identification_sujet': 'categorization.identification_sujet',
+        'prompt_necessite_rappel': 'conversation_analysis.necessite_rappel',
+        'prompt_probleme_client': 'conversation_analysis.probleme_client',
+        'prompt_resultats_conversation': 'conversation_analysis.resultats_conversation',
+        'prompt_resume_general': 'conversation_analysis.resume_general',
+        'prompt_statut_resolution': 'conversation_analysis.statut_resolution',
+        'prompt_bilan_global': 'quality_evaluation.bilan_global',
+    },
+    object_keys=('prompt_bilan_global',),
+    # Sujet et produit résolus localement quand ils apparaissent littéralement dans la transcription
+    local_classification={
+        'prompt_identification_sujet': 'categorization.identification_sujet',
+        'prompt_identification_produit': 'categorization.identification_produit',
+    },
+    default_max_tokens=2024,
+)
+
+POST_CALL_SURVEY = Suite(
+    'post_call_survey',
+    stage='postCall',
+    prompts={
+        'satisfaction_globale': 'post_call_survey.satisfaction_score',
+        'time_adequacy': 'post_call_survey.time_adequacy_score',
+        'assistance_adequacy': 'post_call_survey.assistance_adequacy_score',
+        'easy_of_response': 'post_call_survey.easy_of_resolution_score',
+        'net_promoter': 'post_call_survey.net_promoter_score',
+        'satisfaction_verbatim': 'post_call_survey.satisfaction_verbatim',
+        'dissatisfaction_verbatim': 'post_call_survey.dissatisfaction_verbatim',
+        'resolution_prompt_status': 'post_call_survey.resolution_status',
+        'main_improvement_suggestions': 'post_call_survey.main_improvement_suggestion',
+        'conversation_analysis': 'advanced_analysis.conversation_analysis',
+    },
+    object_keys=('conversation_analysis',),
+    json_keys=('conversation_analysis',),
+    default_max_tokens=2054,
+    # Scores typés (entiers, énumérations) pour les agrégats de campagne
+    record_builder=build_score_record,
+)
+
+SUITES = {suite.name: suite for suite in (QUALITY_ANALYSIS, POST_CALL_SURVEY)}
+
+
+def select_suites(event, default_suites):
+    """
+    Suites demandées par l'événement ('suites': nom, liste de noms ou 'all')
+
+    Args:
+        event (dict): Événement reçu par le handler
+        default_suites (tuple): Suites de la lambda si l'événement n'en précise pas
+
+    Returns:
+        list: Suites à évaluer
+
+    Raises:
+        ValueError: Si une suite demandée n'existe pas
+    """
+    requested = event.get('suites') or default_suites
+    if isinstance(requested, str):
+        requested = [requested]
+    if 'all' in requested:
+        requested = list(SUITES)
+
+    unknown = [name for name in requested if name not in SUITES]
+    if unknown:
+        raise ValueError(f"Suite(s) inconnue(s): {', '.join(unknown)}")
+    return [SUITES[name] for name in dict.fromkeys(requested)]
@@ -0,0 +1,235 @@
+import os
+import re
+import hashlib
+import logging
+
+logger = logging.getLogger()
+
+# Marqueurs de bruit et de musique d'attente laissés dans les transcriptions
+_NOISE_TAG = re.compile(r'[\[(](?:musique|music|bruit|noise|inaudible|silence|rires?)[^\])]*[\])]|[♪♫]+', re.IGNORECASE)
+# Hésitations sans contenu, supprimées avec la ponctuation qui les suit
+_HESITATION = re.compile(r'\b(?:euh+|heu+|hum+|hm+|mmh+|bah)\b[,.]?', re.IGNORECASE)
+# Mot ou groupe de 2 à 4 mots répété au moins trois fois d'affilée (attente, boucle de transcription) ;
+# lettres seulement : les groupes de chiffres répétés (numéros, montants) sont des faits
+_REPEATED_WORDS = re.compile(r'\b([^\W\d_]+(?:\W+[^\W\d_]+){0,3}?)(?:[\s,.]+\1\b){2,}', re.IGNORECASE)
+# Phrase répétée à l'identique (message d'attente en boucle)
+_REPEATED_SENTENCE = re.compile(r'(\b[^.!?\n]{10,300}?[.!?])(?:\s*\1)+')
+_SPACES = re.compile(r'[ \t\u00a0]+')
+_SPACE_BEFORE_PUNCTUATION = re.compile(r' +([,.])')
+_TURN = re.compile(r'(?m)^(?=\S)')
+
+# Libellé court des locuteurs (L1, L2...) : il est répété à chaque tour de parole
+SPEAKER_LABEL = 'L'
+
+
+def estimate_tokens(text):
+    """
+    Args:
+        text (str): Texte envoyé au modèle
+
+    Returns:
+        int: Nombre de tokens estimé (~4 caractères par token, comme le contrôle d'admission)
+    """
+    return len(text or '') // 4
+
+
+def is_compaction_enabled():
+    """
+    Indique si la transcription est normalisée et compactée avant les prompts (TRANSCRIPT_COMPACTION)
+
+    Returns:
+        bool: True par défaut
+    """
+    return os.environ.get('TRANSCRIPT_COMPACTION', 'true').lower() != 'false'
+
+
+def get_map_reduce_threshold():
+    """
+    Returns:
+        int: Tokens de transcription compactée au-delà desquels les prompts portent sur des
+             résumés de morceaux (MAP_REDUCE_THRESHOLD_TOKENS, 0 = jamais)
+    """
+    return int(os.environ.get('MAP_REDUCE_THRESHOLD_TOKENS', 24000))
+
+
+def get_chunk_tokens():
+    """
+    Returns:
+        int: Taille cible d'un morceau résumé en mode map-reduce (MAP_REDUCE_CHUNK_TOKENS)
+    """
+    return max(500, int(os.environ.get('MAP_REDUCE_CHUNK_TOKENS', 6000)))
+
+
+def normalize_text(text):
+    """
+    Supprime le bruit d'une transcription sans toucher au contenu : marqueurs de musique
+    et de bruit, hésitations, répétitions en boucle, espaces superflus
+
+    Args:
+        text (str): Texte d'un tour de parole ou transcription complète
+
+    Returns:
+        str: Texte normalisé
+    """
+    text = _NOISE_TAG.sub(' ', text)
+    text = _HESITATION.sub(' ', text)
+    text = _REPEATED_SENTENCE.sub(r'\1', text)
+    text = _REPEATED_WORDS.sub(r'\1', text)
+    text = _SPACES.sub(' ', text)
+    text = _SPACE_BEFORE_PUNCTUATION.sub(r'\1', text)
+    return '\n'.join(line.strip() for line in text.split('\n') if line.strip())
+
+
+def compact_segments(segments):
+    """
+    Regroupe les segments audio consécutifs d'un même locuteur en un tour de parole
+
+    Args:
+        segments (list): audio_segments de Transcribe (get_transcript), avec
+                         'speaker_label' et 'transcript'
+
+    Returns:
+        str: Un tour par ligne ("L1: ..."), ou None si les segments sont inexploitables
+    """
+    labels = {}
+    turns = []
+    for segment in segments or []:
+        if not isinstance(segment, dict):
+            return None
+        text = normalize_text(segment.get('transcript') or '')
+        if not text:
+            continue
+        speaker = segment.get('speaker_label') or 'spk_?'
+        label = labels.setdefault(speaker, f"{SPEAKER_LABEL}{len(labels) + 1}")
+        if turns and turns[-1][0] == label:
+            turns[-1][1].append(text)
+        else:
+            turns.append((label, [text]))
+    if not turns:
+        return None
+    return '\n'.join(f"{label}: {' '.join(texts)}" for label, texts in turns)
+
+
+def split_chunks(text, chunk_tokens):
+    """
+    Découpe la transcription compactée en morceaux d'environ chunk_tokens, aux changements de tour
+
+    Args:
+        text (str): Transcription compactée
+        chunk_tokens (int): Taille cible d'un morceau
+
+    Returns:
+        list: Morceaux de texte
+    """
+    max_chars = chunk_tokens * 4
+    pieces = []
+    for turn in _TURN.split(text):
+        # Un tour plus long qu'un morceau est coupé sur un espace
+        while len(turn) > max_chars:
+            cut = turn.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(turn[:cut])
+            turn = turn[cut:].lstrip()
+        if turn:
+            pieces.append(turn)
+
+    chunks = []
+    current = ''
+    for piece in pieces:
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current.rstrip('\n'))
+            current = ''
+        current += piece if piece.endswith('\n') else piece + '\n'
+    if current:
+        chunks.append(current.rstrip('\n'))
+    return chunks
+
+
+def chunk_fingerprint(chunk):
+    """
+    Returns:
+        str: Empreinte d'un morceau, pour reprendre son résumé (mode incrémental)
+    """
+    return hashlib.sha256(chunk.encode('utf-8')).hexdigest()[:32]
+
+
+class PreparedTranscript:
+    """
+    Transcription préparée pour les prompts d'une invocation
+
+    Attributes:
+        original (str): originalText reçu (checkpoints, classification locale)
+        text (str): Texte envoyé aux prompts (compacté, ou résumés en mode map-reduce)
+        chunks (list): Morceaux à résumer avant les prompts, vide hors map-reduce
+        mode (str): 'verbatim', 'compact' ou 'map_reduce'
+        source (str): 'segments' ou 'text'
+    """
+
+    def __init__(self, original, text, mode, source, chunks=None):
+        self.original = original
+        self.text = text
+        self.mode = mode
+        self.source = source
+        self.chunks = chunks or []
+        self.compact_tokens = estimate_tokens(text)
+
+    def use_summaries(self, summaries):
+        """Remplace le texte des prompts par les résumés des morceaux (étape reduce)"""
+        total = len(summaries)
+        self.text = '\n\n'.join(
+            f"Résumé de la partie {index}/{total} de l'appel :\n{summary.strip()}"
+            for index, summary in enumerate(summaries, start=1)
+        )
+
+    def report(self, prompt_count):
+        """
+        Args:
+            prompt_count (int): Prompts exécutés sur le texte préparé
+
+        Returns:
+            dict: Tokens de la transcription d'origine et du texte envoyé, économie sur l'invocation
+        """
+        original_tokens = estimate_tokens(self.original)
+        prompt_tokens = estimate_tokens(self.text)
+        return {
+            'mode': self.mode,
+            'source': self.source,
+            'original_tokens': original_tokens,
+            'compact_tokens': self.compact_tokens,
+            'prompt_tokens': prompt_tokens,
+            'chunks': len(self.chunks),
+            'saved_tokens_per_prompt': original_tokens - prompt_tokens,
+            'saved_input_tokens': (original_tokens - prompt_tokens) * prompt_count,
+        }
+
+
+def prepare_transcript(original_text, segments=None):
+    """
+    Normalise et compacte la transcription, et décide du passage en map-reduce
+
+    Les segments audio (locuteurs) sont utilisés quand l'événement les fournit, sinon le
+    texte brut est seulement normalisé. Au-delà de MAP_REDUCE_THRESHOLD_TOKENS, la
+    transcription est découpée en morceaux à résumer avant l'évaluation.
+
+    Args:
+        original_text (str): originalText de l'événement
+        segments (list, optional): audioSegments de l'événement
+
+    Returns:
+        PreparedTranscript: Transcription préparée
+    """
+    if not is_compaction_enabled():
+        return PreparedTranscript(original_text, original_text, 'verbatim', 'text')
+
+    text = compact_segments(segments) if segments else None
+    source = 'segments' if text else 'text'
+    if text is None:
+        text = normalize_text(original_text) or original_text
+
+    threshold = get_map_reduce_threshold()
+    if threshold and estimate_tokens(text) > threshold:
+        chunks = split_chunks(text, get_chunk_tokens())
+        if len(chunks) > 1:
+            logger.info(f"Transcription longue ({estimate_tokens(text)} tokens): {len(chunks)} morceaux à résumer")
+            return PreparedTranscript(original_text, text, 'map_reduce', source, chunks)
+    return PreparedTranscript(original_text, text, 'compact', source)
@@ -0,0 +1,101 @@
+"""
+Exécution de bout en bout du pipeline Bedrock batch inference sur des fichiers locaux
+
+Le corpus synthétique passe par les trois étapes (prepare, submit, assemble) avec le
+LocalBatchSubmitter et le client simulé : aucun appel réel. Le rapport donne le nombre
+d'enregistrements, les suites complètes ou partielles et le coût estimé au tarif à la
+demande et au tarif batch.
+
+Usage:
+    python benchmarks/batch_pipeline.py [--size 30] [--suites all] [--malformed-rate 0.02]
+        [--work-dir /tmp/batch] [--json]
+
+Le code de sortie vaut 1 si une transcription ou une suite manque à l'assemblage, ou si
+une clé est en échec alors qu'aucune réponse malformée n'est injectée.
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+import tempfile
+
+AUDIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AUDIO_DIR)
+
+from corpus import build_corpus
+from load_test import make_answer_for
+from stub_bedrock import StubBedrockClient
+
+from bedrock_common.batch_inference import LocalBatchSubmitter, run_pipeline
+from bedrock_common.engine import MODEL_ID, load_prompts_config
+from bedrock_common.metrics import estimate_cost
+from bedrock_common.prompt_registry import PromptConfigStore
+from bedrock_common.suites import select_suites
+
+# Remise appliquée par Bedrock aux jobs batch par rapport au tarif à la demande
+BATCH_PRICE_FACTOR = 0.5
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=30, help='Nombre de transcriptions')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--suites', nargs='+', default=['all'])
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--work-dir', help='Répertoire des JSONL (temporaire par défaut)')
+    parser.add_argument('--log-level', default='ERROR')
+    parser.add_argument('--json', action='store_true', help='Sortie JSON')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level)
+    registry = PromptConfigStore(load_prompts_config).get_registry()
+    corpus = build_corpus(registry.config, size=args.size, seed=args.seed)
+    suites = select_suites({'suites': args.suites}, ())
+    stub = StubBedrockClient(
+        latency='fixed:0',
+        ms_per_output_token=0,
+        malformed_rate=args.malformed_rate,
+        answer_for=make_answer_for(registry, args.seed),
+        seed=args.seed,
+    )
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='bedrock-batch-')
+    outputs = run_pipeline(
+        corpus,
+        suites,
+        lambda model_id: LocalBatchSubmitter(stub, model_id=model_id),
+        work_dir,
+        registry=registry,
+    )
+
+    suite_outputs = [output for by_suite in outputs.values() for output in by_suite.values()]
+    on_demand_usd = sum(estimate_cost(MODEL_ID, output['usage']) for output in suite_outputs)
+    report = {
+        'work_dir': work_dir,
+        'transcripts': len(outputs),
+        'records': stub.stats['calls'],
+        'suite_outputs': len(suite_outputs),
+        'complete': sum(1 for output in suite_outputs if not output['incomplete']),
+        'failed_keys': sum(len(output['failedKeys']) for output in suite_outputs),
+        'on_demand_cost_usd': round(on_demand_usd, 4),
+        'batch_cost_usd': round(on_demand_usd * BATCH_PRICE_FACTOR, 4),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:>20}: {value}")
+
+    if report['transcripts'] != len(corpus) or report['suite_outputs'] != len(corpus) * len(suites):
+        print("ÉCHEC: transcriptions ou suites absentes de l'assemblage", file=sys.stderr)
+        return 1
+    if report['failed_keys'] and not args.malformed_rate:
+        print(f"ÉCHEC: {report['failed_keys']} clés en échec sans réponse malformée injectée", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
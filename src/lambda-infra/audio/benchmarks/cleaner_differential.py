@@ -0,0 +1,159 @@
+"""
+Vérification du nettoyage des réponses : sorties de référence et nettoyage incrémental
+
+Les cas de benchmarks/cleaning_golden.json fixent la sortie attendue de clean_response
+(markdown, listes, blocs de code, identifiants avec soulignés...).
+
+Chaque texte du corpus est découpé de plusieurs façons (fragments de taille fixe de 1 à 8
+caractères, découpes aléatoires) et passé au nettoyeur incrémental. Le résultat final doit
+être identique à clean_response(texte complet), et le texte rendu au fil du flux doit
+toujours en être un préfixe. Le corpus mêle des réponses réalistes (markdown, listes,
+blocs de code, préfixes) et des textes aléatoires construits sur les motifs du nettoyeur.
+
+Pour les validateurs des profils de génération, la réponse acquise par anticipation
+(validate_prefix) doit être celle que validate() rend sur la réponse complète.
+
+Usage:
+    python benchmarks/cleaner_differential.py [--random 5000] [--seed 42]
+
+Le code de sortie vaut 1 au premier écart, avec le texte en cause.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+AUDIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AUDIO_DIR)
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cleaning_golden.json')
+
+from bedrock_common.cleaning import StreamingCleaner, clean_response
+from bedrock_common.engine import load_prompts_config
+from bedrock_common.generation import AnswerValidator
+
+SAMPLES = (
+    "Voici l'analyse de l'appel :\n\n## Résumé\n\nLe client signale une **erreur de facturation**.\n"
+    "- Montant contesté\n- Délai de remboursement\n\n1. Vérification\n2. Correction\n",
+    "Après avoir analysé la transcription de l'appel, l'agent a *bien* identifié le problème.",
+    "D'après l'analyse de la transcription, le client souhaite résilier.\\n- Motif : prix\\n- Concurrent cité",
+    "```json\n{\"risk\": \"élevé\"}\n```\nLe client menace de partir.",
+    "Voir [la procédure](https://intranet/procedure) pour le geste commercial.\n\n\n\nFin.",
+    "Oui",
+    "Non résolu.",
+    "Partiellement résolu, le client attend un rappel",
+    "4/5 : l'agent a été patient",
+    "# Titre\n#Pas un titre\n### \nTexte après titre vide",
+    "__souligné__ et ~~barré~~ puis ***gras italique***",
+    "Basé sur la transcription fournie, \n   \n  texte avec   espaces\t\tmultiples  ",
+    "Liste :\n* premier\n* second\n10. dixième\n11.  onzième",
+    "Bloc ``` ouvert sans fermeture\net la suite du texte **gras**",
+    "",
+    "   ",
+    "\n\n\nVoici ",
+)
+
+# Fragments dont les combinaisons exercent les frontières de chaque motif du nettoyeur
+FRAGMENTS = (
+    'a', 'b', 'é', ' ', '  ', '\t', '\n', '\n\n', '\n\n\n', '#', '## ', '*', '**', '_', '~', '`', '```',
+    '[', ']', '(', ')', '-', '- ', '* ', '1.', '12. ', '\\n', '\\', '.', 'Voici ', 'Oui', 'Non', '3',
+    "D'après l'analyse de la transcription, ", ' ', '•', 'n', 'mot_', '](u)', 'Oui, ',
+)
+
+
+def random_corpus(count, rng):
+    for _ in range(count):
+        text = ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 40)))
+        if rng.random() < 0.2:
+            text = 'Voici ' + text
+        yield text
+
+
+def chunkings(text, rng):
+    """Découpes du texte : tailles fixes de 1 à 8 puis trois découpes aléatoires"""
+    for size in range(1, 9):
+        yield [text[index:index + size] for index in range(0, len(text), size)]
+    for _ in range(3):
+        chunks, position = [], 0
+        while position < len(text):
+            size = rng.randint(1, 12)
+            chunks.append(text[position:position + size])
+            position += size
+        yield chunks
+
+
+def load_golden():
+    with open(GOLDEN_PATH, encoding='utf-8') as golden_file:
+        return json.load(golden_file)
+
+
+def check_golden(cases):
+    """
+    Returns:
+        str: Description du premier écart aux sorties de référence, ou None
+    """
+    for case in cases:
+        result = clean_response(case['input'])
+        if result != case['expected']:
+            return f"{case['input']!r}: {result!r} au lieu de {case['expected']!r}"
+    return None
+
+
+def check_text(text, rng, validators):
+    """
+    Returns:
+        str: Description du premier écart, ou None
+    """
+    expected = clean_response(text)
+    for chunks in chunkings(text, rng):
+        cleaner = StreamingCleaner()
+        for chunk in chunks:
+            cleaner.feed(chunk)
+            if not (expected or '').startswith(cleaner.text):
+                return f"préfixe {cleaner.text!r} incompatible avec {expected!r}"
+            for validator in validators:
+                early = validator.validate_prefix(cleaner.text)
+                if early is not None and early != validator.validate(expected):
+                    return f"validate_prefix {early!r} != validate {validator.validate(expected)!r}"
+        result = cleaner.finish() if text else text
+        if result != expected:
+            return f"découpe {chunks!r}: {result!r} != {expected!r}"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--random', type=int, default=5000, help='Nombre de textes aléatoires')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    profiles = load_prompts_config().get('generation_profiles', {})
+    validators = [AnswerValidator(spec['validator']) for spec in profiles.values() if spec.get('validator')]
+
+    golden = load_golden()
+    error = check_golden(golden)
+    if error is not None:
+        print(f"ÉCART à la référence pour {error}")
+        return 1
+
+    started = time.perf_counter()
+    checked = 0
+    golden_inputs = [case['input'] for case in golden]
+    for corpus in (SAMPLES, golden_inputs, random_corpus(args.random, rng)):
+        for text in corpus:
+            error = check_text(text, rng, validators)
+            if error is not None:
+                print(f"ÉCART pour {text!r}: {error}")
+                return 1
+            checked += 1
+
+    print(f"{checked} textes vérifiés, nettoyage incrémental identique "
+          f"({time.perf_counter() - started:.1f} s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Micro-benchmark de clean_response contre l'ancienne version en passes successives
+
+L'ancienne version (enchaînement de re.sub et str.replace, recopiée ci-dessous) et la
+version actuelle (balayage unique, voie rapide sans balisage) nettoient le même corpus :
+réponses courtes des validateurs, textes libres sans markdown, réponses markdown
+(titres, emphase, listes, liens, blocs de code, sauts de ligne échappés). Le rapport
+donne le temps moyen par réponse de chaque famille et le gain.
+
+Les deux versions ne diffèrent que sur les cas corrigés (soulignés dans les mots,
+'#' hors début de ligne, '*' isolés...) : le nombre de réponses différentes est affiché.
+
+Usage:
+    python benchmarks/cleaning_bench.py [--repeat 2000] [--json]
+"""
+import os
+import re
+import sys
+import json
+import random
+import timeit
+import argparse
+
+AUDIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AUDIO_DIR)
+
+from stub_bedrock import FILLER_WORDS
+
+from bedrock_common.cleaning import PREFIXES_TO_REMOVE, clean_response
+
+_HEADING = re.compile(r'#+\s+')
+_EMPHASIS = re.compile(r'[*_~]{1,3}(.*?)[*_~]{1,3}')
+_CODE_BLOCK = re.compile(r'```.*?```', flags=re.DOTALL)
+_LINK = re.compile(r'\[(.*?)\]\(.*?\)')
+_NUMBERED_ITEM = re.compile(r'\n\d+\.\s+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+_SPACES = re.compile(r'\s{2,}')
+
+
+def chained_clean_response(text):
+    """Ancienne version de clean_response : une passe par règle"""
+    if not text:
+        return text
+    for prefix in PREFIXES_TO_REMOVE:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+            break
+    text = _HEADING.sub('', text)
+    text = _EMPHASIS.sub(r'\1', text)
+    text = _CODE_BLOCK.sub('', text)
+    text = _LINK.sub(r'\1', text)
+    text = text.replace('\\n', '\n')
+    text = text.replace('\n- ', ' • ')
+    text = text.replace('\n* ', ' • ')
+    text = _NUMBERED_ITEM.sub(' | ', text)
+    text = _BLANK_LINES.sub('\n\n', text)
+    text = text.replace('\n', ' ')
+    text = _SPACES.sub(' ', text)
+    return text.strip()
+
+
+def sentence(rng, words=14):
+    return ' '.join(rng.choice(FILLER_WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def build_corpus(seed):
+    """Réponses typiques d'une évaluation, par famille"""
+    rng = random.Random(seed)
+    short = ['Oui', 'Non', 'Non résolu', 'Partiellement résolu', '4', '3/5', 'Oui.', ' Non ']
+    plain = [
+        rng.choice(('', 'Voici ', "D'après l'analyse de la transcription, ")) + ' '.join(sentence(rng) for _ in range(count))
+        for count in (1, 3, 6, 12)
+    ]
+    markdown = [
+        f"## Résumé\n\n{sentence(rng)} **{rng.choice(FILLER_WORDS)}** {sentence(rng)}\n\n"
+        f"- {sentence(rng, 6)}\n- {sentence(rng, 6)}\n- *{sentence(rng, 4)}*\n\n1. {sentence(rng, 5)}\n2. {sentence(rng, 5)}",
+        f"{sentence(rng)}\\n- {sentence(rng, 5)}\\n- {sentence(rng, 5)}\\n\\n{sentence(rng)}",
+        f"**Points clés :**\n\n* {sentence(rng)}\n* {sentence(rng)}\n\nVoir [la procédure](https://intranet/p) : {sentence(rng)}",
+        f"```json\n{{\"score\": 4}}\n```\n{sentence(rng)} ~~{rng.choice(FILLER_WORDS)}~~ {sentence(rng)}",
+    ]
+    return {'short': short, 'plain': plain, 'markdown': markdown}
+
+
+def time_per_call(function, texts, repeat):
+    """Temps moyen par réponse, en microsecondes (meilleur de 5 séries)"""
+    best = min(timeit.repeat(lambda: [function(text) for text in texts], number=repeat, repeat=5))
+    return best / (repeat * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000, help='Passages sur chaque famille par série')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='Sortie JSON')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.seed)
+    report = {}
+    for family, texts in corpus.items():
+        chained_us = time_per_call(chained_clean_response, texts, args.repeat)
+        current_us = time_per_call(clean_response, texts, args.repeat)
+        report[family] = {
+            'responses': len(texts),
+            'chained_us': round(chained_us, 2),
+            'single_pass_us': round(current_us, 2),
+            'speedup': round(chained_us / current_us, 2),
+            'different_outputs': sum(1 for text in texts if chained_clean_response(text) != clean_response(text)),
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for family, row in report.items():
+            print(f"{family:>9} | {row['responses']:>2} réponses | passes successives {row['chained_us']:>7.2f} µs"
+                  f" | balayage unique {row['single_pass_us']:>7.2f} µs | x{row['speedup']:.2f}"
+                  f" | sorties différentes {row['different_outputs']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
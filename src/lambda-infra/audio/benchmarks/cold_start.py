@@ -0,0 +1,127 @@
+"""
+Mesure du démarrage à froid des lambdas d'évaluation Bedrock
+
+Rapporte le temps d'import par module (python -X importtime) et le détail de la phase
+init (création du client, compilation de la configuration) pour suivre les régressions
+quand les dépendances changent.
+
+Usage:
+    python benchmarks/cold_start.py [--function bedrock_evaluate] [--budget-ms 800] [--json]
+
+Le code de sortie vaut 1 si le temps d'import dépasse --budget-ms.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+AUDIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTIONS = ('bedrock_evaluate', 'bedrock_evaluate_post_call_survey')
+
+# Exécuté dans un interpréteur neuf pour mesurer la phase init hors import
+INIT_PROBE = """
+import json, time
+started = time.perf_counter()
+import lambda_function
+import_ms = (time.perf_counter() - started) * 1000
+
+from bedrock_common.startup import create_bedrock_client
+started = time.perf_counter()
+create_bedrock_client('us-west-2', max_pool_connections=lambda_function.engine.max_concurrency, mode='eager')
+client_ms = (time.perf_counter() - started) * 1000
+
+started = time.perf_counter()
+lambda_function.engine.prompt_store.get_registry()
+config_ms = (time.perf_counter() - started) * 1000
+
+print(json.dumps({'import_ms': import_ms, 'client_ms': client_ms, 'config_ms': config_ms}))
+"""
+
+
+def _environment(function_name):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.join(AUDIO_DIR, function_name), AUDIO_DIR])
+    # Mesure hors réseau : le préchauffage de la connexion n'est pas exécuté
+    env['BEDROCK_STARTUP_MODE'] = 'lazy'
+    env.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+    return env
+
+
+def measure_imports(function_name):
+    """
+    Returns:
+        dict: Module racine -> temps d'import propre cumulé (ms)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import lambda_function'],
+        env=_environment(function_name),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    by_module = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|', 2)
+        root = name.strip().split('.')[0]
+        by_module[root] += int(self_us) / 1000
+    return dict(sorted(by_module.items(), key=lambda item: item[1], reverse=True))
+
+
+def measure_init(function_name):
+    """
+    Returns:
+        dict: import_ms, client_ms, config_ms
+    """
+    result = subprocess.run(
+        [sys.executable, '-c', INIT_PROBE],
+        env=_environment(function_name),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {key: round(value, 1) for key, value in json.loads(result.stdout.splitlines()[-1]).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--function', choices=FUNCTIONS, action='append')
+    parser.add_argument('--budget-ms', type=float, default=None, help="Budget du temps d'import")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='Sortie JSON')
+    args = parser.parse_args()
+
+    report = {}
+    for function_name in args.function or FUNCTIONS:
+        modules = measure_imports(function_name)
+        report[function_name] = {
+            'init': measure_init(function_name),
+            'imports_ms': {name: round(ms, 1) for name, ms in list(modules.items())[:args.top]},
+            'imports_total_ms': round(sum(modules.values()), 1),
+        }
+
+    over_budget = [
+        name for name, entry in report.items()
+        if args.budget_ms is not None and entry['init']['import_ms'] > args.budget_ms
+    ]
+
+    if args.json:
+        print(json.dumps({'functions': report, 'budget_ms': args.budget_ms, 'over_budget': over_budget}, indent=2))
+    else:
+        for name, entry in report.items():
+            init = entry['init']
+            print(f"== {name}")
+            print(f"   import {init['import_ms']} ms | client {init['client_ms']} ms | config {init['config_ms']} ms")
+            for module, ms in entry['imports_ms'].items():
+                print(f"   {module:<30} {ms:>8.1f} ms")
+        for name in over_budget:
+            print(f"!! {name}: import au-delà du budget de {args.budget_ms} ms")
+
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
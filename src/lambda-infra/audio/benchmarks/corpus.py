@@ -0,0 +1,255 @@
+"""
+Corpus synthétique de transcriptions d'appels en français pour les benchmarks
+
+Les transcriptions alternent répliques agent/client, reprennent des mots-clés des
+catégories de prompts-config.json (pour exercer le classifieur local) et couvrent
+plusieurs longueurs. Le corpus est déterministe pour une graine donnée.
+
+Avec transcribe=True, chaque transcription prend la forme produite par Transcribe et
+get_transcript : texte continu sans locuteurs et audioSegments découpés par locuteur,
+avec hésitations et boucles du message d'attente.
+"""
+import random
+
+# Nombre de répliques par taille de transcription
+LENGTHS = {
+    'short': 8,
+    'medium': 40,
+    'long': 160,
+}
+
+# Appel très long (au-delà du seuil map-reduce par défaut), hors rotation par défaut
+MARATHON_TURNS = 1500
+
+FILLERS = ('euh', 'hum', 'euh,', 'bah')
+HOLD_LOOP = "Merci de patienter, un conseiller va prendre votre appel."
+
+AGENT_LINES = (
+    "Bonjour, service client, je m'appelle {agent}, que puis-je faire pour vous ?",
+    "Je comprends tout à fait, je vais vérifier votre dossier concernant {keyword}.",
+    "Pouvez-vous me confirmer votre numéro de téléphone s'il vous plaît ?",
+    "Je vois effectivement une anomalie sur {keyword}, je la transmets au service concerné.",
+    "Le délai de traitement est de quarante-huit heures, vous recevrez un SMS de confirmation.",
+    "Y a-t-il autre chose que je puisse faire pour vous aujourd'hui ?",
+    "Je vous remercie pour votre patience, c'est réglé de notre côté.",
+)
+
+CLIENT_LINES = (
+    "Bonjour, j'appelle parce que j'ai un souci avec {keyword}.",
+    "Oui c'est le 6 {digits}, je suis client depuis {years} ans.",
+    "Ça fait trois fois que j'appelle pour {keyword}, ce n'est pas normal.",
+    "D'accord, mais je veux être sûr que ça ne se reproduira pas.",
+    "Et pour {keyword}, est-ce que je peux avoir un geste commercial ?",
+    "Très bien, merci beaucoup pour votre aide.",
+    "Non, ce sera tout, bonne journée.",
+)
+
+AGENTS = ('Awa', 'Jean', 'Fatou', 'Paul', 'Mireille')
+
+
+def _keywords(config):
+    keywords = []
+    for section in ('categories', 'product_categories'):
+        for values in config.get(section, {}).values():
+            keywords.extend(keyword.replace('-', ' ') for keyword in values)
+    return keywords or ['la facturation']
+
+
+def make_transcript(rng, turns, keywords):
+    """
+    Args:
+        rng (random.Random): Générateur
+        turns (int): Nombre de répliques
+        keywords (list): Mots-clés métier à citer
+
+    Returns:
+        str: Transcription 'Agent: ... / Client: ...'
+    """
+    # Un sujet principal répété, avec parfois un second sujet qui brouille la catégorisation
+    main_keyword = rng.choice(keywords)
+    other_keyword = rng.choice(keywords)
+    lines = []
+    for turn in range(turns):
+        speaker, templates = ('Agent', AGENT_LINES) if turn % 2 == 0 else ('Client', CLIENT_LINES)
+        template = templates[min(turn // 2, len(templates) - 1)] if turn < 4 else rng.choice(templates)
+        lines.append(f"{speaker}: " + template.format(
+            agent=rng.choice(AGENTS),
+            keyword=main_keyword if rng.random() < 0.7 else other_keyword,
+            digits=rng.randint(10000000, 99999999),
+            years=rng.randint(1, 15),
+        ))
+    return '\n'.join(lines)
+
+
+def make_transcribe_output(rng, transcript, filler_rate=0.3, hold_rate=0.05):
+    """
+    Met une transcription 'Agent: ... / Client: ...' sous la forme produite par Transcribe
+
+    Chaque réplique devient un à trois segments du même locuteur, parfois précédés d'une
+    hésitation ; le message d'attente est répété en boucle de temps en temps.
+
+    Args:
+        rng (random.Random): Générateur
+        transcript (str): Transcription de make_transcript
+        filler_rate (float): Probabilité d'une hésitation par segment
+        hold_rate (float): Probabilité d'une mise en attente après une réplique de l'agent
+
+    Returns:
+        tuple: (texte continu, audioSegments [{'speaker_label', 'transcript'}])
+    """
+    segments = []
+    for line in transcript.split('\n'):
+        speaker, _, text = line.partition(': ')
+        label = 'spk_0' if speaker == 'Agent' else 'spk_1'
+        words = text.split(' ')
+        cuts = sorted(rng.sample(range(1, len(words)), min(len(words) - 1, rng.randint(0, 2))))
+        for start, end in zip([0] + cuts, cuts + [len(words)]):
+            piece = ' '.join(words[start:end])
+            if rng.random() < filler_rate:
+                piece = f"{rng.choice(FILLERS)} {piece}"
+            segments.append({'speaker_label': label, 'transcript': piece})
+        if label == 'spk_0' and rng.random() < hold_rate:
+            segments.append({'speaker_label': 'spk_2', 'transcript': ' '.join([HOLD_LOOP] * rng.randint(3, 8))})
+    return ' '.join(segment['transcript'] for segment in segments), segments
+
+
+def build_corpus(config, size=30, seed=42, lengths=tuple(LENGTHS), transcribe=False):
+    """
+    Args:
+        config (dict): Configuration des prompts (mots-clés des catégories)
+        size (int): Nombre de transcriptions
+        seed (int): Graine du générateur
+        lengths (tuple): Tailles à représenter, réparties en rotation ('marathon' possible)
+        transcribe (bool): Forme Transcribe, avec audioSegments
+
+    Returns:
+        list: Dictionnaires {'fileNameKey', 'length', 'originalText'} (et 'audioSegments')
+    """
+    rng = random.Random(seed)
+    keywords = _keywords(config)
+    corpus = []
+    for index in range(size):
+        length = lengths[index % len(lengths)]
+        item = {
+            'fileNameKey': f"benchmark/{length}-{index:04d}.json",
+            'length': length,
+            'originalText': make_transcript(rng, LENGTHS.get(length, MARATHON_TURNS), keywords),
+        }
+        if transcribe:
+            item['originalText'], item['audioSegments'] = make_transcribe_output(rng, item['originalText'])
+        corpus.append(item)
+    return corpus
+
+
+# Appels courts récurrents : par scénario, des issues proches dans la forme mais évaluées
+# différemment (l'étiquette est l'issue). Une réplique peut avoir plusieurs formulations.
+SHORT_CALLS = {
+    'ivr_dropoff': {
+        'menu': (
+            ("Bienvenue au service client, pour le suivi de votre commande tapez 1, pour la facturation tapez 2.",),
+            ("Nous n'avons pas compris votre choix.", "Votre choix n'a pas été reconnu."),
+            ("Pour le suivi de votre commande tapez 1, pour la facturation tapez 2, pour un conseiller tapez 9.",),
+            ("Nous n'avons pas compris votre choix, merci de rappeler ultérieurement. Au revoir.",),
+        ),
+        'hold': (
+            ("Bienvenue au service client, pour le suivi de votre commande tapez 1, pour la facturation tapez 2.",),
+            ("Vous avez choisi la facturation, un conseiller va prendre votre appel.",),
+            (HOLD_LOOP,),
+            ("Tous nos conseillers sont actuellement occupés, le temps d'attente est estimé à {digits_short} minutes.",),
+            ("Merci de votre patience, votre appel est important pour nous.", "Merci de rester en ligne."),
+        ),
+    },
+    'wrong_number': {
+        'apology': (
+            ("Bonjour, service client, {agent} à votre écoute.", "Service client bonjour, je suis {agent}."),
+            ("Bonjour, je voudrais parler à {client} s'il vous plaît.",),
+            ("Ici c'est le service client de l'opérateur, il n'y a pas de {client} ici.",),
+            ("Ah pardon, je me suis trompé de numéro, excusez-moi.", "Oh excusez-moi, je me suis trompé de numéro."),
+            ("Il n'y a pas de souci, bonne journée.",),
+        ),
+        'redirected': (
+            ("Bonjour, service client, {agent} à votre écoute.", "Service client bonjour, je suis {agent}."),
+            ("Bonjour, je voudrais parler à {client} s'il vous plaît, c'est pour un rendez-vous à la banque.",),
+            ("Ici c'est le service client de l'opérateur, vous cherchez sans doute votre agence bancaire.",),
+            ("Ah mince, vous avez leur numéro par hasard ?",),
+            ("Je n'ai pas leur numéro, mais il figure sur votre relevé de compte.",),
+            ("D'accord, je vais regarder, merci quand même.",),
+        ),
+    },
+    'balance_check': {
+        'ok': (
+            ("Bonjour, service client, {agent} à votre écoute.", "Service client bonjour, je suis {agent}."),
+            ("Bonjour, je voudrais connaître le solde de mon compte, je suis {client}.",),
+            ("Pouvez-vous me confirmer votre numéro de client s'il vous plaît ?",),
+            ("Oui, c'est le {digits}.",),
+            ("Merci, votre solde est de {amount} euros au {day} {month}.",),
+            ("Parfait, merci beaucoup, bonne journée.", "Très bien, merci, bonne journée."),
+        ),
+        # Une seule réplique diffère de 'ok' : le client est mécontent et menace de partir
+        'churn_threat': (
+            ("Bonjour, service client, {agent} à votre écoute.", "Service client bonjour, je suis {agent}."),
+            ("Bonjour, je voudrais connaître le solde de mon compte, je suis {client}.",),
+            ("Pouvez-vous me confirmer votre numéro de client s'il vous plaît ?",),
+            ("Oui, c'est le {digits}.",),
+            ("Merci, votre solde est de {amount} euros au {day} {month}.",),
+            ("C'est n'importe quoi, je vais résilier et partir chez un concurrent.",),
+        ),
+        'dispute': (
+            ("Bonjour, service client, {agent} à votre écoute.", "Service client bonjour, je suis {agent}."),
+            ("Bonjour, je voudrais connaître le solde de mon compte, je suis {client}.",),
+            ("Pouvez-vous me confirmer votre numéro de client s'il vous plaît ?",),
+            ("Oui, c'est le {digits}.",),
+            ("Merci, votre solde est de {amount} euros au {day} {month}.",),
+            ("Comment ça, il manque au moins {amount} euros, je conteste ce prélèvement, c'est inadmissible.",),
+            ("Je comprends, je vous transmets une réclamation, vous serez recontacté sous quarante-huit heures.",),
+        ),
+    },
+}
+
+CLIENTS = ('Monsieur Martin', 'Madame Diallo', 'Monsieur Nguyen', 'Madame Bernard', 'Monsieur Koné')
+MONTHS = ('janvier', 'février', 'mars', 'avril', 'mai', 'juin')
+
+
+def build_short_call_corpus(size=400, seed=42, filler_rate=0.3):
+    """
+    Corpus étiqueté d'appels courts récurrents pour mesurer la réutilisation des quasi-doublons
+
+    Les appels d'un même scénario et d'une même issue ne diffèrent que par les noms, les
+    chiffres, la date, la formulation de quelques répliques et les hésitations ; deux issues
+    d'un même scénario partagent l'essentiel de leurs répliques mais ne doivent pas
+    partager d'évaluation.
+
+    Args:
+        size (int): Nombre d'appels
+        seed (int): Graine du générateur
+        filler_rate (float): Probabilité d'une hésitation par réplique
+
+    Returns:
+        list: Dictionnaires {'fileNameKey', 'label', 'originalText'}
+    """
+    rng = random.Random(seed)
+    labels = [(scenario, outcome) for scenario, outcomes in SHORT_CALLS.items() for outcome in outcomes]
+    corpus = []
+    for index in range(size):
+        scenario, outcome = rng.choice(labels)
+        values = {
+            'agent': rng.choice(AGENTS),
+            'client': rng.choice(CLIENTS),
+            'digits': rng.randint(10000000, 99999999),
+            'digits_short': rng.randint(2, 15),
+            'amount': f"{rng.randint(10, 2500)},{rng.randint(0, 99):02d}",
+            'day': rng.randint(1, 28),
+            'month': rng.choice(MONTHS),
+        }
+        lines = []
+        for variants in SHORT_CALLS[scenario][outcome]:
+            line = rng.choice(variants).format(**values)
+            if rng.random() < filler_rate:
+                line = f"{rng.choice(FILLERS)} {line}"
+            lines.append(line)
+        corpus.append({
+            'fileNameKey': f"benchmark/short-{index:04d}.json",
+            'label': f"{scenario}/{outcome}",
+            'originalText': ' '.join(lines),
+        })
+    return corpus
@@ -0,0 +1,156 @@
+"""
+Latence de queue des appels Bedrock avec et sans duplication vers une seconde région
+
+Les appels passent par EvaluationEngine.invoke (contrôle d'admission, duplication,
+lecture de la réponse) avec deux clients simulés : la région principale, dont une part
+des appels est dix fois plus lente (endpoint dégradé), et une région secondaire saine.
+Pour chaque scénario, le rapport donne les latences p50/p95/p99 par appel, les erreurs,
+la part d'appels dupliqués et les victoires par région.
+
+Scénarios:
+    degraded : appels lents dans la région principale (--slow-rate)
+    outage   : région principale en throttling permanent, le disjoncteur la contourne
+
+Usage:
+    python benchmarks/hedging_bench.py [--calls 600] [--concurrency 8] [--slow-rate 0.05]
+        [--latency lognormal:400:0.4] [--time-scale 0.1] [--streaming] [--json]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+AUDIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AUDIO_DIR)
+
+from load_test import percentile
+from stub_bedrock import FILLER_WORDS, StubBedrockClient
+
+from bedrock_common import rate_limiter
+from bedrock_common.engine import REGION_NAME, EvaluationEngine
+from bedrock_common.hedging import HedgedInvoker, parse_hedge_targets
+
+SECONDARY_REGION = 'us-east-1'
+SCENARIOS = ('degraded', 'outage')
+
+
+def make_transcript(words=600):
+    return ' '.join(FILLER_WORDS[index % len(FILLER_WORDS)] for index in range(words))
+
+
+def run(scenario, hedging, args):
+    """
+    Returns:
+        dict: Mesures d'un scénario, avec ou sans duplication
+    """
+    # Contrôleur d'admission neuf : la concurrence adaptative ne dépend pas du passage précédent
+    rate_limiter._controllers.clear()
+    primary = StubBedrockClient(
+        latency=args.latency,
+        ms_per_output_token=args.ms_per_token,
+        throttle_rate=1.0 if scenario == 'outage' else 0.0,
+        slow_rate=args.slow_rate if scenario == 'degraded' else 0.0,
+        time_scale=args.time_scale,
+        seed=args.seed,
+    )
+    hedger = None
+    if hedging:
+        hedger = HedgedInvoker(
+            REGION_NAME,
+            parse_hedge_targets(SECONDARY_REGION),
+            max_concurrency=args.concurrency,
+            percentile=args.percentile,
+            min_delay_ms=500 * args.time_scale,
+            breaker_reset_seconds=300 * args.time_scale,
+        )
+        hedger.clients[SECONDARY_REGION] = StubBedrockClient(
+            latency=args.latency,
+            ms_per_output_token=args.ms_per_token,
+            time_scale=args.time_scale,
+            seed=args.seed + 1,
+        )
+    engine = EvaluationEngine(primary, max_concurrency=args.concurrency, hedger=hedger)
+    transcript = make_transcript()
+
+    def call(index):
+        started = time.perf_counter()
+        try:
+            engine.invoke(transcript)
+        except Exception:
+            return None
+        return (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        latencies = list(executor.map(call, range(args.calls)))
+
+    succeeded = [latency for latency in latencies if latency is not None]
+    report = {
+        'calls': args.calls,
+        'errors': len(latencies) - len(succeeded),
+        'latency_ms': {
+            'p50': percentile(succeeded, 0.50),
+            'p95': percentile(succeeded, 0.95),
+            'p99': percentile(succeeded, 0.99),
+        },
+        'model_calls': primary.stats['calls'],
+    }
+    if hedger is not None:
+        stats = hedger.stats()
+        report['model_calls'] += hedger.clients[SECONDARY_REGION].stats['calls']
+        report['hedging'] = stats
+        report['extra_calls_pct'] = round(100 * stats['hedges'] / max(1, stats['calls']), 1)
+        report['wins'] = {key[len('wins.'):]: value for key, value in stats.items() if key.startswith('wins.')}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--calls', type=int, default=600, help='Appels par passage')
+    parser.add_argument('--concurrency', type=int, default=8, help='Appels simultanés')
+    parser.add_argument('--latency', default='lognormal:400:0.4', help='Distribution du délai avant le premier octet')
+    parser.add_argument('--ms-per-token', type=float, default=8.0, help='Durée de génération par token')
+    parser.add_argument('--slow-rate', type=float, default=0.05, help='Part des appels lents de la région principale')
+    parser.add_argument('--percentile', type=float, default=95, help='BEDROCK_HEDGE_PERCENTILE')
+    parser.add_argument('--time-scale', type=float, default=0.1, help='Facteur appliqué aux attentes simulées')
+    parser.add_argument('--streaming', action='store_true', help='Réponses en streaming (BEDROCK_STREAMING)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--log-level', default='CRITICAL')
+    parser.add_argument('--json', action='store_true', help='Sortie JSON')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level)
+    os.environ['BEDROCK_STARTUP_MODE'] = 'lazy'
+    os.environ['BEDROCK_CACHE_ENABLED'] = 'false'
+    os.environ['BEDROCK_STREAMING'] = 'true' if args.streaming else 'false'
+    os.environ['BEDROCK_RPM'] = '0'
+    os.environ['BEDROCK_TPM'] = '0'
+    os.environ['BEDROCK_BACKOFF_BASE_SECONDS'] = str(0.5 * args.time_scale)
+    os.environ['BEDROCK_BACKOFF_MAX_SECONDS'] = str(20.0 * args.time_scale)
+
+    report = {
+        scenario: {'single_region': run(scenario, False, args), 'hedged': run(scenario, True, args)}
+        for scenario in args.scenarios
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    for scenario, modes in report.items():
+        print(f"== {scenario}")
+        for mode, row in modes.items():
+            latency = row['latency_ms']
+            line = (f"   {mode:>13} | p50 {latency['p50']} ms | p95 {latency['p95']} ms | p99 {latency['p99']} ms"
+                    f" | erreurs {row['errors']}/{row['calls']} | appels modèle {row['model_calls']}")
+            if 'hedging' in row:
+                line += (f" | doubles {row['extra_calls_pct']}% | victoires {row['wins']}"
+                         f" | bascules {row['hedging']['failovers']} | disjonctions {row['hedging']['breaker_opens']}")
+            print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
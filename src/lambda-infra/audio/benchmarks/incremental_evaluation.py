@@ -0,0 +1,161 @@
+"""
+Latence de l'évaluation après le dernier segment : appel complet contre lots incrémentaux
+
+Chaque transcription du corpus (format Transcribe) est évaluée deux fois avec le client
+simulé : en une invocation sur la transcription complète (lambda_handler, comme après
+get_transcript), puis par lots de segments (incremental_handler), le dernier lot portant
+'final': true. Les lots intermédiaires s'exécutent pendant la transcription : seule la
+dernière invocation est sur le chemin critique.
+
+Le rapport donne par taille d'appel la latence après le dernier segment, les appels au
+modèle sur le chemin critique et au total, la durée maximale d'un lot intermédiaire
+(à comparer à l'intervalle entre deux lots de la transcription) et vérifie que les
+sorties finales ont les mêmes clés.
+
+Usage:
+    python benchmarks/incremental_evaluation.py [--size 3] [--lengths long marathon] [--batches 12]
+        [--function bedrock_evaluate] [--json]
+"""
+import io
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from contextlib import redirect_stdout
+
+AUDIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AUDIO_DIR)
+
+from corpus import LENGTHS, build_corpus
+from load_test import load_function, make_answer_for
+from stub_bedrock import StubBedrockClient, StubLambdaContext
+
+from bedrock_common.engine import load_prompts_config
+
+
+def make_module(function_name, args):
+    """Lambda neuve (état incrémental et contrôle d'admission vides) et son client simulé"""
+    module = load_function(function_name)
+    stub = StubBedrockClient(
+        latency=args.latency,
+        ms_per_output_token=args.ms_per_token,
+        answer_for=make_answer_for(module.engine.get_registry(), args.seed),
+        time_scale=args.time_scale,
+        seed=args.seed,
+    )
+    module.engine.client = stub
+    return module, stub
+
+
+def timed(handler, event):
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        output = handler(event, StubLambdaContext())
+    return output, (time.perf_counter() - started) * 1000
+
+
+def evaluate_call(item, args):
+    """
+    Returns:
+        dict: Mesures des deux modes pour une transcription
+    """
+    event = {'fileNameKey': item['fileNameKey'], 'analysis': 'benchmark'}
+
+    module, stub = make_module(args.function, args)
+    full_output, full_ms = timed(
+        module.lambda_handler,
+        dict(event, originalText=item['originalText'], audioSegments=item['audioSegments']),
+    )
+    full_calls = stub.stats['calls']
+
+    module, stub = make_module(args.function, args)
+    segments = item['audioSegments']
+    size = max(1, -(-len(segments) // args.batches))
+    batch_ms = []
+    for offset in range(0, len(segments), size):
+        final = offset + size >= len(segments)
+        calls_before = stub.stats['calls']
+        output, elapsed_ms = timed(
+            module.incremental_handler,
+            dict(event, audioSegments=segments[offset:offset + size], segmentOffset=offset, final=final),
+        )
+        if final:
+            final_output, final_ms = output, elapsed_ms
+            final_calls = stub.stats['calls'] - calls_before
+        else:
+            batch_ms.append(elapsed_ms)
+
+    return {
+        'full_ms': full_ms,
+        'final_ms': final_ms,
+        'max_batch_ms': max(batch_ms, default=0.0),
+        'full_calls': full_calls,
+        'final_calls': final_calls,
+        'incremental_calls': stub.stats['calls'],
+        'same_keys': sorted(full_output.get('bedrockResult', {})) == sorted(final_output.get('bedrockResult', {})),
+        'status': (full_output.get('statusCode'), final_output.get('statusCode')),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=3, help='Transcriptions par taille')
+    parser.add_argument('--lengths', nargs='+', default=['long', 'marathon'], choices=list(LENGTHS) + ['marathon'])
+    parser.add_argument('--batches', type=int, default=12, help='Lots de segments par appel')
+    parser.add_argument('--function', default='bedrock_evaluate', choices=['bedrock_evaluate', 'bedrock_evaluate_post_call_survey'])
+    parser.add_argument('--latency', default='lognormal:400:0.4', help='Distribution du délai avant le premier octet')
+    parser.add_argument('--ms-per-token', type=float, default=8.0, help='Durée de génération par token')
+    parser.add_argument('--time-scale', type=float, default=0.05, help='Facteur appliqué aux attentes simulées')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='Sortie JSON')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel('CRITICAL')
+    os.environ['BEDROCK_STARTUP_MODE'] = 'lazy'
+    # Sans cache ni checkpoints : le second mode ne doit rien reprendre du premier
+    os.environ['BEDROCK_CACHE_ENABLED'] = 'false'
+    os.environ.pop('CHECKPOINT_TABLE', None)
+    os.environ.pop('CHECKPOINT_SQLITE_PATH', None)
+    os.environ['BEDROCK_RPM'] = '0'
+    os.environ['BEDROCK_TPM'] = '0'
+
+    corpus = build_corpus(
+        load_prompts_config(), size=args.size * len(args.lengths), seed=args.seed,
+        lengths=tuple(args.lengths), transcribe=True,
+    )
+    report = {}
+    for item in corpus:
+        row = report.setdefault(item['length'], [])
+        row.append(evaluate_call(item, args))
+
+    summary = {}
+    for length, rows in report.items():
+        count = len(rows)
+        summary[length] = {
+            'transcripts': count,
+            'full_ms': round(sum(row['full_ms'] for row in rows) / count, 1),
+            'final_ms': round(sum(row['final_ms'] for row in rows) / count, 1),
+            'max_batch_ms': round(max(row['max_batch_ms'] for row in rows), 1),
+            'full_calls': round(sum(row['full_calls'] for row in rows) / count, 1),
+            'final_calls': round(sum(row['final_calls'] for row in rows) / count, 1),
+            'incremental_calls': round(sum(row['incremental_calls'] for row in rows) / count, 1),
+            'same_keys': all(row['same_keys'] for row in rows),
+            'status': sorted({row['status'] for row in rows}),
+        }
+
+    if args.json:
+        print(json.dumps(summary, indent=2, default=list))
+        return 0
+    for length, row in summary.items():
+        print(f"== {length} ({row['transcripts']} appels, {args.batches} lots)")
+        print(f"   après le dernier segment | complet {row['full_ms']} ms, {row['full_calls']} appels modèle"
+              f" | incrémental {row['final_ms']} ms, {row['final_calls']} appels modèle")
+        print(f"   appels modèle au total {row['incremental_calls']} | lot intermédiaire max {row['max_batch_ms']} ms"
+              f" | mêmes clés {row['same_keys']} | statuts {row['status']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
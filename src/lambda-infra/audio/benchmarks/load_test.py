@@ -0,0 +1,314 @@
+"""
+Benchmark de charge hors ligne des lambdas d'évaluation Bedrock
+
+Les handlers sont exécutés sur un corpus synthétique de transcriptions avec un client
+bedrock-runtime simulé (benchmarks/stub_bedrock.py) : aucun appel réel, aucun coût.
+Pour chaque niveau de concurrence (invocations simultanées partageant les quotas du
+compte), le rapport donne les latences p50/p95/p99 du handler, le débit, le nombre
+d'appels modèle par transcription, les erreurs et le pic mémoire.
+
+Usage:
+    python benchmarks/load_test.py [--function bedrock_evaluate] [--concurrency 1 4 16]
+        [--size 30] [--latency lognormal:400:0.4] [--throttle-rate 0.05]
+        [--malformed-rate 0.02] [--time-scale 0.1] [--suites all] [--streaming] [--transcribe] [--json] [--output bench.json]
+        [--slow-rate 0.05] [--hedge-latency lognormal:400:0.4]
+
+Avec --suites, chaque événement demande ces suites (par exemple les deux analyses en
+une passe avec --suites all) au lieu de la suite par défaut de la lambda.
+
+Avec --hedge-latency, la duplication des appels lents est activée (BEDROCK_HEDGING) vers
+une seconde région simulée ayant cette distribution de latence ; --slow-rate ralentit une
+part des appels de la région principale pour reproduire un endpoint dégradé.
+
+Les latences sont mesurées en temps réel : avec --time-scale 0.1 les attentes simulées
+sont dix fois plus courtes que la distribution demandée.
+
+Le code de sortie vaut 1 si un niveau compte plus de --max-errors sorties en erreur
+(statut différent de 200) : throttling et erreurs transitoires doivent être absorbés
+par le contrôle d'admission.
+"""
+import io
+import os
+import sys
+import json
+import math
+import time
+import random
+import logging
+import argparse
+import resource
+import tracemalloc
+import subprocess
+import importlib.util
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+AUDIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AUDIO_DIR)
+
+from corpus import LENGTHS, build_corpus
+from stub_bedrock import StubBedrockClient, StubLambdaContext
+
+FUNCTIONS = ('bedrock_evaluate', 'bedrock_evaluate_post_call_survey')
+
+# Région secondaire simulée pour la duplication des appels lents
+HEDGE_REGION = 'us-east-1'
+
+
+def configure_environment(args):
+    """Variables lues à l'import des lambdas : à fixer avant de les charger"""
+    os.environ['BEDROCK_STARTUP_MODE'] = 'lazy'
+    os.environ.pop('AWS_LAMBDA_FUNCTION_NAME', None)
+    os.environ['BEDROCK_MAX_CONCURRENCY'] = str(args.max_concurrency)
+    os.environ['BEDROCK_EVALUATION_MODE'] = args.mode
+    os.environ['BEDROCK_STREAMING'] = 'true' if args.streaming else 'false'
+    os.environ['BEDROCK_CACHE_ENABLED'] = 'true' if args.result_cache else 'false'
+    os.environ['BEDROCK_RPM'] = str(args.rpm)
+    os.environ['BEDROCK_TPM'] = str(args.tpm)
+    os.environ['BEDROCK_BACKOFF_BASE_SECONDS'] = str(0.5 * args.time_scale)
+    os.environ['BEDROCK_BACKOFF_MAX_SECONDS'] = str(20.0 * args.time_scale)
+    os.environ['BEDROCK_HEDGING'] = 'true' if args.hedge_latency else 'false'
+    os.environ['BEDROCK_HEDGE_TARGETS'] = HEDGE_REGION
+    os.environ['BEDROCK_HEDGE_MIN_DELAY_MS'] = str(500 * args.time_scale)
+
+
+def load_function(function_name):
+    """Charge un module lambda_function neuf (état à chaud remis à zéro)"""
+    from bedrock_common import rate_limiter
+
+    # Contrôleurs d'admission partagés au niveau du processus : un par exécution
+    rate_limiter._controllers.clear()
+    spec = importlib.util.spec_from_file_location(
+        f"{function_name}_lambda_function",
+        os.path.join(AUDIO_DIR, function_name, 'lambda_function.py'),
+    )
+    module = importlib.util.module_from_spec(spec)
+    with redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+def make_answer_for(registry, seed):
+    """Réponses courtes valides pour les prompts dotés d'un validateur"""
+    rng = random.Random(seed)
+    validators = {
+        registry.prompts[key]: profile.validator
+        for key, profile in registry.profiles.items()
+        if profile.validator is not None and key in registry.prompts
+    }
+
+    def answer_for(instruction):
+        validator = validators.get(instruction)
+        if validator is None:
+            return None
+        if validator.type == 'enum':
+            return rng.choice(validator.values)
+        return str(rng.randint(validator.min, validator.max))
+
+    return answer_for
+
+
+def percentile(values, fraction):
+    """Percentile au rang le plus proche (rang ceil(fraction * n))"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Arrondi préalable : 0.07 * 100 vaut 7.000000000000001 en flottant
+    rank = math.ceil(round(fraction * len(ordered), 9))
+    index = max(0, min(len(ordered) - 1, rank - 1))
+    return round(ordered[index], 1)
+
+
+def run_level(function_name, corpus, concurrency, args):
+    """
+    Exécute le corpus avec `concurrency` invocations simultanées
+
+    Returns:
+        dict: Mesures du niveau de concurrence
+    """
+    module = load_function(function_name)
+    stub = StubBedrockClient(
+        latency=args.latency,
+        ms_per_output_token=args.ms_per_token,
+        output_tokens=args.output_tokens,
+        throttle_rate=args.throttle_rate,
+        malformed_rate=args.malformed_rate,
+        answer_for=make_answer_for(module.engine.get_registry(), args.seed),
+        time_scale=args.time_scale,
+        seed=args.seed,
+        slow_rate=args.slow_rate,
+    )
+    module.engine.client = stub
+    hedger = module.engine.hedger
+    if hedger is not None:
+        hedger.clients[HEDGE_REGION] = StubBedrockClient(
+            latency=args.hedge_latency,
+            ms_per_output_token=args.ms_per_token,
+            output_tokens=args.output_tokens,
+            answer_for=make_answer_for(module.engine.get_registry(), args.seed),
+            time_scale=args.time_scale,
+            seed=args.seed + 1,
+        )
+    logging.getLogger().setLevel(args.log_level)
+
+    def run_one(transcript):
+        event = {
+            'originalText': transcript['originalText'],
+            'fileNameKey': transcript['fileNameKey'],
+            'analysis': 'benchmark',
+        }
+        if 'audioSegments' in transcript:
+            event['audioSegments'] = transcript['audioSegments']
+        if args.suites:
+            event['suites'] = args.suites
+        started = time.perf_counter()
+        output = module.lambda_handler(event, StubLambdaContext())
+        latency_ms = (time.perf_counter() - started) * 1000
+        # Une entrée par étape évaluée ('callMining', 'postCall')
+        stages = output.get('monitoring', {}).get('bedrock', {}).values()
+        metrics = [stage['metrics'] for stage in stages if 'metrics' in stage]
+        return transcript['length'], latency_ms, output.get('statusCode'), metrics
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as executor:
+        runs = list(executor.map(run_one, corpus))
+    elapsed = time.perf_counter() - started
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = [latency for _, latency, _, _ in runs]
+    succeeded = [metrics for _, _, status, stages in runs if status == 200 for metrics in stages]
+    errors = sum(1 for _, _, status, _ in runs if status != 200)
+    by_length = {}
+    for length in LENGTHS:
+        values = [latency for run_length, latency, _, _ in runs if run_length == length]
+        if values:
+            by_length[length] = {'p50_ms': percentile(values, 0.50), 'p95_ms': percentile(values, 0.95)}
+
+    return {
+        'transcripts': len(runs),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_per_s': round(len(runs) / elapsed, 3) if elapsed else None,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': round(max(latencies), 1) if latencies else None,
+        },
+        'latency_by_length_ms': by_length,
+        'model_calls_per_transcript': round(stub.stats['calls'] / len(runs), 2) if runs else None,
+        'retries': sum(metrics.get('retries', 0) for metrics in succeeded),
+        'invalid_answers': sum(metrics.get('counters', {}).get('invalid_answers', 0) for metrics in succeeded),
+        'cost_usd': round(sum(metrics.get('cost_usd', 0) for metrics in succeeded), 4),
+        'stub': dict(stub.stats),
+        'hedging': dict(hedger.stats(), secondary_stub=dict(hedger.clients[HEDGE_REGION].stats)) if hedger else None,
+        'peak_traced_memory_mb': round(peak_bytes / 1024 / 1024, 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=AUDIO_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--function', choices=FUNCTIONS, action='append')
+    parser.add_argument('--suites', nargs='+', help="Suites demandées par événement (noms ou 'all')")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                        help='Invocations simultanées (un résultat par niveau)')
+    parser.add_argument('--size', type=int, default=30, help='Nombre de transcriptions')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency', default='lognormal:400:0.4',
+                        help='fixed:MS, uniform:MIN:MAX ou lognormal:MEDIANE:SIGMA')
+    parser.add_argument('--ms-per-token', type=float, default=8.0, help='Durée de génération par token')
+    parser.add_argument('--output-tokens', type=int, default=120, help='Longueur des réponses libres')
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--slow-rate', type=float, default=0.0,
+                        help="Part des appels de la région principale dix fois plus lents (endpoint dégradé)")
+    parser.add_argument('--hedge-latency',
+                        help='Distribution de latence de la région secondaire ; active BEDROCK_HEDGING')
+    parser.add_argument('--time-scale', type=float, default=0.1, help='Facteur appliqué aux attentes simulées')
+    parser.add_argument('--max-concurrency', type=int, default=4, help='BEDROCK_MAX_CONCURRENCY')
+    parser.add_argument('--mode', choices=('per_prompt', 'combined'), default='per_prompt')
+    parser.add_argument('--rpm', type=int, default=0, help='BEDROCK_RPM (0 = pas de limite)')
+    parser.add_argument('--tpm', type=int, default=0, help='BEDROCK_TPM (0 = pas de limite)')
+    parser.add_argument('--result-cache', action='store_true', help='Active le cache des réponses')
+    parser.add_argument('--streaming', action='store_true', help='Réponses en streaming (BEDROCK_STREAMING)')
+    parser.add_argument('--transcribe', action='store_true',
+                        help='Transcriptions au format Transcribe (texte continu et audioSegments)')
+    parser.add_argument('--max-errors', type=int, default=0,
+                        help='Sorties en erreur tolérées par niveau (réponses malformées injectées)')
+    parser.add_argument('--log-level', default='ERROR')
+    parser.add_argument('--json', action='store_true', help='Sortie JSON')
+    parser.add_argument('--output', help='Écrit le rapport JSON dans ce fichier')
+    args = parser.parse_args()
+
+    configure_environment(args)
+
+    functions = args.function or list(FUNCTIONS)
+    config = load_function(functions[0]).engine.get_registry().config
+    corpus = build_corpus(config, size=args.size, seed=args.seed, transcribe=args.transcribe)
+
+    results = {}
+    for function_name in functions:
+        results[function_name] = {
+            str(level): run_level(function_name, corpus, level, args)
+            for level in args.concurrency
+        }
+
+    report = {
+        'commit': git_commit(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('json', 'output')},
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for function_name, levels in results.items():
+            print(f"== {function_name}")
+            for level, entry in levels.items():
+                latency = entry['latency_ms']
+                print(
+                    f"   concurrence {level:>3} | p50 {latency['p50']:>8} ms | p95 {latency['p95']:>8} ms | "
+                    f"p99 {latency['p99']:>8} ms | {entry['throughput_per_s']:>7} transcriptions/s | "
+                    f"{entry['model_calls_per_transcript']} appels/transcription | "
+                    f"erreurs {entry['errors']} | mémoire {entry['peak_traced_memory_mb']} Mo"
+                )
+                if entry['hedging']:
+                    hedging = entry['hedging']
+                    wins = {key[len('wins.'):]: value for key, value in hedging.items() if key.startswith('wins.')}
+                    print(
+                        f"      hedging | {hedging['hedges']} doubles pour {hedging['calls']} appels | "
+                        f"gagnés par le double {hedging['hedge_wins']} | victoires {wins} | "
+                        f"bascules {hedging['failovers']} | disjonctions {hedging['breaker_opens']}"
+                    )
+
+    failing = [
+        f"{function_name} (concurrence {level}): {entry['errors']} erreurs"
+        for function_name, levels in results.items()
+        for level, entry in levels.items()
+        if entry['errors'] > args.max_errors
+    ]
+    if failing:
+        print(f"ÉCHEC, plus de {args.max_errors} erreurs: {', '.join(failing)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
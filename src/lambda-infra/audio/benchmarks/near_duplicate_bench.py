@@ -0,0 +1,149 @@
+"""
+Réutilisation des évaluations d'appels quasi identiques sur un corpus étiqueté
+
+Les appels courts du corpus (décrochés de SVI, faux numéros, consultations de solde)
+passent dans l'ordre par l'index LSH, comme dans le moteur : un appel proche d'une
+entrée indexée reprend son évaluation, les autres sont évalués puis indexés. L'étiquette
+(scénario et issue) tient lieu d'évaluation : une reprise est correcte si l'entrée
+retenue a la même étiquette.
+
+Pour chaque seuil, le rapport donne :
+    hit_rate    reprises correctes / appels dont l'étiquette était déjà indexée
+    false_reuse reprises d'une autre étiquette / reprises
+    saved       part des appels évalués sans le modèle
+et, en référence, les reprises d'un cache exact (texte reçu, puis texte normalisé).
+
+Usage:
+    python benchmarks/near_duplicate_bench.py [--calls 400] [--thresholds 0.7 0.8 0.9]
+        [--sqlite /tmp/index.db] [--json]
+
+Le code de sortie vaut 1 si, à un seuil au moins égal au seuil par défaut, la part de
+fausses reprises dépasse --max-false-reuse (0 par défaut).
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+
+AUDIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AUDIO_DIR)
+
+from corpus import build_short_call_corpus
+
+from bedrock_common.near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex, shingle_text
+from bedrock_common.result_cache import LRUStore, SQLiteStore
+
+NAMESPACE = 'benchmark#1'
+
+
+def run(corpus, threshold, backend):
+    """
+    Returns:
+        dict: Mesures d'un passage du corpus pour un seuil
+    """
+    index = NearDuplicateIndex(backend, threshold=threshold)
+    indexed_labels = set()
+    eligible = correct = wrong = 0
+    lookup_ms = []
+    for position, item in enumerate(corpus):
+        signature = index.signature_for(item['originalText'])
+        if signature is None:
+            continue
+        if item['label'] in indexed_labels:
+            eligible += 1
+        started = time.perf_counter()
+        match = index.lookup(NAMESPACE, signature)
+        lookup_ms.append((time.perf_counter() - started) * 1000)
+        if match is None:
+            index.add(NAMESPACE, signature, f"{position:06d}", item['fileNameKey'], {'label': item['label']})
+            indexed_labels.add(item['label'])
+        elif match['results']['label'] == item['label']:
+            correct += 1
+        else:
+            wrong += 1
+
+    lookup_ms.sort()
+    reused = correct + wrong
+    return {
+        'threshold': threshold,
+        'calls': len(corpus),
+        'reused': reused,
+        'hit_rate': round(correct / eligible, 4) if eligible else 0.0,
+        'false_reuse': round(wrong / reused, 4) if reused else 0.0,
+        'saved': round(reused / len(corpus), 4),
+        'indexed': index.stats()['added'],
+        'lookup_ms_p50': round(lookup_ms[len(lookup_ms) // 2], 3) if lookup_ms else 0.0,
+    }
+
+
+def exact_hits(corpus, normalized=False):
+    """
+    Reprises d'un cache exact : sur le texte reçu (cache des réponses) ou sur le texte
+    normalisé (hésitations retirées, chiffres masqués)
+    """
+    seen = set()
+    hits = 0
+    for item in corpus:
+        text = item['originalText']
+        if normalized:
+            text = ' '.join(sorted(shingle_text(text)))
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        hits += digest in seen
+        seen.add(digest)
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=400, help='Appels du corpus')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.6, 0.7, 0.8, 0.9, 0.95])
+    parser.add_argument('--filler-rate', type=float, default=0.3, help='Probabilité d\'une hésitation par réplique')
+    parser.add_argument('--sqlite', help='Index dans un fichier SQLite (par défaut en mémoire)')
+    parser.add_argument('--max-false-reuse', type=float, default=0.0,
+                        help='Part de fausses reprises tolérée à partir du seuil par défaut')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='Sortie JSON')
+    args = parser.parse_args()
+
+    corpus = build_short_call_corpus(args.calls, seed=args.seed, filler_rate=args.filler_rate)
+    rows = []
+    for threshold in args.thresholds:
+        if args.sqlite:
+            # Un fichier par seuil : les passages ne partagent pas leurs entrées
+            path = f"{args.sqlite}.{threshold}"
+            if os.path.exists(path):
+                os.remove(path)
+            backend = SQLiteStore(path)
+        else:
+            backend = LRUStore(max_entries=100000)
+        rows.append(run(corpus, threshold, backend))
+
+    report = {
+        'labels': len({item['label'] for item in corpus}),
+        'exact_hits': exact_hits(corpus),
+        'exact_normalized_hits': exact_hits(corpus, normalized=True),
+        'runs': rows,
+    }
+    failing = [
+        row for row in rows
+        if row['threshold'] >= DEFAULT_THRESHOLD and row['false_reuse'] > args.max_false_reuse
+    ]
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 1 if failing else 0
+    print(f"{args.calls} appels, {report['labels']} étiquettes | cache exact: {report['exact_hits']} reprises,"
+          f" {report['exact_normalized_hits']} sur le texte normalisé")
+    for row in rows:
+        print(f"   seuil {row['threshold']:.2f} | reprises {row['reused']} ({100 * row['saved']:.1f} %)"
+              f" | hit rate {100 * row['hit_rate']:.1f} % | fausses reprises {100 * row['false_reuse']:.1f} %"
+              f" | entrées {row['indexed']} | recherche p50 {row['lookup_ms_p50']} ms")
+    for row in failing:
+        print(f"ÉCHEC au seuil {row['threshold']:.2f}: {100 * row['false_reuse']:.1f} % de fausses reprises",
+              file=sys.stderr)
+    return 1 if failing else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Client bedrock-runtime simulé pour les benchmarks hors ligne
+
+Le stub reproduit les interfaces invoke_model et invoke_model_with_response_stream
+utilisées par les lambdas : latence tirée
+d'une distribution configurable, compteurs de tokens (dont lecture/écriture du cache
+de prompt), throttling, appels ralentis (endpoint dégradé) et réponses malformées à un
+taux donné.
+"""
+import io
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+
+INSTRUCTION_PREFIX = 'JSON Schema:\n'
+
+SAMPLE_CONVERSATION_ANALYSIS = {
+    'risk_assessment': {
+        'churn_risk_level': 'Moyen',
+        'churn_probability': 40,
+        'churn_signals': ['Insatisfaction sur la facturation'],
+        'urgent_callback_required': False,
+        'callback_reason': '',
+    },
+    'conversation_metrics': {
+        'agent_talk_ratio': 55,
+        'interruption_count': 2,
+        'emotional_progression': ['Frustration', 'Neutre', 'Soulagement'],
+        'peak_emotion': 'Frustration',
+        'peak_emotion_trigger': 'Montant de la facture',
+        'dominant_sentiment': 'Neutre',
+    },
+    'verbatims': {
+        'critical_statement': "Je ne comprends pas pourquoi ma facture a augmenté",
+        'positive_highlight': 'Merci pour votre aide',
+        'improvement_request': '',
+        'churn_threat': '',
+    },
+}
+
+FILLER_WORDS = (
+    "le client signale un problème de facturation que l'agent analyse avec méthode "
+    "puis propose une solution adaptée et confirme la résolution avant de conclure l'appel"
+).split()
+
+# Facteur de latence d'un appel ralenti (endpoint régional dégradé)
+SLOW_FACTOR = 10
+
+MALFORMED_OUTPUTS = (
+    '{"risk_assessment": {"churn_risk_level": "Moy',
+    'Je ne suis pas en mesure de répondre à cette question.',
+    '',
+    '```json\n{"incomplet": \n```',
+)
+
+
+class StubThrottlingError(Exception):
+    """Erreur au format botocore ClientError (attribut response), sans dépendre de botocore"""
+
+    def __init__(self, code='ThrottlingException', status=429):
+        super().__init__(f"An error occurred ({code}) when calling the InvokeModel operation")
+        self.response = {'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}
+
+
+def parse_latency(spec):
+    """
+    Interprète une distribution de latence en millisecondes
+
+    Formats:
+        fixed:MS
+        uniform:MIN:MAX
+        lognormal:MEDIANE:SIGMA
+
+    Returns:
+        callable: rng -> latence en millisecondes
+    """
+    kind, *values = spec.split(':')
+    values = [float(value) for value in values]
+    if kind == 'fixed':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Distribution de latence inconnue: {spec}")
+
+
+class StubBedrockClient:
+    """
+    Remplace le client bedrock-runtime dans les lambdas (thread-safe)
+
+    Args:
+        latency (str): Distribution du délai avant le premier octet (voir parse_latency)
+        ms_per_output_token (float): Durée de génération par token de sortie
+        output_tokens (int): Longueur des réponses libres, en tokens
+        throttle_rate (float): Probabilité qu'un appel lève un ThrottlingException
+        slow_rate (float): Probabilité qu'un appel soit SLOW_FACTOR fois plus lent avant le premier octet
+        malformed_rate (float): Probabilité qu'une réponse soit tronquée ou hors format
+        answer_for (callable, optional): instruction -> réponse attendue (courte) ou None
+        time_scale (float): Facteur appliqué aux attentes réelles (0.1 = dix fois plus rapide)
+        seed (int, optional): Graine du générateur aléatoire
+    """
+
+    def __init__(self, latency='lognormal:400:0.4', ms_per_output_token=8.0, output_tokens=120,
+                 throttle_rate=0.0, malformed_rate=0.0, answer_for=None, time_scale=1.0, seed=None,
+                 slow_rate=0.0):
+        self._latency = parse_latency(latency)
+        self.ms_per_output_token = ms_per_output_token
+        self.output_tokens = output_tokens
+        self.throttle_rate = throttle_rate
+        self.slow_rate = slow_rate
+        self.malformed_rate = malformed_rate
+        self.answer_for = answer_for
+        self.time_scale = time_scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cached_prefixes = set()
+        self.stats = {'calls': 0, 'throttled': 0, 'malformed': 0, 'slow': 0, 'early_closed': 0}
+
+    def _draw(self):
+        with self._lock:
+            return self._rng.random(), self._rng.random(), self._rng.random(), self._latency(self._rng)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _free_text(self, tokens):
+        words = [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(max(1, tokens * 3 // 4))]
+        return ' '.join(words).capitalize() + '.'
+
+    def _combined_answer(self, instruction):
+        schema_text = instruction.split(INSTRUCTION_PREFIX, 1)[1].split('\n\nCriteria:', 1)[0]
+        properties = json.loads(schema_text)['properties']
+        return json.dumps({
+            key: SAMPLE_CONVERSATION_ANALYSIS if spec['type'] == 'object' else self._free_text(20)
+            for key, spec in properties.items()
+        }, ensure_ascii=False)
+
+    def _answer(self, instruction, max_tokens):
+        if INSTRUCTION_PREFIX in instruction:
+            return self._combined_answer(instruction)
+        if '"risk_assessment"' in instruction:
+            return json.dumps(SAMPLE_CONVERSATION_ANALYSIS, ensure_ascii=False)
+        answer = self.answer_for(instruction) if self.answer_for else None
+        if answer is not None:
+            return answer
+        return self._free_text(min(self.output_tokens, max_tokens))
+
+    def _usage(self, body, text):
+        system_text = ''.join(block['text'] for block in body.get('system', []))
+        blocks = body['messages'][0]['content']
+        prefix_tokens = (len(system_text) + len(blocks[0]['text'])) // 4
+        instruction_tokens = sum(len(block['text']) for block in blocks[1:]) // 4
+        usage = {'input_tokens': instruction_tokens, 'output_tokens': max(1, len(text) // 4)}
+
+        if 'cache_control' not in blocks[0]:
+            usage['input_tokens'] += prefix_tokens
+            return usage
+        prefix_hash = hashlib.sha256((system_text + blocks[0]['text']).encode('utf-8')).hexdigest()
+        with self._lock:
+            cached = prefix_hash in self._cached_prefixes
+            self._cached_prefixes.add(prefix_hash)
+        usage['cache_read_input_tokens' if cached else 'cache_creation_input_tokens'] = prefix_tokens
+        return usage
+
+    def _respond(self, body):
+        """Tire le comportement d'un appel : (requête, texte, usage, latence avant le premier octet)"""
+        self._count('calls')
+        throttle_draw, malformed_draw, slow_draw, latency_ms = self._draw()
+        request = json.loads(body)
+        if slow_draw < self.slow_rate:
+            self._count('slow')
+            latency_ms *= SLOW_FACTOR
+
+        if throttle_draw < self.throttle_rate:
+            self._count('throttled')
+            time.sleep(latency_ms * 0.1 * self.time_scale / 1000)
+            raise StubThrottlingError()
+
+        instruction = request['messages'][0]['content'][-1]['text']
+        if malformed_draw < self.malformed_rate:
+            self._count('malformed')
+            text = MALFORMED_OUTPUTS[int(malformed_draw * 1e6) % len(MALFORMED_OUTPUTS)]
+        else:
+            text = self._answer(instruction, request['max_tokens'])
+
+        return request, text, self._usage(request, text), latency_ms
+
+    def invoke_model(self, modelId, body, contentType=None, accept=None):
+        request, text, usage, latency_ms = self._respond(body)
+        generation_ms = usage['output_tokens'] * self.ms_per_output_token
+        time.sleep((latency_ms + generation_ms) * self.time_scale / 1000)
+
+        payload = {
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn',
+            'usage': usage,
+        }
+        return {'body': io.BytesIO(json.dumps(payload).encode('utf-8'))}
+
+    def invoke_model_with_response_stream(self, modelId, body, contentType=None, accept=None):
+        request, text, usage, latency_ms = self._respond(body)
+        time.sleep(latency_ms * self.time_scale / 1000)
+        return {'body': StubEventStream(self, text, usage)}
+
+    def list_async_invokes(self, **kwargs):
+        return {'asyncInvokeSummaries': []}
+
+
+class StubEventStream:
+    """
+    Flux d'événements au format invoke_model_with_response_stream : message_start, un
+    content_block_delta par fragment de ~4 caractères (un token), message_delta, message_stop.
+    La durée de génération s'écoule au fil des fragments ; close() arrête la génération.
+    """
+
+    CHUNK_CHARS = 4
+
+    def __init__(self, client, text, usage):
+        self.client = client
+        self.text = text
+        self.usage = usage
+        self.closed = False
+        self.chunks_sent = 0
+
+    @staticmethod
+    def _event(message):
+        return {'chunk': {'bytes': json.dumps(message, ensure_ascii=False).encode('utf-8')}}
+
+    def __iter__(self):
+        start_usage = {key: value for key, value in self.usage.items() if key != 'output_tokens'}
+        yield self._event({'type': 'message_start', 'message': {'usage': dict(start_usage, output_tokens=1)}})
+        # Échéancier absolu : le coût des réveils ne s'accumule pas d'un fragment à l'autre
+        started = time.perf_counter()
+        per_chunk = self.client.ms_per_output_token * self.client.time_scale / 1000
+        for index in range(0, len(self.text), self.CHUNK_CHARS):
+            if self.closed:
+                return
+            delay = started + (self.chunks_sent + 1) * per_chunk - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.chunks_sent += 1
+            yield self._event({
+                'type': 'content_block_delta',
+                'index': 0,
+                'delta': {'type': 'text_delta', 'text': self.text[index:index + self.CHUNK_CHARS]},
+            })
+        yield self._event({
+            'type': 'message_delta',
+            'delta': {'stop_reason': 'end_turn'},
+            'usage': {'output_tokens': self.usage['output_tokens']},
+        })
+        yield self._event({'type': 'message_stop'})
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.client._count('early_closed')
+
+
+class StubLambdaContext:
+    """Contexte Lambda minimal : temps restant décompté depuis la création"""
+
+    def __init__(self, timeout_seconds=240, function_name='benchmark'):
+        self.function_name = function_name
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
@@ -0,0 +1,156 @@
+"""
+Gain de tokens du prétraitement des transcriptions (compactage et map-reduce)
+
+Le corpus synthétique au format Transcribe (texte continu, audioSegments par locuteur,
+hésitations, boucles du message d'attente) passe par prepare_transcript : le rapport
+donne par taille d'appel les tokens de la transcription d'origine, ceux envoyés à
+chaque prompt, l'économie et le mode retenu (compact ou map_reduce).
+
+Avec --evaluate, la lambda bedrock_evaluate est exécutée sur le même corpus avec le
+client simulé, prétraitement désactivé puis activé, pour comparer les tokens d'entrée
+réellement facturés (appels de résumé compris) et le nombre d'appels.
+
+Les cas de NORMALIZATION_CASES (chiffres répétés conservés, bruit retiré) sont vérifiés
+à chaque exécution : code de sortie 1 en cas d'écart.
+
+Usage:
+    python benchmarks/transcript_preprocessing.py [--size 8] [--lengths short medium long marathon]
+        [--evaluate] [--json]
+"""
+import io
+import os
+import sys
+import json
+import logging
+import argparse
+from contextlib import redirect_stdout
+
+AUDIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AUDIO_DIR)
+
+from corpus import LENGTHS, build_corpus
+from load_test import load_function, make_answer_for
+from stub_bedrock import StubBedrockClient, StubLambdaContext
+
+from bedrock_common.engine import load_prompts_config
+from bedrock_common.metrics import TOKEN_FIELDS
+from bedrock_common.transcript import normalize_text, prepare_transcript
+
+
+# Normalisation attendue : le bruit disparaît, les faits (numéros, montants) restent intacts
+NORMALIZATION_CASES = (
+    ("Mon numéro est 77 77 77 12 et le montant 5 5 5 euros", "Mon numéro est 77 77 77 12 et le montant 5 5 5 euros"),
+    ("euh bonjour bonjour bonjour madame", "bonjour madame"),
+    ("[musique] merci de patienter merci de patienter merci de patienter", "merci de patienter"),
+)
+
+
+def check_normalization():
+    """
+    Returns:
+        list: (entrée, attendu, obtenu) des cas de NORMALIZATION_CASES en écart
+    """
+    failures = []
+    for text, expected in NORMALIZATION_CASES:
+        normalized = normalize_text(text)
+        if normalized != expected:
+            failures.append((text, expected, normalized))
+    return failures
+
+
+def preparation_report(corpus, prompt_count):
+    """Tokens d'origine et envoyés, par taille d'appel"""
+    by_length = {}
+    for item in corpus:
+        prepared = prepare_transcript(item['originalText'], item['audioSegments'])
+        report = prepared.report(prompt_count)
+        row = by_length.setdefault(item['length'], {
+            'transcripts': 0, 'original_tokens': 0, 'prompt_tokens': 0, 'modes': {}, 'chunks': 0,
+        })
+        row['transcripts'] += 1
+        row['original_tokens'] += report['original_tokens']
+        # Hors map-reduce le texte envoyé est connu sans appel ; les résumés sont mesurés par --evaluate
+        row['prompt_tokens'] += report['compact_tokens'] if prepared.chunks else report['prompt_tokens']
+        row['modes'][prepared.mode] = row['modes'].get(prepared.mode, 0) + 1
+        row['chunks'] += report['chunks']
+    for row in by_length.values():
+        row['saved_pct'] = round(100 * (1 - row['prompt_tokens'] / row['original_tokens']), 1)
+    return by_length
+
+
+def evaluation_report(corpus, compaction, seed):
+    """Tokens d'entrée facturés et appels de bedrock_evaluate sur le corpus"""
+    os.environ['TRANSCRIPT_COMPACTION'] = 'true' if compaction else 'false'
+    module = load_function('bedrock_evaluate')
+    stub = StubBedrockClient(
+        latency='fixed:0',
+        ms_per_output_token=0,
+        answer_for=make_answer_for(module.engine.get_registry(), seed),
+        seed=seed,
+    )
+    module.engine.client = stub
+
+    input_tokens = 0
+    for item in corpus:
+        event = {
+            'originalText': item['originalText'],
+            'audioSegments': item['audioSegments'],
+            'fileNameKey': item['fileNameKey'],
+            'analysis': 'benchmark',
+        }
+        with redirect_stdout(io.StringIO()):
+            output = module.lambda_handler(event, StubLambdaContext())
+        tokens = output['monitoring']['bedrock']['callMining']['metrics']['tokens']
+        input_tokens += sum(tokens[field] for field in TOKEN_FIELDS if field != 'output_tokens')
+    return {'model_calls': stub.stats['calls'], 'input_tokens': input_tokens}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=8, help='Nombre de transcriptions')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--lengths', nargs='+', default=list(LENGTHS) + ['marathon'])
+    parser.add_argument('--evaluate', action='store_true', help='Exécute bedrock_evaluate avec et sans prétraitement')
+    parser.add_argument('--log-level', default='ERROR')
+    parser.add_argument('--json', action='store_true', help='Sortie JSON')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level)
+    os.environ['BEDROCK_STARTUP_MODE'] = 'lazy'
+    os.environ['BEDROCK_CACHE_ENABLED'] = 'false'
+    config = load_prompts_config()
+    corpus = build_corpus(config, size=args.size, seed=args.seed, lengths=tuple(args.lengths), transcribe=True)
+    prompt_count = len(config['prompt_priorities'])
+
+    failures = check_normalization()
+    report = {'normalization_failures': failures, 'preparation': preparation_report(corpus, prompt_count)}
+    if args.evaluate:
+        report['evaluation'] = {
+            'verbatim': evaluation_report(corpus, False, args.seed),
+            'preprocessed': evaluation_report(corpus, True, args.seed),
+        }
+        verbatim, preprocessed = report['evaluation']['verbatim'], report['evaluation']['preprocessed']
+        report['evaluation']['saved_input_pct'] = round(
+            100 * (1 - preprocessed['input_tokens'] / verbatim['input_tokens']), 1
+        )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 1 if failures else 0
+    for text, expected, normalized in failures:
+        print(f"ÉCART de normalisation | {text!r}\n   attendu {expected!r}\n   obtenu  {normalized!r}")
+    for length, row in report['preparation'].items():
+        print(f"{length:>9} | {row['transcripts']:>2} appels | {row['original_tokens']:>7} tokens d'origine"
+              f" | {row['prompt_tokens']:>7} envoyés | économie {row['saved_pct']:>5}% | modes {row['modes']}"
+              f" | morceaux {row['chunks']}")
+    if args.evaluate:
+        evaluation = report['evaluation']
+        for name in ('verbatim', 'preprocessed'):
+            print(f"{name:>12} | {evaluation[name]['model_calls']:>4} appels"
+                  f" | {evaluation[name]['input_tokens']:>9} tokens d'entrée facturés")
+        print(f"{'économie':>12} | {evaluation['saved_input_pct']}% des tokens d'entrée")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
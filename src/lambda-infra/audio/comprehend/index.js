@@ -53,6 +53,7 @@ exports.handler = async (event) => {
 
         return {
             originalText: transcriptText,
+            audioSegments: event.audioSegments,
             analysis,
             fileNameKey: event.fileNameKey,
             campaign_type: event.campaign_type
@@ -3,6 +3,11 @@ const s3 = new AWS.S3();
 const dynamodb = new AWS.DynamoDB.DocumentClient();
 
 const TABLE_NAME = process.env.TABLE_NAME;
+// Taille max des segments transmis à l'évaluation (limite de 256 Ko du payload Step Functions)
+const MAX_SEGMENTS_PAYLOAD_BYTES = parseInt(process.env.MAX_SEGMENTS_PAYLOAD_BYTES || '120000', 10);
+// Limite de l'état Step Functions et marge pour les autres champs (monitoring, analyse, identifiants)
+const STATE_PAYLOAD_LIMIT_BYTES = 256 * 1024;
+const STATE_PAYLOAD_MARGIN_BYTES = 32 * 1024;
 
 /**
  * Récupère le contenu du transcript depuis S3
@@ -70,6 +75,19 @@ exports.handler = async (event) => {
 
     const transcriptText = transcriptJson.results?.transcripts?.[0]?.transcript || '';
     console.log('Texte extrait du transcript :', transcriptText);
+
+    // Tours de parole par locuteur pour le compactage de la transcription avant évaluation
+    // Le texte et les segments voyagent ensemble dans l'état : le budget des segments tient
+    // compte de la taille de la transcription
+    let audioSegments = dialogue_segments_cleaned.map(({ speaker_label, transcript }) => ({ speaker_label, transcript }));
+    const segmentsBudget = Math.min(
+      MAX_SEGMENTS_PAYLOAD_BYTES,
+      STATE_PAYLOAD_LIMIT_BYTES - STATE_PAYLOAD_MARGIN_BYTES - Buffer.byteLength(JSON.stringify(transcriptText), 'utf8')
+    );
+    if (Buffer.byteLength(JSON.stringify(audioSegments), 'utf8') > segmentsBudget) {
+      console.log(`Segments trop volumineux pour le payload (${audioSegments.length} segments, budget ${segmentsBudget} octets), non transmis`);
+      audioSegments = undefined;
+    }
     if (!key.endsWith('.json')) {
       return {
         ignored: true,
@@ -82,6 +100,7 @@ exports.handler = async (event) => {
     return {
       ignored: false,
       transcriptText: transcriptText,
+      audioSegments,
       jobName: jobName,
       bucket,
       key,
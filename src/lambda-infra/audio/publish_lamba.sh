@@ -45,6 +45,9 @@ zip_python_function() {
     cd $function_name
     zip -r ../${function_name}.zip . -x "*.git*" "*.DS_Store*" "*__pycache__*" "*.pyc"
     cd ..
+
+    # Ajouter les modules partagés à la racine de l'archive
+    zip -r ${function_name}.zip bedrock_common -x "*__pycache__*" "*.pyc"
     echo "✅ $function_name zipped successfully"
 }
 
@@ -1,6 +1,136 @@
 const AWS = require('aws-sdk');
 const dynamodb = new AWS.DynamoDB.DocumentClient();
 
+/**
+ * Différence entre la contribution d'un relevé et celle du relevé précédent du même audio
+ * (une réévaluation corrige les agrégats au lieu de compter l'audio deux fois)
+ * @param {Object} counters - Compteurs du nouveau relevé (scoreRecord.counters)
+ * @param {Object} [previousCounters] - Compteurs du relevé déjà enregistré
+ * @returns {Object} - Compteurs non nuls à ajouter aux agrégats
+ */
+function counterDelta(counters, previousCounters) {
+    const delta = {};
+    const names = new Set([...Object.keys(counters || {}), ...Object.keys(previousCounters || {})]);
+    names.forEach(name => {
+        const value = ((counters || {})[name] || 0) - ((previousCounters || {})[name] || 0);
+        if (value !== 0) {
+            delta[name] = value;
+        }
+    });
+    return delta;
+}
+
+// Tentatives de la transaction relevé + agrégats : lastUpdated, verrou optimiste de l'item
+// audio, est aussi écrit par check-status et le déclencheur Step Functions
+const MAX_SCORE_TRANSACTION_ATTEMPTS = 4;
+const SCORE_TRANSACTION_RETRY_BASE_MS = 50;
+
+/**
+ * Transaction annulée par la condition sur lastUpdated (écriture concurrente de l'item audio)
+ * @param {Error} error - Erreur de transactWrite
+ * @returns {boolean}
+ */
+function isConcurrentUpdate(error) {
+    return error.code === 'TransactionCanceledException'
+        && /ConditionalCheckFailed|TransactionConflict/.test(error.message || '');
+}
+
+/**
+ * Transaction écrivant le résultat et le relevé de l'audio, conditionnée au lastUpdated lu,
+ * et ajoutant aux agrégats la différence avec le relevé précédent
+ * @returns {Object} - transactItems et delta des compteurs
+ */
+function buildScoreTransaction(tableName, campaignId, audioKey, analysis, bedrockResult, scoreRecord, previousItem, now) {
+    const delta = counterDelta(scoreRecord.counters, (previousItem.scoreRecord || {}).counters);
+
+    const audioUpdate = {
+        TableName: tableName,
+        Key: audioKey,
+        UpdateExpression: 'SET analysisStatus = :status, analysis = :analysis, bedrockResult = :bedrockResult, scoreRecord = :scoreRecord, lastUpdated = :now',
+        ExpressionAttributeValues: {
+            ':status': 'COMPLETE',
+            ':analysis': analysis || {},
+            ':bedrockResult': bedrockResult || {},
+            ':scoreRecord': scoreRecord,
+            ':now': now
+        }
+    };
+    if (previousItem.lastUpdated) {
+        audioUpdate.ConditionExpression = 'lastUpdated = :previousUpdate';
+        audioUpdate.ExpressionAttributeValues[':previousUpdate'] = previousItem.lastUpdated;
+    } else {
+        audioUpdate.ConditionExpression = 'attribute_not_exists(lastUpdated)';
+    }
+
+    const transactItems = [{ Update: audioUpdate }];
+    const names = Object.keys(delta);
+    if (names.length > 0) {
+        const attributeNames = {};
+        const attributeValues = { ':now': now, ':schemaVersion': scoreRecord.schema_version };
+        names.forEach((name, index) => {
+            attributeNames[`#c${index}`] = name;
+            attributeValues[`:c${index}`] = delta[name];
+        });
+        transactItems.push({
+            Update: {
+                TableName: tableName,
+                Key: { Id: campaignId, METADATA: `SCORES#${campaignId}` },
+                UpdateExpression: `ADD ${names.map((name, index) => `#c${index} :c${index}`).join(', ')} SET lastUpdated = :now, schemaVersion = :schemaVersion`,
+                ExpressionAttributeNames: attributeNames,
+                ExpressionAttributeValues: attributeValues
+            }
+        });
+    }
+    return { transactItems, delta };
+}
+
+/**
+ * Enregistre le résultat et le relevé de scores d'un audio, et ajoute sa contribution aux
+ * agrégats de la campagne (item SCORES#campaignId) dans la même transaction
+ *
+ * Si l'item audio a été modifié entre la lecture et la transaction, le relevé précédent est
+ * relu et la transaction rejouée (MAX_SCORE_TRANSACTION_ATTEMPTS tentatives au plus)
+ * @returns {Promise<Object>} - Attributs mis à jour sur l'item audio
+ */
+async function storeWithScoreRecord(tableName, campaignId, fileName, analysis, bedrockResult, scoreRecord) {
+    const audioKey = { Id: fileName, METADATA: `AUDIO#${campaignId}` };
+
+    for (let attempt = 1; ; attempt++) {
+        const now = new Date().toISOString();
+        // Relevé précédent (réévaluation) : la transaction échoue s'il a changé entre-temps
+        const previous = await dynamodb.get({
+            TableName: tableName,
+            Key: audioKey,
+            ProjectionExpression: 'scoreRecord, lastUpdated',
+            ConsistentRead: true
+        }).promise();
+        const { transactItems, delta } = buildScoreTransaction(
+            tableName, campaignId, audioKey, analysis, bedrockResult, scoreRecord, previous.Item || {}, now
+        );
+
+        try {
+            await dynamodb.transactWrite({ TransactItems: transactItems }).promise();
+        } catch (error) {
+            if (!isConcurrentUpdate(error) || attempt >= MAX_SCORE_TRANSACTION_ATTEMPTS) {
+                throw error;
+            }
+            const delayMs = SCORE_TRANSACTION_RETRY_BASE_MS * attempt * (1 + Math.random());
+            console.warn(`Item audio modifié pendant l'enregistrement du relevé (tentative ${attempt}), nouvelle lecture dans ${Math.round(delayMs)} ms`);
+            await new Promise(resolve => setTimeout(resolve, delayMs));
+            continue;
+        }
+        console.log(`Mise à jour DynamoDB réussie avec relevé de scores, agrégats de campagne: ${JSON.stringify(delta)}`);
+
+        return {
+            analysisStatus: 'COMPLETE',
+            analysis: analysis || {},
+            bedrockResult: bedrockResult || {},
+            scoreRecord: scoreRecord,
+            lastUpdated: now
+        };
+    }
+}
+
 exports.handler = async (event) => {
     const TABLE_NAME = process.env.TABLE_NAME;
     console.log('Event reçu:', JSON.stringify(event));
@@ -98,6 +228,18 @@ exports.handler = async (event) => {
                 updatedAttributes: errorResult.Attributes,
                 monitoring: event.monitoring
             };
+        } else if (event.scoreRecord) {
+            // CAS NOMINAL AVEC RELEVÉ DE SCORES (post-appel) - résultat et agrégats de campagne mis à jour ensemble
+            const updatedAttributes = await storeWithScoreRecord(TABLE_NAME, campaignId, fileName, analysis, bedrockResult, event.scoreRecord);
+
+            event.monitoring.storage.end = new Date().toISOString();
+
+            return {
+                statusCode: 200,
+                body: 'Response stored as COMPLETED',
+                updatedAttributes: updatedAttributes,
+                monitoring: event.monitoring
+            };
         } else {
             // CAS NOMINAL - Traitement normal lorsqu'aucune erreur n'est détectée
             const params = {
@@ -0,0 +1,15 @@
+"""
+Tests des lambdas d'évaluation Bedrock, sans appel réel
+
+Les modules de benchmarks/ (corpus synthétique, client simulé, sorties de référence)
+sont importés tels quels : les tests vérifient ce que les benchmarks mesurent.
+
+Usage:
+    python -m pytest src/lambda-infra/audio/tests
+"""
+import os
+import sys
+
+AUDIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AUDIO_DIR)
+sys.path.insert(0, os.path.join(AUDIO_DIR, 'benchmarks'))
@@ -0,0 +1,179 @@
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+from corpus import build_corpus
+from load_test import load_function, make_answer_for
+from stub_bedrock import StubBedrockClient, StubLambdaContext, StubThrottlingError
+
+from bedrock_common.rate_limiter import AdaptiveConcurrencyLimiter, AdmissionController, DeadlineExceededError
+
+
+@pytest.fixture
+def evaluate(monkeypatch):
+    """Lambda bedrock_evaluate neuve, sans cache ni limite de débit, attentes de backoff réduites"""
+    for name, value in {
+        'BEDROCK_STARTUP_MODE': 'lazy',
+        'BEDROCK_EVALUATION_MODE': 'per_prompt',
+        'BEDROCK_STREAMING': 'false',
+        'BEDROCK_CACHE_ENABLED': 'false',
+        'BEDROCK_HEDGING': 'false',
+        'BEDROCK_RPM': '0',
+        'BEDROCK_TPM': '0',
+        'BEDROCK_BACKOFF_BASE_SECONDS': '0.001',
+        'BEDROCK_BACKOFF_MAX_SECONDS': '0.01',
+        # 30 % de throttling : la probabilité d'épuiser 12 tentatives sur un appel reste négligeable
+        'BEDROCK_MAX_RETRIES': '12',
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv('AWS_LAMBDA_FUNCTION_NAME', raising=False)
+    monkeypatch.delenv('CHECKPOINT_TABLE', raising=False)
+    monkeypatch.delenv('CHECKPOINT_SQLITE_PATH', raising=False)
+    return load_function('bedrock_evaluate')
+
+
+def run(module, transcript):
+    event = {'originalText': transcript['originalText'], 'fileNameKey': transcript['fileNameKey'], 'analysis': 'test'}
+    with redirect_stdout(io.StringIO()):
+        return module.lambda_handler(event, StubLambdaContext())
+
+
+def test_throttled_calls_are_retried_until_complete(evaluate):
+    registry = evaluate.engine.get_registry()
+    stub = StubBedrockClient(
+        latency='fixed:0', ms_per_output_token=0, throttle_rate=0.3,
+        answer_for=make_answer_for(registry, 1), seed=1,
+    )
+    evaluate.engine.client = stub
+
+    for transcript in build_corpus(registry.config, size=3, seed=1):
+        output = run(evaluate, transcript)
+        assert output['statusCode'] == 200
+        assert output['failedKeys'] == [] and not output['incomplete']
+
+    stats = evaluate.engine.admission.stats()
+    assert stub.stats['throttled'] > 0
+    assert stats['retries'] == stats['throttles'] == stub.stats['throttled']
+    assert stats['failures'] == 0
+
+
+def test_backoff_then_success():
+    sleeps = []
+    errors = [StubThrottlingError(), StubThrottlingError('ServiceUnavailableException', 503)]
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return 'ok'
+
+    controller = AdmissionController('model', requests_per_minute=0, tokens_per_minute=0,
+                                     sleep=sleeps.append, rng=lambda: 1.0)
+    report = {}
+    assert controller.call(call, report=report) == 'ok'
+    assert report['retries'] == 2
+    assert sleeps == [controller.backoff_base, controller.backoff_base * 2]
+    assert controller.stats()['throttles'] == 1
+    assert controller.stats()['server_errors'] == 1
+
+
+def test_non_retryable_error_is_raised_at_once():
+    controller = AdmissionController('model', requests_per_minute=0, tokens_per_minute=0, sleep=lambda _: None)
+
+    def call():
+        raise ValueError('requête invalide')
+
+    with pytest.raises(ValueError):
+        controller.call(call)
+    assert controller.stats()['retries'] == 0
+    assert controller.stats()['failures'] == 1
+
+
+def test_retries_are_bounded():
+    controller = AdmissionController('model', requests_per_minute=0, tokens_per_minute=0, max_retries=2,
+                                     sleep=lambda _: None)
+
+    def call():
+        raise StubThrottlingError()
+
+    with pytest.raises(StubThrottlingError):
+        controller.call(call)
+    assert controller.stats()['retries'] == 2
+
+
+def test_concurrency_limit_is_aimd():
+    limiter = AdaptiveConcurrencyLimiter(8)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 5
+
+
+def test_backoff_past_the_deadline_is_not_slept():
+    sleeps = []
+    controller = AdmissionController('model', requests_per_minute=0, tokens_per_minute=0,
+                                     sleep=sleeps.append, rng=lambda: 1.0)
+
+    def call():
+        raise StubThrottlingError()
+
+    with pytest.raises(DeadlineExceededError):
+        controller.call(call, remaining_ms=lambda: controller.backoff_base * 1000 / 2)
+    assert sleeps == []
+    assert controller.stats()['deadline_exceeded'] == 1
+
+
+def test_deadline_defers_throttled_prompts(evaluate):
+    """Throttling continu près de l'échéance : les prompts sont reportés, l'invocation rend la main"""
+    registry = evaluate.engine.get_registry()
+    evaluate.engine.client = StubBedrockClient(
+        latency='fixed:0', ms_per_output_token=0, throttle_rate=1.0,
+        answer_for=make_answer_for(registry, 1), seed=1,
+    )
+    admission = evaluate.engine.admission
+    admission.backoff_base = admission.backoff_max = 30.0
+    admission._rng = lambda: 1.0
+    transcript = build_corpus(registry.config, size=1, seed=1)[0]
+    event = {'originalText': transcript['originalText'], 'fileNameKey': transcript['fileNameKey'], 'analysis': 'test'}
+
+    with redirect_stdout(io.StringIO()):
+        output = evaluate.lambda_handler(event, StubLambdaContext(timeout_seconds=20))
+
+    assert output['statusCode'] == 206
+    assert output['deferredKeys'] and not output['failedKeys']
+    assert admission.stats()['backoff_wait_seconds'] == 0
+    assert admission.stats()['deadline_exceeded'] > 0
+
+
+def test_rate_wait_past_the_deadline_is_not_slept():
+    sleeps = []
+    controller = AdmissionController('model', requests_per_minute=1, tokens_per_minute=0, sleep=sleeps.append)
+    controller.call(lambda: 'ok')
+
+    # Prochaine place dans une minute, échéance dans dix secondes
+    with pytest.raises(DeadlineExceededError):
+        controller.call(lambda: 'ok', remaining_ms=lambda: 10000)
+    assert sleeps == []
+    assert controller.stats()['deadline_exceeded'] == 1
+    # La réservation abandonnée est rendue : l'attente suivante ne s'allonge pas
+    assert controller.request_bucket.reserve(1) == pytest.approx(60, abs=1)
+
+
+def test_try_admit_never_waits():
+    controller = AdmissionController('model', requests_per_minute=2, tokens_per_minute=1000, max_concurrency=1)
+    assert controller.try_admit(100)
+    # Concurrence épuisée : refus, et les jetons réservés sont rendus
+    assert not controller.try_admit(100)
+    assert controller.concurrency.limit == 1
+    controller.release()
+    # TPM insuffisant : refus sans consommer la requête du seau RPM
+    assert not controller.try_admit(1000)
+    assert controller.try_admit(100)
+    controller.release()
+    assert not controller.try_admit(100)
+    stats = controller.stats()
+    assert stats['extra_requests'] == 2
+    assert stats['refused_extra_requests'] == 3
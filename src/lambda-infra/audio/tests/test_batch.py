@@ -0,0 +1,120 @@
+import io
+import json
+from contextlib import redirect_stdout
+
+import pytest
+
+from corpus import build_corpus
+from load_test import load_function, make_answer_for
+from stub_bedrock import StubBedrockClient, StubLambdaContext
+
+from bedrock_common import scheduler
+from bedrock_common.batch import (
+    DEFAULT_BATCH_ITEM_CONCURRENCY, estimate_item_ms, get_batch_item_concurrency, parse_batch_event,
+)
+from bedrock_common.scheduler import LatencyModel
+
+
+@pytest.fixture
+def module(monkeypatch):
+    for name, value in {
+        'BEDROCK_STARTUP_MODE': 'lazy',
+        'BEDROCK_EVALUATION_MODE': 'per_prompt',
+        'BEDROCK_STREAMING': 'false',
+        'BEDROCK_CACHE_ENABLED': 'false',
+        'BEDROCK_HEDGING': 'false',
+        'BEDROCK_RPM': '0',
+        'BEDROCK_TPM': '0',
+        'BATCH_ITEM_CONCURRENCY': '2',
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv('CHECKPOINT_TABLE', raising=False)
+    monkeypatch.delenv('CHECKPOINT_SQLITE_PATH', raising=False)
+    module = load_function('bedrock_evaluate')
+    module.engine.client = StubBedrockClient(
+        latency='fixed:0', ms_per_output_token=0, answer_for=make_answer_for(module.engine.get_registry(), 1), seed=1,
+    )
+    return module
+
+
+@pytest.fixture
+def corpus(module):
+    return build_corpus(module.engine.get_registry().config, size=3, seed=6)
+
+
+def item_for(transcript):
+    return {key: transcript[key] for key in ('originalText', 'fileNameKey')}
+
+
+def run_batch(module, event, context=None):
+    with redirect_stdout(io.StringIO()):
+        return module.batch_handler(event, context or StubLambdaContext())
+
+
+def test_parse_items_with_event_defaults():
+    items, failures = parse_batch_event({
+        'suites': 'all',
+        'items': [{'fileNameKey': 'a.json', 'originalText': 't'}, 'pas un objet',
+                  {'itemIdentifier': 'id-b', 'originalText': 't', 'suites': 'post_call_survey'}],
+    })
+    assert items == [
+        ('a.json', {'suites': 'all', 'fileNameKey': 'a.json', 'originalText': 't'}),
+        ('id-b', {'suites': 'post_call_survey', 'itemIdentifier': 'id-b', 'originalText': 't'}),
+    ]
+    assert [identifier for identifier, _ in failures] == ['1']
+
+
+def test_parse_sqs_records():
+    items, failures = parse_batch_event({'Records': [
+        {'messageId': 'm1', 'body': json.dumps({'fileNameKey': 'a.json', 'originalText': 't'})},
+        {'messageId': 'm2', 'body': '{pas du json'},
+        {'messageId': 'm3', 'body': '[1, 2]'},
+    ]})
+    assert [identifier for identifier, _ in items] == ['m1']
+    assert [identifier for identifier, _ in failures] == ['m2', 'm3']
+
+
+def test_estimate_item_ms():
+    assert estimate_item_ms(11, 4, 1000) == 3000
+    assert estimate_item_ms(3, 0, 1000) == 3000
+
+
+def test_item_concurrency_from_environment(monkeypatch):
+    monkeypatch.setenv('BATCH_ITEM_CONCURRENCY', '0')
+    assert get_batch_item_concurrency() == 1
+    monkeypatch.setenv('BATCH_ITEM_CONCURRENCY', 'x')
+    assert get_batch_item_concurrency() == DEFAULT_BATCH_ITEM_CONCURRENCY
+
+
+def test_sqs_batch_reports_only_retryable_failures(module, corpus):
+    records = [
+        {'messageId': f"m{index}", 'body': json.dumps(item_for(transcript))}
+        for index, transcript in enumerate(corpus)
+    ]
+    records.append({'messageId': 'illisible', 'body': '{'})
+    records.append({'messageId': 'sans-texte', 'body': json.dumps({'fileNameKey': 'vide.json'})})
+
+    output = run_batch(module, {'Records': records})
+
+    assert [result['itemIdentifier'] for result in output['results']] == ['m0', 'm1', 'm2']
+    assert all(result['statusCode'] == 200 for result in output['results'])
+    assert sorted(failure['itemIdentifier'] for failure in output['failures']) == ['illisible', 'sans-texte']
+    # Entrées invalides : une nouvelle tentative échouerait de la même façon
+    assert output['batchItemFailures'] == []
+    assert output['summary']['items'] == 5
+    assert output['summary']['succeeded'] == 3
+
+
+def test_items_past_the_deadline_are_not_started(module, corpus, monkeypatch):
+    # Estimations par défaut, sans les latences apprises des tests précédents
+    monkeypatch.setattr(scheduler, '_latency_model', LatencyModel())
+    monkeypatch.delenv('DEADLINE_SAFETY_MARGIN_MS', raising=False)
+    output = run_batch(module, {'items': [item_for(transcript) for transcript in corpus]},
+                       StubLambdaContext(timeout_seconds=6))
+
+    assert output['results'] == []
+    assert {failure['statusCode'] for failure in output['failures']} == {503}
+    assert sorted(entry['itemIdentifier'] for entry in output['batchItemFailures']) == sorted(
+        transcript['fileNameKey'] for transcript in corpus
+    )
+    assert module.engine.client.stats['calls'] == 0
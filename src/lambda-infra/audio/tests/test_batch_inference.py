@@ -0,0 +1,91 @@
+import pytest
+
+from corpus import build_corpus
+from load_test import make_answer_for
+from stub_bedrock import StubBedrockClient
+
+from bedrock_common.batch_inference import (
+    LocalBatchSubmitter, assemble_results, build_batch_records, make_record_id, parse_record_id, run_pipeline,
+)
+from bedrock_common.engine import load_prompts_config
+from bedrock_common.prompt_registry import PromptConfigStore
+from bedrock_common.suites import select_suites
+
+
+@pytest.fixture(scope='module')
+def registry():
+    return PromptConfigStore(load_prompts_config).get_registry()
+
+
+@pytest.fixture(scope='module')
+def corpus(registry):
+    return build_corpus(registry.config, size=4, seed=3)
+
+
+def stub_for(registry, **kwargs):
+    return StubBedrockClient(latency='fixed:0', ms_per_output_token=0, answer_for=make_answer_for(registry, 3),
+                             seed=3, **kwargs)
+
+
+def test_record_id_round_trip():
+    file_name_key = 'campagne~2/appel #12 é.mp3'
+    assert parse_record_id(make_record_id(file_name_key, 'callMining', 'resume')) == (
+        file_name_key, 'callMining', 'resume'
+    )
+
+
+def test_pipeline_completes_every_suite(registry, corpus, tmp_path):
+    suites = select_suites({'suites': 'all'}, ())
+    stub = stub_for(registry)
+    outputs = run_pipeline(corpus, suites, lambda model_id: LocalBatchSubmitter(stub, model_id=model_id),
+                           str(tmp_path), registry=registry)
+
+    assert sorted(outputs) == sorted(item['fileNameKey'] for item in corpus)
+    assert stub.stats['calls'] == len(corpus) * sum(len(suite.prompt_jobs(registry)) for suite in suites)
+    for by_suite in outputs.values():
+        assert sorted(by_suite) == sorted(suite.name for suite in suites)
+        for suite in suites:
+            output = by_suite[suite.name]
+            assert output['statusCode'] == 200 and output['failedKeys'] == []
+            assert sorted(output['bedrockResult']) == sorted(suite.result_keys)
+            for key in suite.json_keys:
+                assert isinstance(output['bedrockResult'][key], dict)
+
+
+def test_unusable_records_are_failed_keys(registry, corpus):
+    suites = select_suites({'suites': 'all'}, ())
+    records = [
+        {'recordId': record['recordId'], 'error': {'errorMessage': 'ModelTimeoutException'}}
+        for model_records in build_batch_records(corpus[:1], suites, registry).values()
+        for record in model_records
+    ]
+    outputs = assemble_results(records, registry, corpus[:1])
+
+    for suite in suites:
+        output = outputs[corpus[0]['fileNameKey']][suite.name]
+        assert output['statusCode'] == 206
+        assert output['failedKeys'] == list(suite.result_keys)
+        assert output['bedrockResult'] == {}
+
+
+def test_invalid_short_answer_is_a_failed_key(registry, corpus):
+    """Réponse refusée par le validateur du profil : la clé est à réévaluer"""
+    suites = select_suites({'suites': 'all'}, ())
+    records = []
+    for model_records in build_batch_records(corpus[:1], suites, registry).values():
+        for record in model_records:
+            records.append({
+                'recordId': record['recordId'],
+                'modelOutput': {'content': [{'text': 'Peut-être'}], 'usage': {'input_tokens': 1, 'output_tokens': 1}},
+            })
+    outputs = assemble_results(records, registry, corpus[:1])
+
+    checked = 0
+    for suite in suites:
+        output = outputs[corpus[0]['fileNameKey']][suite.name]
+        for key in suite.result_keys:
+            if key in suite.json_keys or not registry.profile_for_prompt(registry.get(suite.prompts[key])).validator:
+                continue
+            assert key in output['failedKeys'] and key not in output['bedrockResult']
+            checked += 1
+    assert checked
@@ -0,0 +1,130 @@
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+from corpus import build_corpus
+from load_test import load_function, make_answer_for
+from stub_bedrock import StubBedrockClient, StubLambdaContext
+
+from bedrock_common.checkpoints import CheckpointStore, create_checkpoint_store
+from bedrock_common.result_cache import SQLiteStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(SQLiteStore(str(tmp_path / 'checkpoints.db')), max_attempts=3)
+
+
+def test_save_then_load(store):
+    store.save('quality_analysis', 'a.json', '1.5', 'transcription', {'resume': 'ok'}, ['statut'])
+    checkpoint = store.load('quality_analysis', 'a.json', '1.5', 'transcription')
+    assert checkpoint['results'] == {'resume': 'ok'}
+    assert checkpoint['failed'] == ['statut']
+    assert checkpoint['attempts'] == 1
+
+
+def test_checkpoint_is_scoped_to_suite_version_and_transcript(store):
+    store.save('quality_analysis', 'a.json', '1.5', 'transcription', {'resume': 'ok'}, [])
+    assert store.load('post_call_survey', 'a.json', '1.5', 'transcription') is None
+    assert store.load('quality_analysis', 'a.json', '1.6', 'transcription') is None
+    assert store.load('quality_analysis', 'a.json', '1.5', 'fichier remplacé') is None
+    assert store.load('quality_analysis', '', '1.5', 'transcription') is None
+
+
+def test_unreadable_checkpoint_is_a_miss(store):
+    store.backend.set(store.make_key('quality_analysis', 'a.json', '1.5'), '{tronqué')
+    assert store.load('quality_analysis', 'a.json', '1.5', 'transcription') is None
+
+
+def test_attempts_count_a_series_of_failures(store):
+    previous = None
+    for attempts in (1, 2, 3):
+        previous = store.save('s', 'a.json', '1', 't', {}, ['statut'], previous=store.load('s', 'a.json', '1', 't'))
+        assert previous['attempts'] == attempts
+    assert not store.should_retry(previous)
+
+    # Évaluation complète : la demande suivante repart avec toutes ses tentatives
+    complete = store.save('s', 'a.json', '1', 't', {'statut': 'Oui'}, [], previous=previous)
+    assert not store.should_retry(complete)
+    again = store.save('s', 'a.json', '1', 't', {}, ['statut'], previous=store.load('s', 'a.json', '1', 't'))
+    assert again['attempts'] == 1 and store.should_retry(again)
+
+
+def test_reanalysis_ignores_previous_checkpoints_but_not_its_own(store):
+    store.save('s', 'a.json', '1', 't', {'statut': 'Oui'}, [])
+    assert store.load('s', 'a.json', '1', 't', reanalysis='2026-10-17') is None
+
+    store.save('s', 'a.json', '1', 't', {'statut': 'Non'}, ['resume'], reanalysis='2026-10-17')
+    assert store.load('s', 'a.json', '1', 't', reanalysis='2026-10-17')['results'] == {'statut': 'Non'}
+    assert store.load('s', 'a.json', '1', 't', reanalysis='2026-10-18') is None
+
+
+def test_backend_errors_are_misses():
+    class Broken:
+        def get(self, key):
+            raise OSError('table indisponible')
+
+        def set(self, key, value):
+            raise OSError('table indisponible')
+
+    store = CheckpointStore(Broken())
+    assert store.load('s', 'a.json', '1', 't') is None
+    assert store.save('s', 'a.json', '1', 't', {}, ['x'])['attempts'] == 1
+
+
+def test_store_from_environment(monkeypatch, tmp_path):
+    monkeypatch.delenv('CHECKPOINT_TABLE', raising=False)
+    monkeypatch.delenv('CHECKPOINT_SQLITE_PATH', raising=False)
+    assert create_checkpoint_store() is None
+    monkeypatch.setenv('CHECKPOINT_SQLITE_PATH', str(tmp_path / 'env.db'))
+    monkeypatch.setenv('CHECKPOINT_MAX_ATTEMPTS', '5')
+    assert create_checkpoint_store().max_attempts == 5
+
+
+@pytest.fixture
+def evaluate(monkeypatch, tmp_path):
+    """Lambda avec cache des réponses (SQLite) et checkpoints (SQLite)"""
+    for name, value in {
+        'BEDROCK_STARTUP_MODE': 'lazy',
+        'BEDROCK_EVALUATION_MODE': 'per_prompt',
+        'BEDROCK_STREAMING': 'false',
+        'BEDROCK_HEDGING': 'false',
+        'BEDROCK_RPM': '0',
+        'BEDROCK_TPM': '0',
+        'BEDROCK_CACHE_ENABLED': 'true',
+        'BEDROCK_CACHE_SQLITE_PATH': str(tmp_path / 'cache.db'),
+        'CHECKPOINT_SQLITE_PATH': str(tmp_path / 'checkpoints.db'),
+        'NEAR_DUPLICATE_MODE': 'off',
+    }.items():
+        monkeypatch.setenv(name, value)
+    for name in ('AWS_LAMBDA_FUNCTION_NAME', 'CHECKPOINT_TABLE', 'BEDROCK_CACHE_TABLE'):
+        monkeypatch.delenv(name, raising=False)
+    module = load_function('bedrock_evaluate')
+    registry = module.engine.get_registry()
+    module.engine.client = StubBedrockClient(
+        latency='fixed:0', ms_per_output_token=0, answer_for=make_answer_for(registry, 2), seed=2,
+    )
+    return module
+
+
+def test_forced_reanalysis_calls_the_model_again(evaluate):
+    transcript = build_corpus(evaluate.engine.get_registry().config, size=1, seed=2)[0]
+    event = {'originalText': transcript['originalText'], 'fileNameKey': transcript['fileNameKey'], 'analysis': 'test'}
+    stub = evaluate.engine.client
+
+    def handle(event):
+        with redirect_stdout(io.StringIO()):
+            return evaluate.lambda_handler(event, StubLambdaContext())
+
+    assert handle(event)['statusCode'] == 200
+    first_calls = stub.stats['calls']
+    assert first_calls > 0
+
+    # Même demande : checkpoint et cache des réponses, aucun appel au modèle
+    assert handle(event)['statusCode'] == 200
+    assert stub.stats['calls'] == first_calls
+
+    output = handle(dict(event, forceReanalysis='2026-10-17'))
+    assert output['statusCode'] == 200
+    assert stub.stats['calls'] == 2 * first_calls
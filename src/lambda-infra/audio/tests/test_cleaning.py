@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from cleaner_differential import SAMPLES, check_golden, check_text, load_golden, random_corpus
+
+from bedrock_common.cleaning import clean_response
+from bedrock_common.engine import load_prompts_config
+from bedrock_common.generation import AnswerValidator
+
+
+@pytest.fixture(scope='module')
+def validators():
+    profiles = load_prompts_config().get('generation_profiles', {})
+    return [AnswerValidator(spec['validator']) for spec in profiles.values() if spec.get('validator')]
+
+
+@pytest.mark.parametrize('case', load_golden(), ids=lambda case: case['input'][:30])
+def test_golden_output(case):
+    assert clean_response(case['input']) == case['expected']
+
+
+def test_golden_file_passes():
+    assert check_golden(load_golden()) is None
+
+
+@pytest.mark.parametrize('text', list(SAMPLES) + [case['input'] for case in load_golden()])
+def test_streaming_matches_clean_response(text, validators):
+    assert check_text(text, random.Random(42), validators) is None
+
+
+def test_streaming_matches_clean_response_on_random_texts(validators):
+    """Textes aléatoires construits sur les motifs du nettoyeur"""
+    rng = random.Random(7)
+    for text in random_corpus(300, rng):
+        assert check_text(text, rng, validators) is None, text
@@ -0,0 +1,115 @@
+import io
+import json
+from contextlib import redirect_stdout
+
+import pytest
+
+from corpus import build_corpus
+from load_test import load_function
+from stub_bedrock import INSTRUCTION_PREFIX, StubBedrockClient, StubLambdaContext
+
+from bedrock_common.combined import build_combined_schema, parse_combined_response
+from bedrock_common.generation import AnswerValidator
+from bedrock_common.suites import QUALITY_ANALYSIS
+
+BILAN = {
+    'resume_probleme': 'Le client **ne reçoit** plus ses SMS',
+    'clarte_concision': {'valeur': True, 'explication': 'Explication claire'},
+    'suggestions_amelioration': ["Proposer l'application", 'Reformuler la solution'],
+    'score_global_sur_10': '8',
+}
+
+
+class ConsistentStub(StubBedrockClient):
+    """Mêmes réponses par critère, qu'elles soient demandées une à une ou en un seul appel"""
+
+    def __init__(self, registry, suite, **kwargs):
+        super().__init__(latency='fixed:0', ms_per_output_token=0, seed=1, **kwargs)
+        self.registry = registry
+        self.suite = suite
+
+    def value(self, prompt_key):
+        profile = self.registry.profile(prompt_key)
+        if profile.validator is not None:
+            validator = profile.validator
+            return validator.values[-1] if validator.type == 'enum' else str(validator.max)
+        if prompt_key == 'quality_evaluation.bilan_global':
+            return BILAN
+        return f"Réponse *détaillée* pour {prompt_key}."
+
+    def _answer(self, instruction, max_tokens):
+        if INSTRUCTION_PREFIX in instruction:
+            return json.dumps({
+                key: self.value(prompt_key) for key, prompt_key in self.suite.prompts.items()
+            }, ensure_ascii=False)
+        value = self.value(self.registry.key_for_prompt(instruction))
+        if isinstance(value, dict):
+            # Mise en forme libre du modèle dans le mode par prompt
+            return json.dumps(value, indent=2, ensure_ascii=False)
+        return value
+
+
+@pytest.fixture
+def environment(monkeypatch):
+    for name, value in {
+        'BEDROCK_STARTUP_MODE': 'lazy',
+        'BEDROCK_STREAMING': 'false',
+        'BEDROCK_CACHE_ENABLED': 'false',
+        'BEDROCK_HEDGING': 'false',
+        'BEDROCK_RPM': '0',
+        'BEDROCK_TPM': '0',
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv('CHECKPOINT_TABLE', raising=False)
+    monkeypatch.delenv('CHECKPOINT_SQLITE_PATH', raising=False)
+    monkeypatch.delenv('KEYWORD_CLASSIFIER_ENABLED', raising=False)
+    return monkeypatch
+
+
+def evaluate(monkeypatch, mode, transcript):
+    monkeypatch.setenv('BEDROCK_EVALUATION_MODE', mode)
+    module = load_function('bedrock_evaluate')
+    stub = ConsistentStub(module.engine.get_registry(), QUALITY_ANALYSIS)
+    module.engine.client = stub
+    event = {'originalText': transcript['originalText'], 'fileNameKey': transcript['fileNameKey'], 'analysis': 'test'}
+    with redirect_stdout(io.StringIO()):
+        output = module.lambda_handler(event, StubLambdaContext())
+    return output, stub.stats['calls']
+
+
+def test_combined_and_per_prompt_outputs_match(environment):
+    module = load_function('bedrock_evaluate')
+    transcript = build_corpus(module.engine.get_registry().config, size=1, seed=5)[0]
+
+    per_prompt, per_prompt_calls = evaluate(environment, 'per_prompt', transcript)
+    combined, combined_calls = evaluate(environment, 'combined', transcript)
+
+    assert per_prompt['statusCode'] == combined['statusCode'] == 200
+    assert combined_calls == 1 < per_prompt_calls
+    assert combined['bedrockResult'] == per_prompt['bedrockResult']
+
+    bilan = combined['bedrockResult']['prompt_bilan_global']
+    assert isinstance(bilan, str)
+    assert json.loads(bilan)['resume_probleme'] == 'Le client ne reçoit plus ses SMS'
+
+
+def test_schema_declares_objects_and_validators():
+    jobs = {'bilan': 'prompt bilan', 'note': 'prompt note', 'resume': 'prompt résumé'}
+    schema = build_combined_schema(
+        jobs, object_keys=('bilan',), validators={'note': AnswerValidator({'type': 'integer', 'min': 1, 'max': 5})},
+    )
+    assert schema['properties']['bilan']['type'] == 'object'
+    assert schema['properties']['note']['type'] == 'integer'
+    assert schema['properties']['note']['maximum'] == 5
+    assert schema['properties']['resume']['type'] == 'string'
+
+
+def test_parse_keeps_only_valid_values():
+    jobs = {'bilan': 'p1', 'note': 'p2', 'resume': 'p3', 'absent': 'p4'}
+    text = 'Voici la réponse : ' + json.dumps({
+        'bilan': json.dumps(BILAN), 'note': 4, 'resume': '  ', 'inconnu': 'x',
+    })
+    parsed = parse_combined_response(text, jobs, object_keys=('bilan',))
+    assert parsed == {'bilan': json.dumps(BILAN, ensure_ascii=False), 'note': '4'}
+    assert parse_combined_response('pas de JSON', jobs) == {}
+
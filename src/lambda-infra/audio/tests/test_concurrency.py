@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from bedrock_common.concurrency import DEFAULT_MAX_CONCURRENCY, get_max_concurrency, run_prompts_concurrently
+
+JOBS = {f"prompt_{index}": f"texte {index}" for index in range(8)}
+
+
+class RecordingInvoke:
+    """invoke() simulé qui mesure le nombre d'appels simultanés"""
+
+    def __init__(self, delay=0.02, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, input_text, prompt):
+        with self._lock:
+            self.calls.append(prompt)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if prompt in self.fail:
+                raise RuntimeError(f"échec {prompt}")
+            return f"{input_text}: {prompt}"
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_results_keep_job_order():
+    invoke = RecordingInvoke()
+    results = run_prompts_concurrently('transcription', JOBS, invoke, max_workers=4)
+    assert list(results) == list(JOBS)
+    assert results['prompt_3'] == 'transcription: texte 3'
+
+
+def test_concurrency_is_bounded():
+    invoke = RecordingInvoke()
+    run_prompts_concurrently('transcription', JOBS, invoke, max_workers=3)
+    assert 1 < invoke.peak <= 3
+
+    sequential = RecordingInvoke()
+    run_prompts_concurrently('transcription', JOBS, sequential, max_workers=1)
+    assert sequential.peak == 1
+    assert sequential.calls == list(JOBS.values())
+
+
+def test_prime_first_runs_alone():
+    invoke = RecordingInvoke()
+    results = run_prompts_concurrently('transcription', JOBS, invoke, max_workers=4, prime_first=True)
+    assert invoke.calls[0] == 'texte 0'
+    assert list(results) == list(JOBS)
+
+
+def test_errors_give_partial_results():
+    invoke = RecordingInvoke(fail={'texte 2', 'texte 5'})
+    errors = {}
+    results = run_prompts_concurrently('transcription', JOBS, invoke, max_workers=4, errors=errors)
+    assert set(errors) == {'prompt_2', 'prompt_5'}
+    assert list(results) == [key for key in JOBS if key not in errors]
+
+
+def test_first_error_is_raised_without_errors_dict():
+    invoke = RecordingInvoke(fail={'texte 2'})
+    with pytest.raises(RuntimeError):
+        run_prompts_concurrently('transcription', JOBS, invoke, max_workers=4)
+
+
+def test_empty_jobs():
+    assert run_prompts_concurrently('transcription', {}, RecordingInvoke()) == {}
+
+
+def test_max_concurrency_from_environment(monkeypatch):
+    monkeypatch.setenv('BEDROCK_MAX_CONCURRENCY', '8')
+    assert get_max_concurrency() == 8
+    monkeypatch.setenv('BEDROCK_MAX_CONCURRENCY', '0')
+    assert get_max_concurrency() == 1
+    monkeypatch.setenv('BEDROCK_MAX_CONCURRENCY', 'beaucoup')
+    assert get_max_concurrency() == DEFAULT_MAX_CONCURRENCY
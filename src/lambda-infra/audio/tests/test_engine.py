@@ -0,0 +1,96 @@
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+from corpus import build_corpus
+from load_test import load_function, make_answer_for
+from stub_bedrock import StubBedrockClient, StubLambdaContext
+
+from bedrock_common.suites import POST_CALL_SURVEY, QUALITY_ANALYSIS, SUITES, select_suites
+
+
+@pytest.fixture
+def environment(monkeypatch):
+    for name, value in {
+        'BEDROCK_STARTUP_MODE': 'lazy',
+        'BEDROCK_EVALUATION_MODE': 'per_prompt',
+        'BEDROCK_STREAMING': 'false',
+        'BEDROCK_CACHE_ENABLED': 'false',
+        'BEDROCK_HEDGING': 'false',
+        'BEDROCK_PROMPT_CACHING': 'true',
+        'BEDROCK_RPM': '0',
+        'BEDROCK_TPM': '0',
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv('CHECKPOINT_TABLE', raising=False)
+    monkeypatch.delenv('CHECKPOINT_SQLITE_PATH', raising=False)
+    monkeypatch.delenv('KEYWORD_CLASSIFIER_ENABLED', raising=False)
+    return monkeypatch
+
+
+def evaluate(function_name, transcript, **fields):
+    module = load_function(function_name)
+    registry = module.engine.get_registry()
+    stub = StubBedrockClient(latency='fixed:0', ms_per_output_token=0, answer_for=make_answer_for(registry, 1), seed=1)
+    module.engine.client = stub
+    event = dict(originalText=transcript['originalText'], fileNameKey=transcript['fileNameKey'], analysis='test')
+    event.update(fields)
+    with redirect_stdout(io.StringIO()):
+        output = module.lambda_handler(event, StubLambdaContext())
+    return output, stub
+
+
+@pytest.fixture
+def transcript(environment):
+    registry = load_function('bedrock_evaluate').engine.get_registry()
+    return build_corpus(registry.config, size=1, seed=4)[0]
+
+
+def test_select_suites():
+    assert select_suites({}, ('quality_analysis',)) == [QUALITY_ANALYSIS]
+    assert select_suites({'suites': 'post_call_survey'}, ('quality_analysis',)) == [POST_CALL_SURVEY]
+    assert select_suites({'suites': ['all']}, ()) == list(SUITES.values())
+    assert select_suites({'suites': ['post_call_survey', 'post_call_survey']}, ()) == [POST_CALL_SURVEY]
+    with pytest.raises(ValueError):
+        select_suites({'suites': ['quality_analysis', 'inconnue']}, ())
+
+
+def test_default_suite_keeps_the_lambda_output_shape(transcript):
+    output, _ = evaluate('bedrock_evaluate', transcript)
+    assert output['statusCode'] == 200
+    assert list(output['bedrockResult']) == QUALITY_ANALYSIS.result_keys
+    assert set(output['monitoring']['bedrock']) == {'callMining'}
+
+    output, _ = evaluate('bedrock_evaluate_post_call_survey', transcript)
+    assert list(output['bedrockResult']) == POST_CALL_SURVEY.result_keys
+    assert isinstance(output['bedrockResult']['conversation_analysis'], dict)
+    assert 'scoreRecord' in output
+
+
+def test_all_suites_in_one_pass(transcript):
+    single_calls = sum(
+        evaluate(function_name, transcript)[1].stats['calls']
+        for function_name in ('bedrock_evaluate', 'bedrock_evaluate_post_call_survey')
+    )
+    output, stub = evaluate('bedrock_evaluate', transcript, suites='all')
+
+    assert output['statusCode'] == 200
+    assert set(output['suites']) == set(SUITES)
+    assert list(output['suites']['quality_analysis']['bedrockResult']) == QUALITY_ANALYSIS.result_keys
+    assert list(output['suites']['post_call_survey']['bedrockResult']) == POST_CALL_SURVEY.result_keys
+    assert set(output['monitoring']['bedrock']) == {'callMining', 'postCall'}
+    assert stub.stats['calls'] == single_calls
+    # Même préfixe transcription pour les deux suites : une seule écriture dans le cache Bedrock
+    assert len(stub._cached_prefixes) == 1
+
+
+def test_other_lambda_can_run_any_suite(transcript):
+    output, _ = evaluate('bedrock_evaluate_post_call_survey', transcript, suites=['quality_analysis'])
+    assert list(output['bedrockResult']) == QUALITY_ANALYSIS.result_keys
+
+
+def test_unknown_suite_is_rejected(transcript):
+    output, stub = evaluate('bedrock_evaluate', transcript, suites=['inconnue'])
+    assert output['statusCode'] == 400
+    assert stub.stats['calls'] == 0
@@ -0,0 +1,120 @@
+import json
+import os
+
+import pytest
+
+from bedrock_common.generation import (
+    DEFAULT_PROFILE, DEFAULT_TEMPERATURE, AnswerValidator, GenerationProfile, normalize_answer,
+)
+from bedrock_common.prompt_registry import PromptRegistry
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'bedrock_common', 'prompts-config.json')
+
+
+@pytest.fixture(scope='module')
+def registry():
+    with open(CONFIG_PATH, encoding='utf-8') as f:
+        return PromptRegistry(json.load(f))
+
+
+@pytest.fixture
+def resolution():
+    return AnswerValidator({'type': 'enum', 'values': ['Résolu', 'Partiellement résolu', 'Non résolu']})
+
+
+@pytest.fixture
+def score():
+    return AnswerValidator({'type': 'integer', 'min': 1, 'max': 5})
+
+
+def test_normalize_answer():
+    assert normalize_answer(' « Partiellement Résolu ». ') == 'partiellement resolu'
+    assert normalize_answer(None) == ''
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Résolu', 'Résolu'),
+    ('non résolu.', 'Non résolu'),
+    ('Partiellement resolu, le client doit rappeler', 'Partiellement résolu'),
+    ('Résolution en cours', None),
+    ('Le problème est résolu', None),
+    ('', None),
+])
+def test_enum_validator(resolution, text, expected):
+    assert resolution.validate(text) == expected
+
+
+def test_enum_prefix_waits_for_longer_values():
+    validator = AnswerValidator({'type': 'enum', 'values': ['Non', 'Non résolu', 'Oui']})
+    assert validator.validate_prefix('Non') is None
+    assert validator.validate_prefix('Non ') is None
+    assert validator.validate_prefix('Non r') is None
+    assert validator.validate_prefix('Non résolu car') == 'Non résolu'
+    assert validator.validate_prefix('Oui, le client') == 'Oui'
+    # Ponctuation de fin ignorée par normalize_answer : la frontière n'est pas encore acquise
+    assert validator.validate_prefix('Oui.') is None
+    assert validator.validate_prefix('Peut-être') is None
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('4', '4'),
+    ('Note : 4.', '4'),
+    ('4/5', '4'),
+    ('4 sur 5', '4'),
+    ('0', None),
+    ('6', None),
+    ('4/10', None),
+    ('sur une échelle de 1 à 5, je donne 4', None),
+    ('3 ou 4', None),
+    ('4.5', None),
+    ('excellent', None),
+    ('', None),
+])
+def test_integer_validator(score, text, expected):
+    assert score.validate(text) == expected
+
+
+def test_integer_prefix_is_never_settled(score):
+    # La suite de la réponse peut citer un autre entier : seule la réponse complète compte
+    for prefix in ('4', '4 ', '4/', 'Note : 4. '):
+        assert score.validate_prefix(prefix) is None
+
+
+def test_json_schema(resolution, score):
+    assert resolution.json_schema() == {'type': 'string', 'enum': ['Résolu', 'Partiellement résolu', 'Non résolu']}
+    assert score.json_schema() == {'type': 'integer', 'minimum': 1, 'maximum': 5}
+    assert AnswerValidator({'type': 'integer'}).json_schema() == {'type': 'integer'}
+
+
+def test_unknown_validator_type():
+    with pytest.raises(ValueError):
+        AnswerValidator({'type': 'date'})
+
+
+def test_profile_request_params():
+    profile = GenerationProfile({'max_tokens': 5, 'temperature': 0, 'stop_sequences': ['.']}, name='score')
+    params = profile.request_params(default_max_tokens=2024)
+    assert params['max_tokens'] == 5
+    assert params['temperature'] == 0
+    assert profile.request_params(default_max_tokens=2024, max_tokens=50)['max_tokens'] == 50
+    assert DEFAULT_PROFILE.request_params(default_max_tokens=2024)['max_tokens'] == 2024
+    assert DEFAULT_PROFILE.temperature == DEFAULT_TEMPERATURE
+    assert DEFAULT_PROFILE.validator is None
+
+
+def test_registry_profiles(registry):
+    profile = registry.profile('post_call_survey.net_promoter_score')
+    assert profile.name == 'score_0_10'
+    assert profile.validator.validate('10') == '10'
+    assert profile.validator.validate('11') is None
+
+    assert registry.profile('conversation_analysis.statut_resolution').name == 'yes_no'
+    assert registry.profile('conversation_analysis.resume_general') is DEFAULT_PROFILE
+    assert registry.profile('inconnu.prompt') is DEFAULT_PROFILE
+
+
+def test_profile_for_prompt_resolves_the_prompt_text(registry):
+    text = registry.get('post_call_survey.satisfaction_score')
+    assert registry.key_for_prompt(text) == 'post_call_survey.satisfaction_score'
+    assert registry.profile_for_prompt(text).name == 'score_1_5'
+    assert registry.profile_for_prompt('Prompt construit à la volée') is DEFAULT_PROFILE
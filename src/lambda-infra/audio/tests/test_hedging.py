@@ -0,0 +1,232 @@
+import threading
+import time
+
+import pytest
+
+from stub_bedrock import StubThrottlingError
+
+from bedrock_common.hedging import MIN_LATENCY_SAMPLES, CircuitBreaker, HedgedInvoker, Route
+from bedrock_common.rate_limiter import AdmissionController
+
+
+class FakeClock:
+    """Horloge manuelle des disjoncteurs"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class ValidationError(Exception):
+    """Erreur non transitoire (requête refusée), sans effet sur le disjoncteur"""
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker('eu-west-3', failures=2, reset_seconds=30, clock=clock)
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failures):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_breaker_closed_open_half_open_closed(breaker, clock):
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opens == 1
+    assert not breaker.available()
+    assert not breaker.allow()
+
+    clock.advance(29)
+    assert not breaker.allow()
+
+    clock.advance(1)
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Un seul appel d'essai à la fois
+    assert not breaker.available()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker(breaker, clock):
+    open_breaker(breaker)
+    clock.advance(30)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opens == 2
+    assert not breaker.allow()
+
+    clock.advance(30)
+    assert breaker.allow()
+
+
+def test_released_probe_admits_next_probe(breaker, clock):
+    open_breaker(breaker)
+    clock.advance(30)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.available()
+    assert breaker.allow()
+
+
+def make_invoker(clock, **kwargs):
+    options = {'breaker_failures': 1, 'breaker_reset_seconds': 30, 'min_delay_ms': 20, 'max_ratio': 1.0}
+    options.update(kwargs)
+    return HedgedInvoker(
+        'eu-west-3', [Route('eu-west-1')], client_factory=lambda region: region, clock=clock, **options
+    )
+
+
+def test_non_retryable_probe_error_releases_route(clock):
+    invoker = make_invoker(clock)
+    breaker = invoker.breakers['eu-west-3']
+    breaker.allow()
+    breaker.record_failure()
+    clock.advance(30)
+
+    def send(client, model_id, cancelled):
+        raise ValidationError('prompt refusé')
+
+    # L'appel d'essai sur la route principale échoue sans renseigner sur la route
+    with pytest.raises(ValidationError):
+        invoker.call(send, 'eu-west-3', 'model', 'prompt', 1000)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.available()
+
+    # La route principale n'est pas bloquée : l'appel suivant sert d'essai et la referme
+    assert invoker.call(lambda client, model_id, cancelled: client, 'eu-west-3', 'model', 'prompt', 1000) == 'eu-west-3'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retryable_error_fails_over_and_opens_breaker(clock):
+    invoker = make_invoker(clock)
+
+    def send(client, model_id, cancelled):
+        if client == 'eu-west-3':
+            raise StubThrottlingError()
+        return 'secondaire'
+
+    assert invoker.call(send, 'eu-west-3', 'model', 'prompt', 1000) == 'secondaire'
+    assert invoker.breakers['eu-west-3'].state == CircuitBreaker.OPEN
+    stats = invoker.stats()
+    assert stats['failovers'] == 1
+    assert stats['breaker_opens'] == 1
+
+    # Route principale évitée tant que le disjoncteur est ouvert
+    assert invoker.call(lambda client, model_id, cancelled: client, 'eu-west-3', 'model', 'prompt', 1000) == 'eu-west-1'
+
+
+def test_slow_primary_is_hedged_and_cancelled(clock):
+    invoker = make_invoker(clock)
+    for _ in range(MIN_LATENCY_SAMPLES):
+        invoker.observe('prompt', 0, 1.0)
+    primary_cancelled = threading.Event()
+
+    def send(client, model_id, cancelled):
+        if client == 'eu-west-3':
+            # Route principale lente : rend la main dès que l'autre route a répondu
+            cancelled.wait(5)
+            if cancelled.is_set():
+                primary_cancelled.set()
+            return 'principale'
+        return 'secondaire'
+
+    assert invoker.call(send, 'eu-west-3', 'model', 'prompt', 0) == 'secondaire'
+    assert primary_cancelled.wait(5)
+    stats = invoker.stats()
+    assert stats['hedges'] == 1
+    assert stats['hedge_wins'] == 1
+    assert stats['cancelled'] == 1
+    assert stats['wins.eu-west-1'] == 1
+
+
+def test_hedges_limited_by_ratio(clock):
+    invoker = make_invoker(clock, max_ratio=0.0)
+    for _ in range(MIN_LATENCY_SAMPLES):
+        invoker.observe('prompt', 0, 1.0)
+
+    def send(client, model_id, cancelled):
+        if client == 'eu-west-3':
+            cancelled.wait(0.1)
+        return client
+
+    assert invoker.call(send, 'eu-west-3', 'model', 'prompt', 0) == 'eu-west-1'
+    assert invoker.call(send, 'eu-west-3', 'model', 'prompt', 0) == 'eu-west-3'
+    assert invoker.stats()['skipped_hedges'] == 1
+
+
+def test_hedges_and_failovers_go_through_admission(clock):
+    invoker = make_invoker(clock)
+    for _ in range(MIN_LATENCY_SAMPLES):
+        invoker.observe('prompt', 0, 1.0)
+    # Quota d'une requête par minute, déjà pris par l'appel principal
+    admission = AdmissionController('model', requests_per_minute=1, tokens_per_minute=0, sleep=lambda seconds: None)
+
+    def slow_primary(client, model_id, cancelled):
+        if client == 'eu-west-3':
+            cancelled.wait(0.1)
+        return client
+
+    assert admission.call(
+        lambda: invoker.call(slow_primary, 'eu-west-3', 'model', 'prompt', 0, admission=admission)
+    ) == 'eu-west-3'
+    assert invoker.stats()['hedges'] == 0
+    assert invoker.stats()['skipped_hedges'] == 1
+
+    def throttled_primary(client, model_id, cancelled):
+        if client == 'eu-west-3':
+            raise StubThrottlingError()
+        return client
+
+    # Pas de bascule hors quota : l'erreur revient au contrôleur, qui gère le backoff
+    with pytest.raises(StubThrottlingError):
+        invoker.call(throttled_primary, 'eu-west-3', 'model', 'prompt', 0, admission=admission)
+    assert admission.stats()['refused_extra_requests'] == 2
+    assert admission.stats()['extra_requests'] == 0
+
+
+def test_admitted_hedge_releases_its_slot(clock):
+    invoker = make_invoker(clock)
+    for _ in range(MIN_LATENCY_SAMPLES):
+        invoker.observe('prompt', 0, 1.0)
+    admission = AdmissionController('model', requests_per_minute=0, tokens_per_minute=0)
+
+    def send(client, model_id, cancelled):
+        if client == 'eu-west-3':
+            cancelled.wait(5)
+        return client
+
+    assert admission.call(lambda: invoker.call(send, 'eu-west-3', 'model', 'prompt', 0, admission=admission)) == 'eu-west-1'
+    assert admission.stats()['extra_requests'] == 1
+    deadline = time.monotonic() + 5
+    while admission.concurrency.in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert admission.concurrency.in_flight == 0
@@ -0,0 +1,187 @@
+import io
+import json
+from contextlib import redirect_stdout
+
+import pytest
+
+from corpus import build_corpus
+from load_test import load_function, make_answer_for
+from stub_bedrock import StubBedrockClient, StubLambdaContext
+
+from bedrock_common.incremental import IncrementalState, IncrementalStore, paginate_segments
+from bedrock_common.result_cache import SQLiteStore
+
+
+class RecordingStore:
+    """Backend en mémoire qui compte les écritures par clé, et peut échouer à l'écriture"""
+
+    def __init__(self):
+        self.values = {}
+        self.writes = []
+        self.fail = False
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        if self.fail:
+            raise ConnectionError('table indisponible')
+        self.writes.append(key)
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+def segments(start, count, size=40):
+    return [
+        {'speaker_label': f"spk_{index % 2}", 'transcript': f"réplique {index} " + 'x' * size}
+        for index in range(start, start + count)
+    ]
+
+
+def test_append_skips_resent_batches_and_rejects_gaps():
+    state = IncrementalState()
+    assert state.append(segments(0, 3)) == 3
+    assert state.append(segments(0, 3), offset=0) == 0
+    assert state.append(segments(2, 3), offset=2) == 2
+    assert len(state.segments) == 5
+    with pytest.raises(ValueError):
+        state.append(segments(7, 2), offset=7)
+    assert state.original_text.startswith('réplique 0 ')
+
+
+def test_pagination_is_stable_when_segments_are_added():
+    items = segments(0, 40)
+    pages = paginate_segments(items, max_bytes=500)
+    assert len(pages) > 1
+    assert pages[0][0] == 0 and pages[-1][1] == len(items)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(pages, pages[1:]))
+    for page_start, page_end in pages:
+        assert len(json.dumps(items[page_start:page_end], ensure_ascii=False).encode('utf-8')) <= 500
+
+    # Un préfixe garde ses pages, sauf la dernière qui peut grandir
+    prefix_pages = paginate_segments(items[:25], max_bytes=500)
+    assert pages[:len(prefix_pages) - 1] == prefix_pages[:-1]
+
+    # Un segment plus grand qu'une page forme sa propre page
+    assert paginate_segments(segments(0, 1, size=2000), max_bytes=500) == [(0, 1)]
+
+
+def test_store_round_trip_rewrites_only_changed_pages():
+    backend = RecordingStore()
+    store = IncrementalStore(backend, page_bytes=500)
+
+    state = store.load('a.json')
+    state.append(segments(0, 20))
+    state.summaries['empreinte'] = 'résumé'
+    assert store.save('a.json', state)
+    first_pages = state.saved_pages
+    assert first_pages > 1
+
+    backend.writes.clear()
+    state = store.load('a.json')
+    assert len(state.segments) == 20 and state.summaries == {'empreinte': 'résumé'}
+    state.append(segments(20, 2), offset=20)
+    assert store.save('a.json', state)
+
+    page_writes = [key for key in backend.writes if '#segments#' in key]
+    assert len(page_writes) <= state.saved_pages - first_pages + 1
+    assert backend.writes[-1] == store.make_key('a.json')
+    assert [segment['transcript'] for segment in store.load('a.json').segments] == [
+        segment['transcript'] for segment in segments(0, 22)
+    ]
+
+
+def test_missing_page_gives_empty_state():
+    backend = RecordingStore()
+    store = IncrementalStore(backend, page_bytes=500)
+    state = IncrementalState()
+    state.append(segments(0, 20))
+    store.save('a.json', state)
+
+    backend.delete(store.make_page_key('a.json', 0))
+    assert store.load('a.json').segments == []
+
+
+def test_save_errors_are_reported():
+    backend = RecordingStore()
+    backend.fail = True
+    store = IncrementalStore(backend)
+    state = IncrementalState()
+    state.append(segments(0, 2))
+
+    assert not store.save('a.json', state)
+    assert state.saved_segments == 0
+
+
+def test_delete_removes_every_page(tmp_path):
+    store = IncrementalStore(SQLiteStore(str(tmp_path / 'incremental.db')), page_bytes=500)
+    state = IncrementalState()
+    state.append(segments(0, 20))
+    store.save('a.json', state)
+
+    assert store.delete('a.json', state)
+    assert store.load('a.json').segments == []
+    for page in range(state.saved_pages):
+        assert store.backend.get(store.make_page_key('a.json', page)) is None
+
+
+@pytest.fixture
+def evaluate(monkeypatch, tmp_path):
+    for name, value in {
+        'BEDROCK_STARTUP_MODE': 'lazy',
+        'BEDROCK_EVALUATION_MODE': 'per_prompt',
+        'BEDROCK_STREAMING': 'false',
+        'BEDROCK_CACHE_ENABLED': 'false',
+        'BEDROCK_HEDGING': 'false',
+        'BEDROCK_RPM': '0',
+        'BEDROCK_TPM': '0',
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv('CHECKPOINT_TABLE', raising=False)
+    monkeypatch.delenv('CHECKPOINT_SQLITE_PATH', raising=False)
+    module = load_function('bedrock_evaluate')
+    registry = module.engine.get_registry()
+    module.engine.client = StubBedrockClient(
+        latency='fixed:0', ms_per_output_token=0, answer_for=make_answer_for(registry, 1), seed=1,
+    )
+    module.engine.incremental_store = IncrementalStore(RecordingStore(), page_bytes=2048)
+    return module
+
+
+def send_batches(module, transcript, batches=3):
+    items = transcript['audioSegments']
+    size = -(-len(items) // batches)
+    outputs = []
+    for offset in range(0, len(items), size):
+        event = {
+            'fileNameKey': transcript['fileNameKey'],
+            'analysis': 'test',
+            'audioSegments': items[offset:offset + size],
+            'segmentOffset': offset,
+            'final': offset + size >= len(items),
+        }
+        with redirect_stdout(io.StringIO()):
+            outputs.append(module.incremental_handler(event, StubLambdaContext()))
+    return outputs
+
+
+def test_final_batch_deletes_the_state(evaluate):
+    registry = evaluate.engine.get_registry()
+    transcript = build_corpus(registry.config, size=1, seed=3, lengths=('long',), transcribe=True)[0]
+    store = evaluate.engine.incremental_store
+
+    outputs = send_batches(evaluate, transcript)
+    assert [output['statusCode'] for output in outputs[:-1]] == [202] * (len(outputs) - 1)
+    assert outputs[-1]['statusCode'] == 200
+    assert store.backend.values == {}
+
+
+def test_intermediate_save_error_asks_for_the_batch_again(evaluate):
+    registry = evaluate.engine.get_registry()
+    transcript = build_corpus(registry.config, size=1, seed=3, lengths=('long',), transcribe=True)[0]
+    evaluate.engine.incremental_store.backend.fail = True
+
+    output = send_batches(evaluate, transcript)[0]
+    assert output['statusCode'] == 503
@@ -0,0 +1,128 @@
+import json
+import os
+
+import pytest
+
+from load_test import load_function
+from stub_bedrock import StubBedrockClient, StubLambdaContext
+
+from bedrock_common.keyword_classifier import (
+    AhoCorasick, KeywordClassifier, build_keyword_classifiers, is_keyword_classifier_enabled, normalize_text,
+)
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'bedrock_common', 'prompts-config.json')
+
+# Transcriptions étiquetées à la main : réponse attendue du modèle pour le sujet, None si
+# l'appel est ambigu ou sans mot-clé (le classifieur doit alors laisser la main à Bedrock)
+LABELLED_SUBJECTS = [
+    ("Client: Ma carte est bloquée. Agent: Le blocage SIM vient de trois codes PIN faux. "
+     "Client: Comment lever ce blocage sim ?", 'blocage-sim'),
+    ("Client: J'ai un problème de facturation, ma facturation de mars est doublée. "
+     "Agent: Je vérifie votre facturation.", 'facturation'),
+    ("Client: J'ai un signal faible à la maison. Agent: Un signal faible vient souvent de l'antenne.",
+     'signal-faible'),
+    ("Client: Le code USSD ne marche pas. Agent: Quel code ussd avez-vous composé ?", 'codes-ussd'),
+    ("Client: Ma transaction échouée n'est pas remboursée. Agent: Je retrouve la transaction échouée.",
+     'transaction-echouee'),
+    ("Client: Je veux faire une portabilité numéro. Agent: La portabilité du numéro prend 48 heures. "
+     "Client: Et la portabilité numéro est gratuite ?", 'portabilite-numero'),
+    ("Client: Je voudrais des appels internationaux. Agent: Les appels internationaux sont facturés à la minute.",
+     'appels-internationaux'),
+    ("Client: J'ai un souci de paiement et aussi de facturation.", None),
+    ("Client: Bonjour, je voudrais parler à un conseiller.", None),
+    ("Client: Mon paiement a échoué. Agent: Le paiement est refusé. Client: Et le transfert OM, "
+     "les frais OM et le retrait OM ? Agent: Le transfert OM est gratuit.", None),
+]
+
+
+@pytest.fixture(scope='module')
+def config():
+    with open(CONFIG_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_normalize_text():
+    assert normalize_text("Forfaits-Data, l'été !") == ' forfait data l ete '
+    assert normalize_text('') == '  '
+    assert normalize_text('blocage-sim') == normalize_text('Blocage SIM')
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick({' maxit ': 'maxit', ' maxit om ': 'maxit-om', ' om ': 'om'})
+    assert sorted(automaton.iter_matches(normalize_text('Maxit OM'))) == ['maxit', 'maxit-om', 'om']
+    assert list(automaton.iter_matches(normalize_text('maxit maxitom'))) == ['maxit']
+
+
+def test_classify_requires_hits_and_confidence():
+    classifier = KeywordClassifier({'sim': ['blocage-sim'], 'factures': ['facturation']}, threshold=0.6, min_hits=2)
+
+    match = classifier.classify('Blocage SIM, encore un blocage sim et une facturation')
+    assert match == {'label': 'blocage-sim', 'category': 'sim', 'confidence': 0.667, 'hits': 2}
+    assert classifier.classify('un blocage sim') is None
+    assert classifier.classify('blocage sim, blocage sim, facturation, facturation') is None
+    assert classifier.classify('rien à voir', record=False) is None
+
+    assert classifier.stats() == {'attempts': 3, 'local_hits': 1, 'model_calls_saved': 1, 'hit_rate': 0.3333}
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.delenv('KEYWORD_CLASSIFIER_ENABLED', raising=False)
+    assert not is_keyword_classifier_enabled()
+    monkeypatch.setenv('KEYWORD_CLASSIFIER_ENABLED', 'true')
+    assert is_keyword_classifier_enabled()
+
+
+def test_build_classifiers(config, monkeypatch):
+    monkeypatch.setenv('KEYWORD_CLASSIFIER_MIN_HITS', '1')
+    classifiers = build_keyword_classifiers(config)
+    assert set(classifiers) == {'categorization.identification_sujet', 'categorization.identification_produit'}
+    assert classifiers['categorization.identification_sujet'].min_hits == 1
+    assert build_keyword_classifiers({}) == {}
+
+
+def test_labelled_subject_precision(config):
+    """Réponses locales comparées aux étiquettes : précision exigée, taux de réponse mesuré"""
+    classifier = build_keyword_classifiers(config)['categorization.identification_sujet']
+    answered = correct = 0
+    for text, expected in LABELLED_SUBJECTS:
+        match = classifier.classify(text)
+        if match is None:
+            continue
+        answered += 1
+        correct += match['label'] == expected
+
+    assert correct / answered >= 0.95
+    assert answered / len(LABELLED_SUBJECTS) >= 0.6
+    assert classifier.stats()['local_hits'] == answered
+
+
+def test_engine_calls_the_model_unless_enabled(monkeypatch, config):
+    for name, value in {
+        'BEDROCK_STARTUP_MODE': 'lazy',
+        'BEDROCK_EVALUATION_MODE': 'per_prompt',
+        'BEDROCK_STREAMING': 'false',
+        'BEDROCK_CACHE_ENABLED': 'false',
+        'BEDROCK_HEDGING': 'false',
+        'BEDROCK_RPM': '0',
+        'BEDROCK_TPM': '0',
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv('CHECKPOINT_TABLE', raising=False)
+    monkeypatch.delenv('CHECKPOINT_SQLITE_PATH', raising=False)
+    text, _ = LABELLED_SUBJECTS[0]
+    event = {'originalText': text, 'fileNameKey': 'campagne/audio/a.json', 'analysis': 'test'}
+
+    def model_calls():
+        module = load_function('bedrock_evaluate')
+        module.engine.client = stub = StubBedrockClient(latency='fixed:0', ms_per_output_token=0, seed=1)
+        output = module.lambda_handler(event, StubLambdaContext())
+        assert output['statusCode'] == 200
+        return stub.stats['calls'], output['bedrockResult']
+
+    monkeypatch.delenv('KEYWORD_CLASSIFIER_ENABLED', raising=False)
+    default_calls, _ = model_calls()
+    monkeypatch.setenv('KEYWORD_CLASSIFIER_ENABLED', 'true')
+    local_calls, result = model_calls()
+
+    assert local_calls == default_calls - 1
+    assert result['prompt_identification_sujet'] == 'blocage-sim'
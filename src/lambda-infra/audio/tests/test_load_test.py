@@ -0,0 +1,105 @@
+import json
+import logging
+import random
+from argparse import Namespace
+
+import pytest
+
+from corpus import build_corpus
+from load_test import load_function, make_answer_for, percentile, run_level
+from stub_bedrock import StubBedrockClient, StubThrottlingError, parse_latency
+
+from bedrock_common.rate_limiter import is_throttling_error
+from bedrock_common.request_builder import build_request_body
+
+
+def request(transcript='Client: bonjour', instruction='Résumez', max_tokens=200):
+    return build_request_body(transcript, instruction, max_tokens=max_tokens, cache=True)
+
+
+def test_parse_latency():
+    rng = random.Random(1)
+    assert parse_latency('fixed:250')(rng) == 250
+    assert 10 <= parse_latency('uniform:10:20')(rng) <= 20
+    assert parse_latency('lognormal:400:0.4')(rng) > 0
+    with pytest.raises(ValueError):
+        parse_latency('normal:400')
+
+
+def test_stub_usage_reports_prefix_cache():
+    stub = StubBedrockClient(latency='fixed:0', ms_per_output_token=0)
+    first = json.loads(stub.invoke_model(modelId='model', body=request())['body'].read())
+    second = json.loads(stub.invoke_model(modelId='model', body=request(instruction='Notez'))['body'].read())
+
+    assert first['usage']['cache_creation_input_tokens'] > 0
+    assert second['usage']['cache_read_input_tokens'] == first['usage']['cache_creation_input_tokens']
+    assert stub.stats['calls'] == 2
+
+
+def test_stub_throttling_looks_like_botocore():
+    stub = StubBedrockClient(latency='fixed:0', throttle_rate=1.0)
+    with pytest.raises(StubThrottlingError) as error:
+        stub.invoke_model(modelId='model', body=request())
+    assert is_throttling_error(error.value)
+    assert stub.stats['throttled'] == 1
+
+
+def test_stub_stream_rebuilds_the_answer_and_can_be_closed():
+    stub = StubBedrockClient(latency='fixed:0', ms_per_output_token=0, answer_for=lambda instruction: 'Réponse courte')
+    events = [json.loads(event['chunk']['bytes']) for event in
+              stub.invoke_model_with_response_stream(modelId='model', body=request())['body']]
+    assert [event['type'] for event in (events[0], events[-2], events[-1])] == [
+        'message_start', 'message_delta', 'message_stop',
+    ]
+    assert ''.join(event['delta']['text'] for event in events if event['type'] == 'content_block_delta') == (
+        'Réponse courte'
+    )
+
+    stream = stub.invoke_model_with_response_stream(modelId='model', body=request())['body']
+    next(iter(stream))
+    stream.close()
+    assert stub.stats['early_closed'] == 1
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile(values, 0.07) == 7
+    assert percentile([5.0, 1.0], 0.5) == 1.0
+    assert percentile([], 0.5) is None
+
+
+def test_run_level_reports_each_transcript(monkeypatch):
+    for name, value in {
+        'BEDROCK_STARTUP_MODE': 'lazy',
+        'BEDROCK_EVALUATION_MODE': 'per_prompt',
+        'BEDROCK_STREAMING': 'false',
+        'BEDROCK_CACHE_ENABLED': 'false',
+        'BEDROCK_HEDGING': 'false',
+        'BEDROCK_RPM': '0',
+        'BEDROCK_TPM': '0',
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv('CHECKPOINT_TABLE', raising=False)
+    monkeypatch.delenv('CHECKPOINT_SQLITE_PATH', raising=False)
+    registry = load_function('bedrock_evaluate').engine.get_registry()
+    corpus = build_corpus(registry.config, size=3, seed=2)
+    args = Namespace(
+        latency='fixed:0', ms_per_token=0, output_tokens=20, throttle_rate=0.0, malformed_rate=0.0,
+        time_scale=0.0, seed=2, slow_rate=0.0, hedge_latency=None, suites=None, log_level=logging.getLogger().level,
+    )
+
+    # Mêmes réponses valides à graine égale
+    first_answers = make_answer_for(registry, 2)
+    second_answers = make_answer_for(registry, 2)
+    prompts = [registry.prompts[key] for key, profile in registry.profiles.items()
+               if profile.validator is not None and key in registry.prompts]
+    assert [first_answers(prompt) for prompt in prompts] == [second_answers(prompt) for prompt in prompts]
+
+    result = run_level('bedrock_evaluate', corpus, 2, args)
+    assert result['transcripts'] == 3
+    assert result['errors'] == 0
+    assert result['model_calls_per_transcript'] > 1
+    assert result['model_calls_per_transcript'] == round(result['stub']['calls'] / 3, 2)
+    assert result['hedging'] is None
@@ -0,0 +1,88 @@
+import io
+import json
+from contextlib import redirect_stdout
+
+import pytest
+
+from bedrock_common.metrics import (
+    METRICS_NAMESPACE, InvocationMetrics, attach_monitoring, estimate_cost, summarize_event,
+)
+
+MODEL_ID = 'anthropic.claude-3-5-haiku-20241022-v1:0'
+USAGE = {'input_tokens': 1000, 'output_tokens': 100, 'cache_read_input_tokens': 4000, 'cache_creation_input_tokens': 0}
+
+
+def emitted_records(metrics, suite='quality_analysis'):
+    output = io.StringIO()
+    with redirect_stdout(output):
+        summary = metrics.emit(suite)
+    return [json.loads(line) for line in output.getvalue().splitlines()], summary
+
+
+def test_estimate_cost():
+    expected = (1000 * 0.80 + 100 * 4.00 + 4000 * 0.08) / 1_000_000
+    assert estimate_cost(MODEL_ID, USAGE) == pytest.approx(expected)
+    # Profil d'inférence inter-régions : tarif du modèle sous-jacent
+    assert estimate_cost(f"us.{MODEL_ID}", USAGE) == pytest.approx(expected)
+    assert estimate_cost('modele.inconnu', USAGE) == 0.0
+
+
+def test_repeated_prompt_is_accumulated():
+    metrics = InvocationMetrics(function_name='bedrock_evaluate')
+    metrics.record_prompt('analyse.resume', MODEL_ID, 1000, ttfb_ms=300, usage=USAGE, retries=1)
+    metrics.record_prompt('analyse.resume', MODEL_ID, 500, usage=USAGE)
+    metrics.record_prompt('analyse.note', MODEL_ID, 0, cache_hit=True)
+
+    summary = metrics.summary()
+    entry = summary['prompts']['analyse.resume']
+    assert entry['calls'] == 2
+    assert entry['wall_ms'] == 1500
+    assert entry['retries'] == 1
+    assert entry['output_tokens'] == 200
+    assert summary['model_calls'] == 2
+    assert summary['cache_hits'] == 1
+    assert summary['tokens']['input_tokens'] == 2000
+
+
+def test_emf_shape():
+    metrics = InvocationMetrics(function_name='bedrock_evaluate')
+    metrics.record_prompt('analyse.resume', MODEL_ID, 1000, ttfb_ms=300, usage=USAGE)
+    metrics.annotate('hedging', {'hedges': 2, 'hedge_wins': 1})
+    records, summary = emitted_records(metrics)
+
+    assert len(records) == 2
+    prompt_record, handler_record = records
+    for record in records:
+        directive = record['_aws']['CloudWatchMetrics'][0]
+        assert isinstance(record['_aws']['Timestamp'], int)
+        assert directive['Namespace'] == METRICS_NAMESPACE
+        # Chaque dimension et chaque métrique déclarée est présente à la racine de la ligne
+        for dimension in directive['Dimensions'][0]:
+            assert dimension in record
+        for metric in directive['Metrics']:
+            assert isinstance(record[metric['Name']], (int, float))
+            assert metric['Unit'] in ('Milliseconds', 'Count', 'None')
+
+    assert prompt_record['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['FunctionName', 'Suite', 'Prompt']]
+    assert prompt_record['Prompt'] == 'analyse.resume'
+    assert prompt_record['ModelId'] == MODEL_ID
+    assert prompt_record['CacheReadTokens'] == 4000
+    assert handler_record['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['FunctionName', 'Suite']]
+    assert handler_record['HedgedCalls'] == 2
+    assert handler_record['Counters'] == summary['counters']
+
+
+def test_summarize_event_truncates_long_values(monkeypatch):
+    monkeypatch.delenv('EVENT_LOG_SAMPLE_RATE', raising=False)
+    summary = json.loads(summarize_event({'originalText': 'x' * 500, 'segments': [1, 2], 'fileNameKey': 'a.json'}))
+    assert summary['originalText'].endswith('(500 caractères)')
+    assert summary['segments'] == '<list 2 éléments>'
+    assert summary['fileNameKey'] == 'a.json'
+
+
+def test_attach_monitoring_keeps_the_event():
+    event = {'monitoring': {'bedrock': {'callMining': {'startedAt': 1}}, 'transcribe': {'ms': 2}}}
+    monitoring = attach_monitoring(event, 'callMining', {'model_calls': 3})
+    assert monitoring['bedrock']['callMining'] == {'startedAt': 1, 'metrics': {'model_calls': 3}}
+    assert monitoring['transcribe'] == {'ms': 2}
+    assert 'metrics' not in event['monitoring']['bedrock']['callMining']
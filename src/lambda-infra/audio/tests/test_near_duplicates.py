@@ -0,0 +1,97 @@
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+from corpus import build_short_call_corpus
+from load_test import load_function, make_answer_for
+from near_duplicate_bench import run
+from stub_bedrock import StubBedrockClient, StubLambdaContext
+
+from bedrock_common.near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex, estimate_similarity
+from bedrock_common.result_cache import LRUStore
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    return build_short_call_corpus(200, seed=42)
+
+
+def test_no_false_reuse_at_default_threshold(corpus):
+    """Au seuil par défaut, une évaluation n'est jamais reprise d'un appel d'une autre issue"""
+    report = run(corpus, DEFAULT_THRESHOLD, LRUStore(max_entries=100000))
+    assert report['false_reuse'] == 0.0
+    assert report['hit_rate'] > 0.3
+
+
+def test_long_and_empty_calls_are_not_indexed():
+    index = NearDuplicateIndex(LRUStore(), max_tokens=50)
+    assert index.signature_for('') is None
+    assert index.signature_for('Bonjour au revoir.') is None
+    assert index.signature_for(' '.join(['Je voudrais connaître le solde de mon compte.'] * 20)) is None
+
+
+def test_signature_ignores_digits_and_fillers():
+    index = NearDuplicateIndex(LRUStore())
+    text = ("Bonjour, je souhaite connaître le solde de mon compte numéro {}. Votre solde est de {} euros, "
+            "puis-je faire autre chose pour vous ? Non merci, bonne journée à vous aussi.")
+    signature = index.signature_for(text.format(12345678, '120,50'))
+    other = index.signature_for('Euh ' + text.format(87654321, '98,10'))
+    assert estimate_similarity(signature, other) >= DEFAULT_THRESHOLD
+
+
+@pytest.fixture
+def evaluate(monkeypatch):
+    for name, value in {
+        'BEDROCK_STARTUP_MODE': 'lazy',
+        'BEDROCK_EVALUATION_MODE': 'per_prompt',
+        'BEDROCK_STREAMING': 'false',
+        'BEDROCK_CACHE_ENABLED': 'false',
+        'BEDROCK_HEDGING': 'false',
+        'BEDROCK_RPM': '0',
+        'BEDROCK_TPM': '0',
+        'NEAR_DUPLICATE_MODE': 'reuse',
+    }.items():
+        monkeypatch.setenv(name, value)
+    for name in ('AWS_LAMBDA_FUNCTION_NAME', 'CHECKPOINT_TABLE', 'CHECKPOINT_SQLITE_PATH',
+                 'NEAR_DUPLICATE_TABLE', 'NEAR_DUPLICATE_SQLITE_PATH'):
+        monkeypatch.delenv(name, raising=False)
+    module = load_function('bedrock_evaluate')
+    registry = module.engine.get_registry()
+    module.engine.client = StubBedrockClient(
+        latency='fixed:0', ms_per_output_token=0, answer_for=make_answer_for(registry, 5), seed=5,
+    )
+    return module
+
+
+def handle(module, item):
+    event = {'originalText': item['originalText'], 'fileNameKey': item['fileNameKey'], 'analysis': 'test'}
+    with redirect_stdout(io.StringIO()):
+        return module.lambda_handler(event, StubLambdaContext())
+
+
+def test_engine_reuses_only_same_outcome(evaluate, corpus):
+    index = evaluate.engine.near_duplicates
+    signatures = [index.signature_for(item['originalText']) for item in corpus]
+    first, similar = next(
+        (corpus[i], corpus[j])
+        for i in range(len(corpus)) for j in range(i + 1, len(corpus))
+        if corpus[i]['label'] == corpus[j]['label'] and estimate_similarity(signatures[i], signatures[j]) >= 0.95
+    )
+    first_signature = signatures[corpus.index(first)]
+    different = next(
+        item for item, signature in zip(corpus, signatures)
+        if item['label'].split('/')[0] == first['label'].split('/')[0] and item['label'] != first['label']
+        and estimate_similarity(first_signature, signature) < index.threshold
+    )
+
+    assert 'nearDuplicate' not in handle(evaluate, first)
+    calls = evaluate.engine.client.stats['calls']
+
+    output = handle(evaluate, similar)
+    assert output['nearDuplicate']['fileNameKey'] == first['fileNameKey']
+    assert output['statusCode'] == 200
+    assert evaluate.engine.client.stats['calls'] == calls
+
+    assert 'nearDuplicate' not in handle(evaluate, different)
+    assert evaluate.engine.client.stats['calls'] > calls
@@ -0,0 +1,116 @@
+import copy
+import io
+import json
+import os
+from collections import OrderedDict
+
+import pytest
+from botocore.exceptions import ClientError
+
+from bedrock_common import prompt_registry
+from bedrock_common.prompt_registry import MAX_COMPILED_VERSIONS, PromptConfigStore, compile_registry
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'bedrock_common', 'prompts-config.json')
+
+
+@pytest.fixture(scope='module')
+def base_config():
+    with open(CONFIG_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(autouse=True)
+def empty_registry_cache(monkeypatch):
+    monkeypatch.setattr(prompt_registry, '_registries_by_version', OrderedDict())
+
+
+def versioned(config, version):
+    config = copy.deepcopy(config)
+    config.setdefault('metadata', {})['version'] = version
+    return config
+
+
+class FakeS3:
+    """Client S3 minimal : get_object avec ETag et If-None-Match"""
+
+    def __init__(self, config, etag='"v1"'):
+        self.config = config
+        self.etag = etag
+        self.requests = []
+        self.error = None
+
+    def get_object(self, **request):
+        self.requests.append(request)
+        if self.error is not None:
+            raise self.error
+        if request.get('IfNoneMatch') == self.etag:
+            raise ClientError({'Error': {'Code': '304', 'Message': 'Not Modified'}}, 'GetObject')
+        body = json.dumps(self.config).encode('utf-8')
+        return {'Body': io.BytesIO(body), 'ETag': self.etag}
+
+
+def test_compile_registry_once_per_version(base_config):
+    first = compile_registry(versioned(base_config, '1.0'))
+    assert compile_registry(versioned(base_config, '1.0')) is first
+    assert compile_registry(versioned(base_config, '2.0')) is not first
+
+
+def test_only_recent_versions_stay_compiled(base_config):
+    registries = {version: compile_registry(versioned(base_config, version)) for version in ('1', '2')}
+    # Version 1 réutilisée : c'est la version 2 qui sort du cache à la compilation de la 3
+    assert compile_registry(versioned(base_config, '1')) is registries['1']
+    compile_registry(versioned(base_config, '3'))
+
+    assert len(prompt_registry._registries_by_version) == MAX_COMPILED_VERSIONS
+    assert list(prompt_registry._registries_by_version) == ['1', '3']
+    assert compile_registry(versioned(base_config, '2')) is not registries['2']
+
+
+def test_store_without_s3_uses_the_local_config(base_config, monkeypatch):
+    monkeypatch.delenv('PROMPTS_CONFIG_S3_URI', raising=False)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return versioned(base_config, 'local')
+
+    store = PromptConfigStore(loader)
+    assert store.get_registry().version == 'local'
+    assert store.get_registry() is store.get_registry()
+    assert len(loads) == 1
+
+
+def test_store_reloads_only_when_the_object_changes(base_config):
+    s3 = FakeS3(versioned(base_config, 's3-1'))
+    store = PromptConfigStore(lambda: versioned(base_config, 'local'), s3_uri='s3://bucket/prompts/config.json',
+                              ttl_seconds=0, s3_client=s3)
+
+    first = store.get_registry()
+    assert first.version == 's3-1'
+    assert s3.requests[0] == {'Bucket': 'bucket', 'Key': 'prompts/config.json'}
+
+    # Objet inchangé : GET conditionnel, registre conservé
+    assert store.get_registry() is first
+    assert s3.requests[1]['IfNoneMatch'] == '"v1"'
+
+    s3.config, s3.etag = versioned(base_config, 's3-2'), '"v2"'
+    assert store.get_registry().version == 's3-2'
+
+
+def test_store_keeps_the_registry_when_s3_fails(base_config):
+    s3 = FakeS3(versioned(base_config, 's3-1'))
+    store = PromptConfigStore(lambda: versioned(base_config, 'local'), s3_uri='s3://bucket/config.json',
+                              ttl_seconds=0, s3_client=s3)
+    registry = store.get_registry()
+
+    s3.error = ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'Accès refusé'}}, 'GetObject')
+    assert store.get_registry() is registry
+
+
+def test_store_checks_s3_once_per_ttl(base_config):
+    s3 = FakeS3(versioned(base_config, 's3-1'))
+    store = PromptConfigStore(lambda: versioned(base_config, 'local'), s3_uri='s3://bucket/config.json',
+                              ttl_seconds=300, s3_client=s3)
+    for _ in range(5):
+        store.get_registry()
+    assert len(s3.requests) == 1
@@ -0,0 +1,53 @@
+import json
+
+from bedrock_common.request_builder import (
+    ANTHROPIC_VERSION, SYSTEM_PROMPT, build_request_body, extract_usage, is_prompt_caching_enabled,
+)
+
+
+def test_transcript_prefix_is_cached_before_the_instruction():
+    body = json.loads(build_request_body('Client: bonjour', 'Résumez', max_tokens=100, cache=True))
+    transcript, instruction = body['messages'][0]['content']
+
+    assert body['anthropic_version'] == ANTHROPIC_VERSION
+    assert body['system'] == [{'type': 'text', 'text': SYSTEM_PROMPT}]
+    assert transcript['text'] == '<transcript>\nClient: bonjour\n</transcript>'
+    assert transcript['cache_control'] == {'type': 'ephemeral'}
+    # Seul le préfixe commun est marqué : l'instruction du critère change d'un appel à l'autre
+    assert instruction == {'type': 'text', 'text': 'Résumez'}
+    assert 'cache_control' not in body['system'][0]
+
+
+def test_prefix_is_identical_across_criteria():
+    first = json.loads(build_request_body('Client: bonjour', 'Critère A', max_tokens=100, cache=True))
+    second = json.loads(build_request_body('Client: bonjour', 'Critère B', max_tokens=5, cache=True))
+    assert first['system'] == second['system']
+    assert first['messages'][0]['content'][0] == second['messages'][0]['content'][0]
+
+
+def test_caching_follows_the_environment(monkeypatch):
+    monkeypatch.delenv('BEDROCK_PROMPT_CACHING', raising=False)
+    assert is_prompt_caching_enabled()
+    monkeypatch.setenv('BEDROCK_PROMPT_CACHING', 'false')
+    assert not is_prompt_caching_enabled()
+    body = json.loads(build_request_body('Client: bonjour', 'Résumez', max_tokens=100))
+    assert 'cache_control' not in body['messages'][0]['content'][0]
+
+
+def test_stop_sequences_are_optional():
+    body = json.loads(build_request_body('t', 'i', max_tokens=5, temperature=0, stop_sequences=('.',)))
+    assert body['stop_sequences'] == ['.']
+    assert body['temperature'] == 0
+    assert 'stop_sequences' not in json.loads(build_request_body('t', 'i', max_tokens=5))
+
+
+def test_extract_usage():
+    response = {'usage': {'input_tokens': 1200, 'output_tokens': 40, 'cache_read_input_tokens': 1000}}
+    assert extract_usage(response) == {
+        'input_tokens': 1200,
+        'output_tokens': 40,
+        'cache_read_input_tokens': 1000,
+        'cache_creation_input_tokens': 0,
+    }
+    assert extract_usage({'usage': None}) == dict.fromkeys(extract_usage(response), 0)
+    assert extract_usage({}) == dict.fromkeys(extract_usage(response), 0)
@@ -0,0 +1,172 @@
+import time
+
+import pytest
+
+from bedrock_common.result_cache import (
+    DynamoDBStore, LRUStore, ResultCache, SQLiteStore, create_result_cache, make_cache_key,
+)
+
+
+class FailingStore:
+    """Tier persistant indisponible"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        raise ConnectionError('table indisponible')
+
+    def set(self, key, value):
+        self.calls += 1
+        raise ConnectionError('table indisponible')
+
+
+class FakeDynamoDBClient:
+    def __init__(self):
+        self.items = {}
+
+    def get_item(self, TableName, Key):
+        item = self.items.get(Key['cacheKey']['S'])
+        return {'Item': item} if item else {}
+
+    def put_item(self, TableName, Item):
+        self.items[Item['cacheKey']['S']] = Item
+
+
+def key(input_text='transcription', prompt='prompt', config_version='1.0'):
+    return make_cache_key(input_text, prompt, 'model', {'temperature': 0}, config_version)
+
+
+def test_cache_key_covers_every_input():
+    base = key()
+    assert key() == base
+    assert key(input_text='autre transcription') != base
+    assert key(prompt='autre prompt') != base
+    assert key(config_version='1.1') != base
+    assert make_cache_key('transcription', 'prompt', 'autre-modele', {'temperature': 0}, '1.0') != base
+    assert make_cache_key('transcription', 'prompt', 'model', {'temperature': 0.5}, '1.0') != base
+
+
+def test_memory_hit_and_miss():
+    cache = ResultCache(memory=LRUStore())
+    assert cache.get('a') is None
+    cache.set('a', 'réponse')
+    assert cache.get('a') == 'réponse'
+
+    stats = cache.stats()
+    assert stats['hits_memory'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+    assert stats['memory_entries'] == 1
+
+
+def test_lru_evicts_least_recently_used():
+    store = LRUStore(max_entries=2)
+    store.set('a', '1')
+    store.set('b', '2')
+    assert store.get('a') == '1'
+    store.set('c', '3')
+
+    assert store.get('b') is None
+    assert store.get('a') == '1'
+    assert store.get('c') == '3'
+    assert len(store) == 2
+
+
+def test_lru_entries_expire():
+    store = LRUStore(ttl_seconds=0)
+    store.set('a', '1')
+    assert store.get('a') is None
+    assert len(store) == 0
+
+
+def test_sqlite_entries_expire(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'cache.db'), ttl_seconds=0)
+    store.set('a', '1')
+    assert store.get('a') is None
+
+
+def test_sqlite_persists_and_bounds_entries(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    store = SQLiteStore(path, max_entries=2)
+    for name in ('a', 'b', 'c'):
+        store.set(name, name.upper())
+        time.sleep(0.001)
+
+    reopened = SQLiteStore(path)
+    assert reopened.get('a') is None
+    assert reopened.get('b') == 'B'
+    assert reopened.get('c') == 'C'
+
+
+def test_dynamodb_store_ignores_expired_items():
+    client = FakeDynamoDBClient()
+    store = DynamoDBStore('cache', ttl_seconds=3600, client=client)
+    store.set('a', '1')
+    assert store.get('a') == '1'
+    assert store.get('b') is None
+
+    # Élément expiré pas encore supprimé par le TTL DynamoDB
+    client.items['a']['expiresAt'] = {'N': str(int(time.time()) - 1)}
+    assert store.get('a') is None
+
+
+def test_config_version_change_invalidates_memory():
+    cache = ResultCache(memory=LRUStore())
+    cache.set_config_version('1.0')
+    cache.set(key(config_version='1.0'), 'réponse')
+
+    cache.set_config_version('1.0')
+    assert cache.get(key(config_version='1.0')) == 'réponse'
+
+    cache.set_config_version('1.1')
+    assert len(cache.memory) == 0
+    assert cache.get(key(config_version='1.1')) is None
+
+
+def test_persistent_hit_fills_memory(tmp_path):
+    persistent = SQLiteStore(str(tmp_path / 'cache.db'))
+    ResultCache(memory=LRUStore(), persistent=persistent).set('a', 'réponse')
+
+    # Nouvelle instance (démarrage à froid) : le tier mémoire est vide
+    cache = ResultCache(memory=LRUStore(), persistent=persistent)
+    assert cache.get('a') == 'réponse'
+    assert cache.get('a') == 'réponse'
+
+    stats = cache.stats()
+    assert stats['hits_persistent'] == 1
+    assert stats['hits_memory'] == 1
+    assert stats['misses'] == 0
+
+
+def test_persistent_errors_are_misses():
+    persistent = FailingStore()
+    cache = ResultCache(memory=LRUStore(), persistent=persistent)
+
+    cache.set('a', 'réponse')
+    assert cache.get('a') == 'réponse'
+    assert cache.get('b') is None
+    assert persistent.calls == 2
+    assert cache.stats()['misses'] == 1
+
+
+@pytest.mark.parametrize('env, persistent_type', [
+    ({}, type(None)),
+    ({'BEDROCK_CACHE_SQLITE_PATH': 'cache.db'}, SQLiteStore),
+    ({'BEDROCK_CACHE_TABLE': 'cache', 'BEDROCK_CACHE_SQLITE_PATH': 'cache.db'}, DynamoDBStore),
+])
+def test_create_result_cache(monkeypatch, tmp_path, env, persistent_type):
+    monkeypatch.chdir(tmp_path)
+    for name in ('BEDROCK_CACHE_ENABLED', 'BEDROCK_CACHE_TABLE', 'BEDROCK_CACHE_SQLITE_PATH'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('BEDROCK_CACHE_MAX_ENTRIES', '3')
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    cache = create_result_cache()
+    assert isinstance(cache.persistent, persistent_type)
+    assert cache.memory.max_entries == 3
+
+    monkeypatch.setenv('BEDROCK_CACHE_ENABLED', 'false')
+    assert create_result_cache() is None
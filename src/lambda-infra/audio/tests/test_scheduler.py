@@ -0,0 +1,141 @@
+import math
+import threading
+
+import pytest
+
+from bedrock_common.concurrency import run_prompts_concurrently
+from bedrock_common.rate_limiter import DeadlineExceededError
+from bedrock_common.scheduler import (
+    DEFAULT_PRIORITY, REFERENCE_CHARS, DeadlineScheduler, LatencyModel, order_by_priority,
+)
+
+KEYS = {'prompt rapide': 'analyse.rapide', 'prompt lent': 'analyse.lent', 'prompt nouveau': 'analyse.nouveau'}
+
+
+class FakeContext:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+@pytest.fixture
+def latency_model():
+    model = LatencyModel(default_ms=4000)
+    model.observe('analyse.rapide', 0, 1000)
+    model.observe('analyse.lent', 0, 20000)
+    return model
+
+
+def scheduler_for(remaining_ms, latency_model, margin_ms=1000, input_text=''):
+    return DeadlineScheduler(FakeContext(remaining_ms), input_text, KEYS.get, latency_model=latency_model,
+                             safety_margin_ms=margin_ms)
+
+
+def test_latency_model_scales_with_transcript_length():
+    model = LatencyModel(default_ms=4000, alpha=0.5)
+    assert model.estimate('analyse.resume', REFERENCE_CHARS) == 8000
+
+    model.observe('analyse.resume', REFERENCE_CHARS, 2000)
+    assert model.estimate('analyse.resume', 0) == 1000
+    model.observe('analyse.resume', 0, 3000)
+    assert model.estimate('analyse.resume', 0) == 2000
+    # Prompt jamais mesuré : moyenne de tous les prompts
+    assert model.estimate('analyse.autre', 0) == 2000
+
+
+def test_observe_invocation_skips_cache_hits_and_fallbacks():
+    model = LatencyModel(default_ms=4000)
+    model.observe_invocation({
+        'a': {'cache_hit': True, 'calls': 1, 'wall_ms': 1.0},
+        'b': {'cache_hit': False, 'calls': 2, 'wall_ms': 9000.0},
+        'c': {'cache_hit': False, 'calls': 1, 'wall_ms': 3000.0},
+    }, 0)
+    assert model.estimate('a', 0) == model.estimate('b', 0) == 3000
+
+
+def test_scheduler_admits_what_fits(latency_model):
+    scheduler = scheduler_for(10000, latency_model)
+    assert scheduler.remaining_ms() == 9000
+    assert scheduler.admit('prompt rapide')
+    assert scheduler.admit('prompt nouveau')
+    assert not scheduler.admit('prompt lent')
+
+
+def test_scheduler_without_lambda_context_admits_everything(latency_model):
+    scheduler = DeadlineScheduler(None, 'texte', KEYS.get, latency_model=latency_model)
+    assert scheduler.remaining_ms() == math.inf
+    assert scheduler.remaining_seconds() is None
+    assert scheduler.admit('prompt lent')
+
+
+def test_order_by_priority_is_stable():
+    jobs = {'c': 'prompt nouveau', 'b': 'prompt lent', 'a': 'prompt rapide'}
+    ordered = order_by_priority(jobs, KEYS.get, {'analyse.rapide': 1, 'analyse.lent': DEFAULT_PRIORITY})
+    assert list(ordered) == ['a', 'c', 'b']
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_unscheduled_prompts_are_deferred(latency_model, max_workers):
+    deferred, errors = [], {}
+
+    def invoke(input_text, prompt):
+        return prompt.upper()
+
+    results = run_prompts_concurrently(
+        '', {'rapide': 'prompt rapide', 'lent': 'prompt lent'}, invoke, max_workers=max_workers,
+        errors=errors, scheduler=scheduler_for(10000, latency_model), deferred=deferred,
+    )
+    assert results == {'rapide': 'PROMPT RAPIDE'}
+    assert deferred == ['lent'] and errors == {}
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_deadline_exceeded_defers_the_key(latency_model, max_workers):
+    deferred, errors = [], {}
+
+    def invoke(input_text, prompt):
+        if prompt == 'prompt nouveau':
+            raise DeadlineExceededError('backoff au-delà de l\'échéance')
+        if prompt == 'prompt lent':
+            raise RuntimeError('réponse invalide')
+        return prompt
+
+    results = run_prompts_concurrently('', {key: key for key in KEYS}, invoke, max_workers=max_workers,
+                                       errors=errors, deferred=deferred)
+    assert results == {'prompt rapide': 'prompt rapide'}
+    assert deferred == ['prompt nouveau']
+    assert list(errors) == ['prompt lent']
+
+
+def test_deadline_exceeded_is_an_error_without_deferred_list():
+    errors = {}
+
+    def invoke(input_text, prompt):
+        raise DeadlineExceededError('échéance')
+
+    assert run_prompts_concurrently('', {'a': 'prompt'}, invoke, max_workers=1, errors=errors) == {}
+    assert isinstance(errors['a'], DeadlineExceededError)
+
+
+def test_calls_still_in_flight_at_the_deadline_are_deferred():
+    release = threading.Event()
+    deferred = []
+
+    def invoke(input_text, prompt):
+        if prompt == 'prompt lent':
+            release.wait(5)
+        return prompt
+
+    # 100 ms utilisables : l'appel lent n'est pas attendu au-delà
+    scheduler = scheduler_for(1100, LatencyModel(default_ms=50), margin_ms=1000)
+    try:
+        results = run_prompts_concurrently(
+            '', {'rapide': 'prompt rapide', 'lent': 'prompt lent'}, invoke, max_workers=2,
+            errors={}, scheduler=scheduler, deferred=deferred,
+        )
+    finally:
+        release.set()
+    assert results == {'rapide': 'prompt rapide'}
+    assert deferred == ['lent']
@@ -0,0 +1,135 @@
+from bedrock_common.scores import (
+    SCORE_SCHEMA_VERSION, build_score_record, csat_category, nps_category, score_counters,
+)
+
+
+def survey_results(**overrides):
+    results = {
+        'satisfaction_globale': '4',
+        'time_adequacy': '5',
+        'assistance_adequacy': '3',
+        'easy_of_response': '4',
+        'net_promoter': '9',
+        'resolution_prompt_status': 'Résolu',
+        'conversation_analysis': {
+            'risk_assessment': {
+                'churn_risk_level': 'faible',
+                'churn_probability': '15',
+                'urgent_callback_required': 'false',
+            },
+            'conversation_metrics': {'dominant_sentiment': 'positif'},
+        },
+    }
+    results.update(overrides)
+    return results
+
+
+def test_categories():
+    assert [nps_category(score) for score in (None, 0, 6, 7, 8, 9, 10)] == [
+        None, 'detractor', 'detractor', 'passive', 'passive', 'promoter', 'promoter',
+    ]
+    assert [csat_category(score) for score in (None, 1, 2, 3, 4, 5)] == [
+        None, 'dissatisfied', 'dissatisfied', 'neutral', 'satisfied', 'satisfied',
+    ]
+
+
+def test_complete_record():
+    record = build_score_record(survey_results())
+
+    assert record['schema_version'] == SCORE_SCHEMA_VERSION
+    assert record['satisfaction'] == 4
+    assert record['time_adequacy'] == 5
+    assert record['assistance_adequacy'] == 3
+    assert record['ease_of_resolution'] == 4
+    assert record['nps'] == 9
+    assert record['resolution'] == 'resolved'
+    assert record['churn_risk'] == 'low'
+    assert record['churn_probability'] == 15
+    assert record['urgent_callback'] is False
+    assert record['dominant_sentiment'] == 'positive'
+    assert record['nps_category'] == 'promoter'
+    assert record['csat_category'] == 'satisfied'
+    assert record['invalid_fields'] == []
+
+
+def test_model_answers_are_normalized():
+    record = build_score_record(survey_results(
+        satisfaction_globale=' 4.',
+        net_promoter=10,
+        resolution_prompt_status='partiellement résolu',
+        conversation_analysis={
+            'risk_assessment': {'churn_risk_level': 'Élevé', 'urgent_callback_required': True},
+            'conversation_metrics': {'dominant_sentiment': 'Négatif'},
+        },
+    ))
+
+    assert record['satisfaction'] == 4
+    assert record['nps'] == 10
+    assert record['resolution'] == 'partially_resolved'
+    assert record['churn_risk'] == 'high'
+    assert record['urgent_callback'] is True
+    assert record['dominant_sentiment'] == 'negative'
+    assert record['churn_probability'] is None
+    assert record['invalid_fields'] == []
+
+
+def test_invalid_values_are_reported_not_raised():
+    record = build_score_record(survey_results(
+        satisfaction_globale='7',
+        net_promoter='excellent',
+        easy_of_response=True,
+        resolution_prompt_status='peut-être',
+        conversation_analysis='pas un objet',
+    ))
+
+    assert record['satisfaction'] is None
+    assert record['nps'] is None
+    assert record['ease_of_resolution'] is None
+    assert record['resolution'] is None
+    assert record['churn_risk'] is None
+    assert record['nps_category'] is None
+    assert set(record['invalid_fields']) == {
+        'satisfaction', 'nps', 'ease_of_resolution', 'resolution', 'conversation_analysis',
+    }
+    assert record['counters']['invalid_records'] == 1
+
+
+def test_missing_values_are_not_invalid():
+    record = build_score_record({})
+
+    assert record['satisfaction'] is None
+    assert record['resolution'] is None
+    assert record['invalid_fields'] == []
+    assert record['counters']['responses'] == 1
+    assert record['counters']['invalid_records'] == 0
+    assert record['counters']['nps_count'] == 0
+
+
+def test_counters():
+    counters = build_score_record(survey_results())['counters']
+
+    assert counters['responses'] == 1
+    assert counters['satisfaction_count'] == 1
+    assert counters['satisfaction_sum'] == 4
+    assert counters['nps_sum'] == 9
+    assert counters['churn_probability_sum'] == 15
+    assert counters['nps_promoter'] == 1
+    assert counters['csat_satisfied'] == 1
+    assert counters['resolution_resolved'] == 1
+    assert counters['churn_risk_low'] == 1
+    assert counters['dominant_sentiment_positive'] == 1
+    assert counters['urgent_callbacks'] == 0
+    assert 'nps_detractor' not in counters
+
+
+def test_reevaluation_delta_moves_category():
+    # store_response ajoute la différence des contributions : l'audio n'est pas compté deux fois
+    before = score_counters(build_score_record(survey_results(net_promoter='3')))
+    after = score_counters(build_score_record(survey_results(net_promoter='10')))
+    delta = {
+        name: after.get(name, 0) - before.get(name, 0)
+        for name in set(before) | set(after)
+        if after.get(name, 0) != before.get(name, 0)
+    }
+
+    assert delta == {'nps_sum': 7, 'nps_detractor': -1, 'nps_promoter': 1}
@@ -0,0 +1,42 @@
+from bedrock_common.startup import LazyClient, warm_up
+
+
+class LocalOnlyClient:
+    """Client dont tout appel d'API échoue : le préchauffage doit rester local"""
+
+    meta = object()
+
+    def __getattr__(self, name):
+        raise AssertionError(f"appel distant pendant l'init: {name}")
+
+
+class CountingPromptStore:
+    def __init__(self):
+        self.compiled = 0
+
+    def get_registry(self):
+        self.compiled += 1
+        return {}
+
+
+def test_warm_up_is_local():
+    created = []
+
+    def factory():
+        created.append(LocalOnlyClient())
+        return created[-1]
+
+    prompt_store = CountingPromptStore()
+    timings = warm_up(LazyClient(factory), prompt_store)
+
+    assert len(created) == 1
+    assert prompt_store.compiled == 1
+    assert set(timings) == {'config_ms', 'client_ms'}
+
+
+def test_warm_up_survives_client_errors():
+    def factory():
+        raise RuntimeError('credentials introuvables')
+
+    timings = warm_up(LazyClient(factory), CountingPromptStore())
+    assert 'client_ms' in timings
@@ -0,0 +1,117 @@
+import pytest
+
+from bedrock_common.transcript import (
+    PreparedTranscript, chunk_fingerprint, compact_segments, estimate_tokens, normalize_text, prepare_transcript,
+    split_chunks,
+)
+
+
+@pytest.fixture(autouse=True)
+def environment(monkeypatch):
+    for name in ('TRANSCRIPT_COMPACTION', 'MAP_REDUCE_THRESHOLD_TOKENS', 'MAP_REDUCE_CHUNK_TOKENS'):
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+def segment(speaker, text):
+    return {'speaker_label': speaker, 'transcript': text}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Euh [musique] bonjour bonjour bonjour ,  je   voudrais ♪ hum un forfait.', 'bonjour, je voudrais un forfait.'),
+    ('Je répète. Je répète. Je répète. Merci.', 'Je répète. Merci.'),
+    ('\n  Client:   oui \n\n Agent: (bruit de fond) d\'accord  ', "Client: oui\nAgent: d'accord"),
+])
+def test_normalize_text_removes_noise(text, expected):
+    assert normalize_text(text) == expected
+
+
+@pytest.mark.parametrize('text', [
+    'Mon numéro est 77 77 77 12.',
+    'Le code 1 2 1 2 1 2 ne marche pas.',
+    'Non non, ce n\'est pas ça.',
+])
+def test_normalize_text_keeps_content(text):
+    assert normalize_text(text) == text
+
+
+def test_compact_segments_merges_turns_and_shortens_labels():
+    segments = [
+        segment('spk_0', 'Bonjour'),
+        segment('spk_0', 'euh service client'),
+        segment('spk_1', '[bruit]'),
+        segment('spk_1', 'Oui'),
+        segment('spk_0', 'Je vous écoute'),
+    ]
+    assert compact_segments(segments) == 'L1: Bonjour service client\nL2: Oui\nL1: Je vous écoute'
+
+
+def test_compact_segments_rejects_unusable_segments():
+    assert compact_segments(['texte']) is None
+    assert compact_segments([segment('spk_0', 'euh')]) is None
+    assert compact_segments([]) is None
+
+
+def test_split_chunks_cuts_at_turns():
+    text = '\n'.join(f"L{index % 2 + 1}: " + 'mot ' * 30 for index in range(20))
+    chunks = split_chunks(text, chunk_tokens=100)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 400 for chunk in chunks)
+    assert all(chunk.startswith('L') for chunk in chunks)
+    assert ' '.join(''.join(chunks).split()) == ' '.join(text.split())
+
+
+def test_split_chunks_cuts_long_turns_on_spaces():
+    text = 'L1: ' + 'mot ' * 100
+    chunks = split_chunks(text, chunk_tokens=50)
+    assert len(chunks) > 1 and all(len(chunk) <= 200 for chunk in chunks)
+    # Aucun mot coupé
+    assert ' '.join(chunks).split() == text.split()
+
+
+def test_prepare_prefers_segments():
+    prepared = prepare_transcript('Client: euh bonjour', [segment('spk_0', 'Bonjour'), segment('spk_1', 'Oui')])
+    assert (prepared.mode, prepared.source) == ('compact', 'segments')
+    assert prepared.text == 'L1: Bonjour\nL2: Oui'
+    assert prepared.original == 'Client: euh bonjour'
+
+    prepared = prepare_transcript('Client: euh bonjour', [{'transcript': ''}])
+    assert (prepared.source, prepared.text) == ('text', 'Client: bonjour')
+
+
+def test_prepare_can_be_disabled(environment):
+    environment.setenv('TRANSCRIPT_COMPACTION', 'false')
+    prepared = prepare_transcript('Client: euh bonjour')
+    assert (prepared.mode, prepared.text) == ('verbatim', 'Client: euh bonjour')
+
+
+def test_long_transcripts_go_through_map_reduce(environment):
+    environment.setenv('MAP_REDUCE_THRESHOLD_TOKENS', '600')
+    environment.setenv('MAP_REDUCE_CHUNK_TOKENS', '500')
+    text = '\n'.join(f"Client: phrase numéro {index} sur le forfait." for index in range(200))
+
+    prepared = prepare_transcript(text)
+    assert prepared.mode == 'map_reduce'
+    assert len(prepared.chunks) > 1
+    assert len({chunk_fingerprint(chunk) for chunk in prepared.chunks}) == len(prepared.chunks)
+
+    prepared.use_summaries(['Résumé A', 'Résumé B'])
+    assert prepared.text.startswith("Résumé de la partie 1/2 de l'appel :\nRésumé A")
+    report = prepared.report(prompt_count=10)
+    assert report['chunks'] == len(prepared.chunks)
+    assert report['saved_input_tokens'] == report['saved_tokens_per_prompt'] * 10 > 0
+
+
+def test_report_counts_saved_tokens():
+    prepared = PreparedTranscript('x' * 400, 'x' * 100, 'compact', 'text')
+    assert estimate_tokens(prepared.original) == 100
+    assert prepared.report(prompt_count=3) == {
+        'mode': 'compact',
+        'source': 'text',
+        'original_tokens': 100,
+        'compact_tokens': 25,
+        'prompt_tokens': 25,
+        'chunks': 0,
+        'saved_tokens_per_prompt': 75,
+        'saved_input_tokens': 225,
+    }